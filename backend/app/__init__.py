@@ -5,33 +5,41 @@ from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
 
-from .routes import api_bp
+from .routes import api_bp, load_catalog_snapshot, start_background_workers
+from .settings import Settings, configure
 
 # lädt lokal .env, auf Railway kommen Variablen aus dem UI
 load_dotenv()
 
 
 def create_app(config_name: str | None = None) -> Flask:
+    from config import config_by_name
+
     app = Flask(__name__)
 
-    # CORS: für Cookie-Sessions muss Origin explizit/reflectable sein (kein wildcard in Kombination mit Credentials).
-    raw_origins = (os.getenv("CORS_ORIGINS") or "").strip()
-    if raw_origins:
-        origins = [o.strip() for o in raw_origins.split(",") if o.strip()]
-    else:
-        origins = [
-            "http://localhost:5173",
-            "http://127.0.0.1:5173",
-        ]
+    name = (config_name or os.getenv("APP_CONFIG") or os.getenv("FLASK_ENV") or "production").strip().lower()
+    app.config.from_object(config_by_name.get(name, config_by_name["production"]))
+
+    # Settings einmalig auflösen (Config-Klasse > Umgebung), danach nur noch get_settings()
+    settings = configure(Settings.from_config(app.config))
+    app.extensions["settings"] = settings
 
+    # CORS: für Cookie-Sessions muss Origin explizit/reflectable sein (kein wildcard in Kombination mit Credentials).
     CORS(
         app,
-        resources={r"/api/*": {"origins": origins}},
+        resources={r"/api/*": {"origins": list(settings.cors_origins)}},
         supports_credentials=True,
     )
 
     app.register_blueprint(api_bp, url_prefix="/api")
 
+    # Katalog-Snapshot nur mappen (kein Parsen) – mit --preload teilen sich die Worker die Seiten
+    load_catalog_snapshot(settings.catalog_snapshot_path)
+
+    # gunicorn --preload: nicht im Master, die Worker starten ihre Threads in post_worker_init
+    if not os.getenv("NP_START_WORKERS_POST_FORK"):
+        start_background_workers()
+
     @app.get("/api/health")
     def health_check():
         return {"status": "ok"}
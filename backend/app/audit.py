@@ -0,0 +1,323 @@
+"""
+Audit-Log (Write-Behind): Handler legen Events nur in eine begrenzte In-Process-Queue,
+ein Hintergrund-Thread schreibt sie gebündelt in die Append-only-Tabelle audit_log.
+
+- Request-Latenz: emit() ist ein put_nowait, kein DB-Zugriff
+- Queue voll oder DB weg: Events landen als JSON-Zeilen im Spool auf der Platte und
+  werden beim nächsten erfolgreichen Flush nachgetragen
+- Events, die MySQL dauerhaft ablehnt (`permanent_errors`), landen einzeln in
+  `{spool}.rejected` statt erneut im Spool – sonst blockiert ein Event alle folgenden
+- nach fork (gunicorn --preload) startet der Thread im Kind neu
+- alle Worker teilen sich den Spool: Anhängen und Umbenennen laufen unter einem flock auf
+  `{spool}.lock`; jede .replay-Datei hält ihr Bearbeiter per flock, .replay-Dateien
+  abgestürzter Worker übernimmt der nächste Prozess beim Start
+"""
+from __future__ import annotations
+
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+log = logging.getLogger(__name__)
+
+
+def ensure_audit_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS audit_log (
+              id BIGINT AUTO_INCREMENT PRIMARY KEY,
+              created_at DATETIME(3) NOT NULL,
+              actor_user_id INT NULL,
+              action VARCHAR(64) NOT NULL,
+              target_type VARCHAR(32) NULL,
+              target_id VARCHAR(64) NULL,
+              ip VARCHAR(45) NULL,
+              detail TEXT NULL,
+              INDEX idx_audit_created (created_at),
+              INDEX idx_audit_action (action, id),
+              INDEX idx_audit_actor (actor_user_id, id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """
+        )
+
+
+def _clip(value, width: int):
+    return None if value is None else str(value)[:width]
+
+
+def make_event(action: str, actor_user_id=None, target_type=None, target_id=None, ip=None, detail=None) -> dict:
+    # auf Spaltenbreite von audit_log gekürzt (X-Forwarded-For kommt ungeprüft vom Client)
+    return {
+        "ts": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+        "actor": actor_user_id,
+        "action": _clip(action, 64),
+        "target_type": _clip(target_type, 32),
+        "target_id": _clip(target_id, 64),
+        "ip": _clip(ip, 45),
+        "detail": detail or None,
+    }
+
+
+def _row(event: dict) -> tuple:
+    detail = event.get("detail")
+    return (
+        event["ts"],
+        event.get("actor"),
+        event["action"],
+        event.get("target_type"),
+        event.get("target_id"),
+        event.get("ip"),
+        json.dumps(detail, ensure_ascii=False, default=str) if detail else None,
+    )
+
+
+class AuditLog:
+    """
+    `connect`: liefert eine neue DB-Connection (Writer). Schreibt nie im Request-Thread.
+    `permanent_errors`: Exceptions, bei denen ein einzelnes Event abgelehnt ist (z. B. DataError);
+    alles andere gilt als DB-Ausfall und geht in den Spool.
+    """
+
+    def __init__(
+        self,
+        connect,
+        spool_path: str,
+        max_queue: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        permanent_errors: tuple = (ValueError,),
+    ):
+        self.connect = connect
+        self.permanent_errors = permanent_errors
+        self.spool_path = spool_path
+        os.makedirs(os.path.dirname(os.path.abspath(spool_path)), exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._spool_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._table_ready = False
+        # .replay-Dateien anderer (abgestürzter) Prozesse einmal pro Prozess übernehmen
+        self._orphans_checked = False
+        self.stats = {"written": 0, "spooled": 0, "replayed": 0, "rejected": 0, "flush_errors": 0}
+
+    # --- Request-Seite ---
+    def emit(self, event: dict):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._spool([event])
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # geforkt: Queue/Locks des Elternprozesses sind hier wertlos
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._spool_lock = threading.Lock()
+                self._orphans_checked = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    # --- Writer-Seite ---
+    def _run(self):
+        while True:
+            batch = self._take_batch(timeout=self.flush_interval)
+            self.flush(batch)
+
+    def _take_batch(self, timeout: float | None) -> list[dict]:
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def drain(self):
+        """Alles Ausstehende sofort schreiben (Shutdown, Tests)."""
+        while True:
+            batch = self._take_batch(timeout=None)
+            if not batch:
+                break
+            self.flush(batch)
+        self.flush([])
+
+    @property
+    def _replay_path(self) -> str:
+        return f"{self.spool_path}.{os.getpid()}.replay"
+
+    def flush(self, batch: list[dict]):
+        has_spool = os.path.exists(self.spool_path) or os.path.exists(self._replay_path) or bool(self._orphans())
+        if not batch and not has_spool:
+            return
+        try:
+            conn = self.connect()
+        except Exception as e:
+            self._failed(batch, e)
+            return
+        try:
+            if not self._table_ready:
+                ensure_audit_table(conn)
+                self._table_ready = True
+            if has_spool:
+                self._replay_spool(conn)
+            if batch:
+                self.stats["written"] += self._write(conn, batch)
+        except Exception as e:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            self._failed(batch, e)
+        finally:
+            conn.close()
+
+    def _failed(self, batch: list[dict], error: Exception):
+        self.stats["flush_errors"] += 1
+        log.warning("audit flush failed, spooling %d events: %s", len(batch), error)
+        self._spool(batch)
+
+    def _write(self, conn, events: list[dict]) -> int:
+        """Alles in einer Transaktion; lehnt MySQL ab, einzeln nachziehen. -> Anzahl geschriebener Events."""
+        try:
+            for start in range(0, len(events), self.batch_size):
+                self._insert(conn, events[start : start + self.batch_size])
+            conn.commit()
+            return len(events)
+        except self.permanent_errors:
+            conn.rollback()
+        written = 0
+        for event in events:
+            try:
+                self._insert(conn, [event])
+                conn.commit()
+                written += 1
+            except self.permanent_errors as e:
+                conn.rollback()
+                self._reject(event, e)
+        return written
+
+    def _reject(self, event: dict, error: Exception):
+        log.error("audit event %s rejected by database: %s", event.get("action"), error)
+        self.stats["rejected"] += 1
+        line = json.dumps({"error": str(error)[:255], "event": event}, ensure_ascii=False, default=str) + "\n"
+        try:
+            with self._locked_spool(), open(f"{self.spool_path}.rejected", "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            log.error("audit dead-letter file not writable: %s", e)
+
+    @staticmethod
+    def _insert(conn, batch: list[dict]):
+        with conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO audit_log (created_at, actor_user_id, action, target_type, target_id, ip, detail)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """,
+                [_row(e) for e in batch],
+            )
+
+    # --- Spool ---
+    @contextmanager
+    def _locked_spool(self):
+        """Prozessübergreifend: kein append() in eine Datei, die gerade umbenannt wird."""
+        with self._spool_lock:
+            fd = os.open(f"{self.spool_path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)  # gibt auch den flock frei
+
+    def _spool(self, events: list[dict]):
+        if not events:
+            return
+        data = "".join(json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in events)
+        try:
+            with self._locked_spool(), open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write(data)
+            self.stats["spooled"] += len(events)
+        except OSError as e:
+            log.error("audit spool not writable, dropping %d events: %s", len(events), e)
+
+    def _replay_spool(self, conn):
+        # umbenennen statt lesen+löschen: neue Spool-Events landen in einer frischen Datei;
+        # eine liegengebliebene .replay-Datei (Fehler beim letzten Versuch) wird zuerst nachgeholt
+        replay_path = self._replay_path
+        with self._locked_spool():
+            if not os.path.exists(replay_path):
+                try:
+                    os.replace(self.spool_path, replay_path)
+                except FileNotFoundError:
+                    pass
+        for path in [replay_path, *self._orphans()]:
+            self._replay_file(conn, path)
+        self._orphans_checked = True
+
+    def _orphans(self) -> list[str]:
+        """.replay-Dateien anderer Prozesse – nur bis zum ersten erfolgreichen Replay."""
+        if self._orphans_checked:
+            return []
+        own = self._replay_path
+        paths = sorted(p for p in glob.glob(f"{glob.escape(self.spool_path)}.*.replay") if p != own)
+        if not paths:
+            self._orphans_checked = True
+        return paths
+
+    def _replay_file(self, conn, path: str):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        with open(fd, "r", encoding="utf-8") as f:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # ein laufender Worker spielt die Datei gerade selbst ein
+            if os.fstat(fd).st_nlink == 0:
+                return  # inzwischen von einem anderen Prozess eingespielt und gelöscht
+            events = []
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue  # abgeschnittene letzte Zeile nach Crash
+            self._write(conn, events)
+            os.unlink(path)  # noch unter dem flock
+        if path != self._replay_path:
+            log.info("audit: adopted %d events from orphaned spool %s", len(events), path)
+        self.stats["replayed"] += len(events)
+
+
+def create_audit_log(settings, connect, permanent_errors: tuple = (ValueError,)) -> AuditLog:
+    audit = AuditLog(
+        connect,
+        settings.audit_spool_path,
+        max_queue=settings.audit_queue_max,
+        batch_size=settings.audit_batch_size,
+        flush_interval=settings.audit_flush_seconds,
+        permanent_errors=permanent_errors,
+    )
+    atexit.register(audit.drain)
+    return audit
@@ -0,0 +1,324 @@
+"""
+Zweistufiger Cache für alles, was sonst pro gunicorn-Worker doppelt und kalt wäre.
+
+- L1: In-Process-LRU (schnell, pro Worker, kurze Lebensdauer)
+- L2: SQLite-Datei im WAL-Modus, von allen Workern auf dem Host gelesen/geschrieben
+
+Keys sind versioniert: cache.key("perms", 3) -> "perms:v<n>:3". bump("perms") erhöht n
+host-weit und macht damit alle alten Einträge des Namespace auf einen Schlag ungültig.
+Kein externer Dienst nötig; fällt L2 aus (Datei gesperrt, Disk voll), läuft L1 weiter.
+
+Daneben ein host-weites Ereignisprotokoll (publish/events_since): Änderungen, die ein Worker
+empfängt (z. B. Produkt-Webhooks), spielen die anderen Worker in derselben Reihenfolge nach.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def encode_value(value) -> bytes:
+    """Cache-Werte sind JSON: L1 und L2 liefern damit dieselben Typen (z. B. Decimal/datetime -> str)."""
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return default
+            expires_at, value = hit
+            if expires_at <= now:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache:
+    """
+    Host-weiter Store. Werte als JSON, Ablauf über Wall-Clock (mehrere Prozesse).
+    Größenbegrenzung: alle `evict_every` Schreibzugriffe wird auf 90 % von max_bytes
+    zurückgeschnitten (abgelaufene zuerst, dann nach letztem Zugriff).
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, evict_every: int = 200, touch_interval: float = 30.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+              key TEXT PRIMARY KEY,
+              value BLOB NOT NULL,
+              size INTEGER NOT NULL,
+              expires_at REAL NOT NULL,
+              accessed_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (accessed_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_namespaces (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_events (
+              seq INTEGER PRIMARY KEY AUTOINCREMENT,
+              stream TEXT NOT NULL,
+              kind TEXT NOT NULL,
+              payload BLOB NOT NULL,
+              created_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_events_stream ON cache_events (stream, seq)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # nach fork (gunicorn --preload) nie die Connection des Elternprozesses weiterbenutzen
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str):
+        """(value, verbleibende TTL) oder None."""
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires_at, accessed_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at, accessed_at = row
+        if expires_at <= now:
+            conn.execute("DELETE FROM cache_entries WHERE key = ? AND expires_at <= ?", (key, now))
+            return None
+        # accessed_at nur grob pflegen – sonst wird jeder Lesezugriff ein Schreibzugriff
+        if now - accessed_at > self.touch_interval:
+            conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value), expires_at - now
+
+    def set(self, key: str, value, ttl: float):
+        self.set_encoded(key, encode_value(value), ttl)
+
+    def set_encoded(self, key: str, blob: bytes, ttl: float):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, blob, len(blob), now + ttl, now),
+        )
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def evict(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        while total > target:
+            rows = conn.execute("SELECT key, size FROM cache_entries ORDER BY accessed_at LIMIT 100").fetchall()
+            if not rows:
+                break
+            conn.executemany("DELETE FROM cache_entries WHERE key = ?", [(k,) for k, _ in rows])
+            total -= sum(size for _, size in rows)
+
+    def namespace_version(self, name: str) -> int:
+        row = self._conn().execute("SELECT version FROM cache_namespaces WHERE name = ?", (name,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def bump_namespace(self, name: str) -> int:
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO cache_namespaces (name, version) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+            (name,),
+        )
+        return self.namespace_version(name)
+
+    # --- Ereignisprotokoll ---
+    def append_event(self, stream: str, kind: str, payload) -> int:
+        blob = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        cur = self._conn().execute(
+            "INSERT INTO cache_events (stream, kind, payload, created_at) VALUES (?, ?, ?, ?)",
+            (stream, kind, blob, time.time()),
+        )
+        return cur.lastrowid
+
+    def events_since(self, stream: str, after: int, limit: int = 500) -> list[tuple[int, str, object]]:
+        rows = self._conn().execute(
+            "SELECT seq, kind, payload FROM cache_events WHERE stream = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (stream, after, limit),
+        ).fetchall()
+        return [(seq, kind, json.loads(payload)) for seq, kind, payload in rows]
+
+    def last_event(self, stream: str, kind: str | None = None) -> tuple[int, object, float] | None:
+        """(seq, payload, created_at) des jüngsten Ereignisses (dieser Art)."""
+        sql = "SELECT seq, payload, created_at FROM cache_events WHERE stream = ?"
+        params = [stream]
+        if kind is not None:
+            sql += " AND kind = ?"
+            params.append(kind)
+        row = self._conn().execute(sql + " ORDER BY seq DESC LIMIT 1", params).fetchone()
+        return (row[0], json.loads(row[1]), row[2]) if row else None
+
+    def trim_events(self, stream: str, before: int):
+        self._conn().execute("DELETE FROM cache_events WHERE stream = ? AND seq < ?", (stream, before))
+
+
+class TieredCache:
+    """
+    L1 (pro Worker) vor L2 (pro Host). L1-Einträge leben höchstens `l1_ttl` Sekunden,
+    damit Änderungen anderer Worker spätestens danach sichtbar sind; Namespace-Versionen
+    werden `version_ttl` Sekunden lokal gehalten. Auch L1 hält nur JSON-Werte (encode_value),
+    ein Treffer sieht also gleich aus, egal aus welcher Stufe er kommt.
+    """
+
+    def __init__(self, shared: SQLiteCache | None = None, l1_max_entries: int = 2048, l1_ttl: float = 5.0, version_ttl: float = 1.0):
+        self.l1 = LRUCache(l1_max_entries)
+        self.shared = shared
+        self.l1_ttl = l1_ttl
+        self.version_ttl = version_ttl
+        self._versions: dict[str, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "l2_errors": 0}
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _shared_call(self, fn, *args, default=None):
+        if self.shared is None:
+            return default
+        try:
+            return fn(*args)
+        except sqlite3.Error as e:
+            self._count("l2_errors")
+            log.warning("shared cache unavailable: %s", e)
+            return default
+
+    # --- versionierte Keys ---
+    def namespace_version(self, name: str) -> int:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._versions.get(name)
+        if hit and hit[0] > now:
+            return hit[1]
+        if self.shared is None:
+            return hit[1] if hit else 0
+        version = self._shared_call(self.shared.namespace_version, name, default=hit[1] if hit else 0)
+        with self._lock:
+            self._versions[name] = (now + self.version_ttl, version)
+        return version
+
+    def bump(self, name: str) -> int:
+        with self._lock:
+            local = self._versions.get(name, (0.0, 0))[1]
+        version = self._shared_call(self.shared.bump_namespace, name, default=local + 1) if self.shared else local + 1
+        with self._lock:
+            self._versions[name] = (time.monotonic() + self.version_ttl, version)
+        return version
+
+    def key(self, namespace: str, *parts) -> str:
+        suffix = ":".join(str(p) for p in parts)
+        return f"{namespace}:v{self.namespace_version(namespace)}:{suffix}"
+
+    # --- get/set ---
+    def get(self, key: str, default=None):
+        value = self.l1.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count("l1_hits")
+            return value
+        hit = self._shared_call(self.shared.get, key) if self.shared else None
+        if hit is None:
+            self._count("misses")
+            return default
+        value, remaining = hit
+        self._count("l2_hits")
+        self.l1.set(key, value, min(remaining, self.l1_ttl))
+        return value
+
+    def set(self, key: str, value, ttl: float):
+        blob = encode_value(value)
+        self.l1.set(key, json.loads(blob), min(ttl, self.l1_ttl) if self.shared else ttl)
+        if self.shared is not None:
+            self._shared_call(self.shared.set_encoded, key, blob, ttl)
+
+    def delete(self, key: str):
+        self.l1.delete(key)
+        if self.shared is not None:
+            self._shared_call(self.shared.delete, key)
+
+    # --- host-weites Ereignisprotokoll (ohne L2: nur dieser Prozess, dann gibt es nichts zu verteilen) ---
+    def publish(self, stream: str, kind: str, payload) -> int | None:
+        return self._shared_call(self.shared.append_event, stream, kind, payload) if self.shared else None
+
+    def events_since(self, stream: str, after: int, limit: int = 500) -> list[tuple[int, str, object]]:
+        return self._shared_call(self.shared.events_since, stream, after, limit, default=[]) if self.shared else []
+
+    def last_event(self, stream: str, kind: str | None = None) -> tuple[int, object, float] | None:
+        return self._shared_call(self.shared.last_event, stream, kind) if self.shared else None
+
+    def trim_events(self, stream: str, before: int):
+        if self.shared is not None:
+            self._shared_call(self.shared.trim_events, stream, before)
+
+
+def create_cache(settings) -> TieredCache:
+    shared = None
+    if settings.cache_backend == "tiered":
+        try:
+            shared = SQLiteCache(settings.cache_sqlite_path, max_bytes=settings.cache_max_bytes)
+        except sqlite3.Error as e:
+            log.warning("shared cache disabled (%s): %s", settings.cache_sqlite_path, e)
+    return TieredCache(shared, l1_max_entries=settings.cache_l1_max_entries)
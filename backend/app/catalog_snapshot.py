@@ -0,0 +1,251 @@
+"""
+Katalog-Snapshot auf der Platte: die gemappten Produkte (map_shopify_product) als kompakte,
+versionierte Binärdatei, die Worker beim Start per mmap öffnen.
+
+Layout (little-endian, alle Abschnitte 8-Byte-ausgerichtet):
+
+    Header     magic "NPCS" | version u16 | Spalten u16 | Zeilen u32 | erstellt f64
+    Verzeichnis pro Spalte: Name (16 Bytes) | Typ u8 | Offset u64 | Länge u64
+    Spalten    str: (Zeilen+1) x u32 Offsets + UTF-8-Blob
+               f64: Zeilen x f64
+
+Zeilen sind nach id sortiert (Lookup per Binärsuche). Die Spalte "_search" enthält pro Zeile
+Titel/SKU/EAN gefaltet wie im Suchindex; search() sucht direkt im Blob (mmap.find), ohne
+die Produkte in Python-Objekte zu laden – so kann ein frischer Worker sofort suchen, während
+der volle ProductSearchIndex im Hintergrund aufgebaut wird.
+"""
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_right
+
+from .search_index import _TOKEN_RE, _UMLAUTS, _strip_accents, query_tokens
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"NPCS"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHId")
+DIR_ENTRY = struct.Struct("<16sBQQ")
+KIND_STR, KIND_F64 = 0, 1
+
+STR_COLUMNS = ("id", "title", "sku", "ean", "description", "image", "thumbnail")
+SEARCH_COLUMN = "_search"
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def search_text(product: dict) -> str:
+    """' token token ... ' – führendes Leerzeichen, damit jeder Wortanfang ein ' ' davor hat."""
+    parts = []
+    for raw in (product.get("sku"), product.get("ean"), product.get("title")):
+        low = _strip_accents((raw or "").lower().translate(_UMLAUTS))
+        parts.extend(_TOKEN_RE.findall(low))
+    for raw in (product.get("sku"), product.get("ean")):
+        compact = "".join(_TOKEN_RE.findall((raw or "").lower()))
+        if compact:
+            parts.append(compact)
+    return " " + " ".join(parts) + " "
+
+
+def _str_column(values: list[str]) -> bytes:
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    if len(blob) > 0xFFFFFFFF:
+        raise SnapshotError("column too large")
+    return offsets.tobytes() + bytes(blob)
+
+
+def write_snapshot(path: str, products) -> int:
+    """Schreibt atomar (tmp + fsync + rename). Gibt die Anzahl der Zeilen zurück."""
+    if sys.byteorder != "little":
+        raise SnapshotError("snapshot format is little-endian")
+    rows = sorted((p for p in products if p.get("id")), key=lambda p: p["id"])
+
+    columns: list[tuple[str, int, bytes]] = []
+    for name in STR_COLUMNS:
+        columns.append((name, KIND_STR, _str_column([str(p.get(name) or "") for p in rows])))
+    columns.append(("price", KIND_F64, array("d", [float(p.get("price") or 0) for p in rows]).tobytes()))
+    columns.append((SEARCH_COLUMN, KIND_STR, _str_column([search_text(p) for p in rows])))
+
+    offset = _align(HEADER.size + DIR_ENTRY.size * len(columns))
+    directory = []
+    for name, kind, data in columns:
+        directory.append(DIR_ENTRY.pack(name.encode("ascii"), kind, offset, len(data)))
+        offset = _align(offset + len(data))
+
+    directory_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(columns), len(rows), time.time()))
+        f.write(b"".join(directory))
+        for _name, _kind, data in columns:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(rows)
+
+
+class CatalogSnapshot:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # leere Datei
+            self._file.close()
+            raise SnapshotError("empty snapshot")
+        self._view = memoryview(self._mm)
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def open(cls, path: str) -> "CatalogSnapshot | None":
+        """None, wenn kein (gültiger) Snapshot da ist – Worker starten dann wie bisher kalt."""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, SnapshotError, struct.error) as e:
+            log.warning("catalog snapshot %s ignored: %s", path, e)
+            return None
+
+    def _parse(self):
+        if sys.byteorder != "little":
+            raise SnapshotError("snapshot format is little-endian")
+        magic, version, column_count, self.count, self.created_at = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise SnapshotError("not a catalog snapshot")
+        if version != VERSION:
+            raise SnapshotError(f"unsupported snapshot version {version}")
+
+        self._str: dict[str, tuple[memoryview, memoryview]] = {}
+        self._f64: dict[str, memoryview] = {}
+        blob_offsets = {}
+        for i in range(column_count):
+            raw_name, kind, offset, length = DIR_ENTRY.unpack_from(self._mm, HEADER.size + i * DIR_ENTRY.size)
+            name = raw_name.rstrip(b"\0").decode("ascii")
+            if offset + length > len(self._mm):
+                raise SnapshotError(f"column {name} truncated")
+            data = self._view[offset : offset + length]
+            if kind == KIND_STR:
+                split = (self.count + 1) * 4
+                self._str[name] = (data[:split].cast("I"), data[split:])
+                blob_offsets[name] = offset + split
+            elif kind == KIND_F64:
+                self._f64[name] = data.cast("d")
+
+        missing = [c for c in (*STR_COLUMNS, SEARCH_COLUMN) if c not in self._str]
+        if missing or "price" not in self._f64:
+            raise SnapshotError(f"missing columns {missing}")
+        # mmap.find() sucht ohne Kopie im ganzen File -> absolute Position des Such-Blobs merken
+        self._search_offsets = self._str[SEARCH_COLUMN][0]
+        self._search_base = blob_offsets[SEARCH_COLUMN]
+
+    def close(self):
+        for attr in ("_str", "_f64"):
+            for value in getattr(self, attr, {}).values():
+                for mv in value if isinstance(value, tuple) else (value,):
+                    mv.release()
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _value(self, name: str, row: int) -> str:
+        offsets, blob = self._str[name]
+        return bytes(blob[offsets[row] : offsets[row + 1]]).decode("utf-8")
+
+    def product(self, row: int) -> dict:
+        """Eine Zeile in der Form von map_shopify_product."""
+        item = {name: self._value(name, row) for name in STR_COLUMNS}
+        item["price"] = self._f64["price"][row]
+        return item
+
+    def __iter__(self):
+        for row in range(self.count):
+            yield self.product(row)
+
+    def _find_row(self, product_id: str) -> int | None:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self._value("id", mid)
+            if value < product_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._value("id", lo) == product_id:
+            return lo
+        return None
+
+    def get(self, product_id: str) -> dict | None:
+        row = self._find_row(product_id)
+        return None if row is None else self.product(row)
+
+    def _token_rows(self, token: str) -> dict[int, int]:
+        """row -> Score (2 = Wortanfang, 1 = irgendwo im Wort) über den ganzen Blob."""
+        needle = token.encode("ascii")
+        base, offsets = self._search_base, self._search_offsets
+        end = base + offsets[self.count]
+        rows: dict[int, int] = {}
+        pos = self._mm.find(needle, base, end)
+        while pos >= 0:
+            row = bisect_right(offsets, pos - base) - 1
+            score = 2 if self._mm[pos - 1] == 0x20 else 1
+            if rows.get(row, 0) < score:
+                rows[row] = score
+            pos = self._mm.find(needle, pos + 1, end)
+        return rows
+
+    def _row_score(self, token: bytes, row: int) -> int:
+        start = self._search_base + self._search_offsets[row]
+        end = self._search_base + self._search_offsets[row + 1]
+        if self._mm.find(b" " + token, start, end) >= 0:
+            return 2
+        return 1 if self._mm.find(token, start, end) >= 0 else 0
+
+    def search(self, query: str, limit: int = 20) -> dict:
+        """Teilstring-Suche (alle Tokens müssen vorkommen) – Fallback, bis der volle Index steht."""
+        tokens = sorted(query_tokens(query), key=len, reverse=True)
+        if not tokens or not self.count:
+            return {"items": [], "total": 0}
+        # längstes Token über den Blob, die übrigen nur noch in den Kandidaten-Zeilen
+        scores = self._token_rows(tokens[0])
+        for token in tokens[1:]:
+            needle = token.encode("ascii")
+            next_scores = {}
+            for row, score in scores.items():
+                s = self._row_score(needle, row)
+                if s:
+                    next_scores[row] = score + s
+            scores = next_scores
+            if not scores:
+                break
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+        return {"items": [self.product(row) for row, _s in ranked], "total": len(scores)}
@@ -0,0 +1,92 @@
+"""
+Circuit Breaker für externe Aufrufe (Shopify).
+
+- closed: alles läuft; Fehler und zu langsame Antworten zählen im Fenster der letzten Aufrufe
+- open: zu viele davon -> sofort CircuitOpenError statt Worker zu blockieren
+- half_open: nach `open_seconds` darf genau ein Probe-Aufruf (mit kurzem Timeout) durch;
+  Erfolg schließt, Fehler öffnet erneut
+
+Pro Prozess; jeder gunicorn-Worker entscheidet für sich.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        window: int = 20,
+        slow_seconds: float = 5.0,
+        open_seconds: float = 30.0,
+        timeout: float = 10.0,
+        probe_timeout: float = 3.0,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.timeout = timeout
+        self.probe_timeout = probe_timeout
+        self._outcomes: deque[bool] = deque(maxlen=window)  # True = schlecht (Fehler oder langsam)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def before_call(self) -> float:
+        """Timeout für diesen Aufruf oder CircuitOpenError."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._current_state(now)
+            if state == CLOSED:
+                return self.timeout
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return self.probe_timeout
+            retry_after = max(0.0, self.open_seconds - (now - self._opened_at)) if state == OPEN else 1.0
+            raise CircuitOpenError(self.name, retry_after)
+
+    def record(self, ok: bool, elapsed: float):
+        bad = not ok or elapsed > self.slow_seconds
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if bad:
+                    self._trip(now)
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(bad)
+            if self._state == CLOSED and sum(self._outcomes) >= self.failure_threshold:
+                self._trip(now)
+
+    def _trip(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
@@ -0,0 +1,54 @@
+"""
+Worker-Modell: sync, gthread oder gevent (siehe gunicorn.conf.py, GUNICORN_PROFILE).
+
+Unter gevent sind threading/socket/time gepatcht: Warten auf Shopify oder MySQL (PyMySQL ist
+reines Python) gibt den Worker für andere Requests frei. CPU-Arbeit in C-Erweiterungen
+(bcrypt) hält dagegen den ganzen Hub an – run_blocking() verlagert sie in den nativen
+Thread-Pool des Hubs. Ohne gevent ist run_blocking() ein direkter Aufruf.
+"""
+from __future__ import annotations
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+def is_cooperative() -> bool:
+    monkey = sys.modules.get("gevent.monkey")
+    return bool(monkey and monkey.is_module_patched("threading"))
+
+
+def run_blocking(fn, *args):
+    if not is_cooperative():
+        return fn(*args)
+    import gevent
+
+    return gevent.get_hub().threadpool.apply(fn, args)
+
+
+def thread_map(fn, items: list, workers: int) -> list:
+    """map() über native Threads; unter gevent ein gevent-ThreadPool (blockiert nur das aufrufende Greenlet)."""
+    if not is_cooperative():
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(fn, items))
+    from gevent.threadpool import ThreadPool
+
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(fn, items)
+    finally:
+        pool.kill()
+
+
+def max_streams(limit: int) -> int:
+    """
+    Wie viele lang offene Streams (SSE) ein Worker halten darf. sync: keinen – ein Stream belegt
+    den ganzen Prozess, und der Arbiter-Timeout (WEB_TIMEOUT) bricht ihn ab. gthread: einen
+    Thread für normale Requests frei lassen. gevent und ohne gunicorn: `limit`.
+    """
+    profile = os.getenv("NP_WORKER_PROFILE")
+    if profile == "sync":
+        return 0
+    if profile == "threaded":
+        return max(0, min(limit, int(os.getenv("NP_WORKER_THREADS", "1")) - 1))
+    return limit
@@ -0,0 +1,197 @@
+"""
+In-Process-Pub/Sub für Automations-Jobs (Shopify-Sync, Exporte, Index-Rebuild ...).
+
+Jobs melden Zustandswechsel und Fortschritt an das JobBoard; jeder SSE-Client hat
+einen eigenen, begrenzten Puffer. Ist ein Client zu langsam, werden alte Events
+verworfen und er bekommt stattdessen einen frischen Snapshot (Zustand statt Historie).
+
+Das Board selbst gilt pro Prozess. Über `on_change` (Weitergabe) und apply() (Übernahme)
+verteilt routes.py die Events über das Ereignisprotokoll des L2-Caches an alle Worker des Hosts;
+stream(poll=...) holt sie während eines offenen Streams ab.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+JOB_STATES = ("idle", "running", "ok", "failed")
+
+
+class Subscription:
+    def __init__(self, max_buffer: int):
+        self._events: deque = deque(maxlen=max_buffer)
+        self._cond = threading.Condition()
+        self.lagged = False
+        self.closed = False
+
+    def push(self, event: dict):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.lagged = True
+            self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: float) -> tuple[list[dict], bool]:
+        """(Events, lagged) – wartet höchstens `timeout` Sekunden; leere Liste = Heartbeat fällig."""
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            lagged, self.lagged = self.lagged, False
+        return events, lagged
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class JobBoard:
+    def __init__(self, max_buffer: int = 100, progress_interval: float = 0.5, on_change=None):
+        self.max_buffer = max_buffer
+        # Fortschritt höchstens alle `progress_interval` Sekunden pro Job verteilen
+        self.progress_interval = progress_interval
+        # on_change(kind, job): eigene Änderungen an andere Prozesse weitergeben (außerhalb des Locks)
+        self.on_change = on_change
+        self._jobs: dict[str, dict] = {}
+        self._progress_sent: dict[str, float] = {}
+        self._subscribers: set[Subscription] = set()
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    # --- Abonnenten ---
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self.max_buffer)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        sub.close()
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"seq": self._seq, "jobs": [dict(job) for job in self._jobs.values()]}
+
+    # --- Job-Seite ---
+    def _job(self, job_id: str) -> dict:
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = {
+                "id": job_id,
+                "state": "idle",
+                "done": 0,
+                "total": None,
+                "message": None,
+                "lastRun": None,
+                "runsToday": 0,
+                "day": None,
+            }
+        return job
+
+    def _publish_locked(self, kind: str, job: dict) -> dict:
+        self._seq += 1
+        event = {"id": self._seq, "type": kind, "job": dict(job)}
+        for sub in self._subscribers:
+            sub.push(event)
+        return event["job"]
+
+    def _share(self, kind: str, job: dict | None):
+        if job is not None and self.on_change is not None:
+            self.on_change(kind, job)
+
+    def apply(self, kind: str, job: dict):
+        """Zustand eines Jobs aus einem anderen Prozess übernehmen und an die eigenen Clients verteilen."""
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+            self._publish_locked(kind, job)
+
+    def started(self, job_id: str, total: int | None = None, message: str | None = None):
+        now = datetime.now()
+        with self._lock:
+            job = self._job(job_id)
+            today = now.date().isoformat()
+            if job["day"] != today:
+                job["day"], job["runsToday"] = today, 0
+            job.update(state="running", done=0, total=total, message=message, lastRun=now.isoformat(timespec="seconds"))
+            job["runsToday"] += 1
+            self._progress_sent[job_id] = time.monotonic()
+            shared = self._publish_locked("state", job)
+        self._share("state", shared)
+
+    def progress(self, job_id: str, done: int, total: int | None = None):
+        now = time.monotonic()
+        with self._lock:
+            job = self._job(job_id)
+            job["done"] = done
+            if total is not None:
+                job["total"] = total
+            if now - self._progress_sent.get(job_id, 0.0) < self.progress_interval:
+                return
+            self._progress_sent[job_id] = now
+            shared = self._publish_locked("progress", job)
+        self._share("progress", shared)
+
+    def finished(self, job_id: str, ok: bool = True, message: str | None = None):
+        with self._lock:
+            job = self._job(job_id)
+            job.update(state="ok" if ok else "failed", message=message)
+            shared = self._publish_locked("state", job)
+        self._share("state", shared)
+
+
+def format_sse(event: str, data: dict, event_id: int | None = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream(board: JobBoard, heartbeat: float = 15.0, max_seconds: float | None = None, poll=None, poll_interval: float = 1.0):
+    """
+    SSE-Generator: erst Snapshot, dann Events; Kommentarzeile als Heartbeat.
+    `max_seconds`: Verbindung irgendwann schließen, damit der Client (EventSource)
+    neu verbindet und Worker nicht ewig belegt bleiben.
+    `poll`: wird mindestens alle `poll_interval` Sekunden aufgerufen (Events anderer Worker abholen).
+    """
+    if poll is not None:
+        poll()  # vor subscribe(): was bis hierher kam, steckt schon im Snapshot
+    sub = board.subscribe()
+    started = time.monotonic()
+    wait = min(heartbeat, poll_interval) if poll is not None else heartbeat
+    try:
+        yield "retry: 3000\n\n"
+        snap = board.snapshot()
+        yield format_sse("snapshot", snap, snap["seq"])
+        sent = time.monotonic()
+        while max_seconds is None or time.monotonic() - started < max_seconds:
+            events, lagged = sub.get(wait)
+            if poll is not None:
+                poll()
+            if lagged:
+                snap = board.snapshot()
+                yield format_sse("snapshot", snap, snap["seq"])
+                sent = time.monotonic()
+                continue
+            if not events:
+                if poll is None or time.monotonic() - sent >= heartbeat:
+                    yield ": ping\n\n"
+                    sent = time.monotonic()
+                continue
+            for event in events:
+                yield format_sse(event["type"], event["job"], event["id"])
+            sent = time.monotonic()
+    finally:
+        board.unsubscribe(sub)
@@ -0,0 +1,178 @@
+"""
+Feed-Prüfung vor dem Export an Händler (OBI, Bauhaus): der ganze gemappte Katalog
+(map_shopify_product) in einem Durchgang, damit ein Upload nicht erst beim Partner scheitert.
+
+- GTIN-8/13/14: nur Ziffern, erlaubte Länge, Prüfziffer (Modulo 10, Gewichte 3/1 von rechts)
+- doppelte EAN / SKU
+- Pflichtspalten je Händlerprofil (map_shopify_product setzt Fehlendes auf "" bzw. Preis 0)
+- Preisgrenzen
+
+Spaltenweise statt Produkt für Produkt (ohne numpy): jede Prüfung läuft über eine Spalten-Liste
+mit map/compress/Counter; die Prüfziffern werden pro Stelle über alle GTINs gleicher Länge
+gerechnet (bytes-Slice + translate + map(add)) – die Schleifen liegen damit fast vollständig in C.
+"""
+from __future__ import annotations
+
+import time
+from collections import Counter
+from dataclasses import dataclass
+from itertools import compress
+from operator import add, ne, not_
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+_DIGIT = bytes.maketrans(b"0123456789", bytes(range(10)))
+_TRIPLE = bytes.maketrans(b"0123456789", bytes(3 * d for d in range(10)))
+# gewichtete Summe -> erwartete Prüfziffer (max. 13 Stellen x 27)
+_CHECK_DIGIT = [(10 - t % 10) % 10 for t in range(13 * 27 + 1)]
+
+
+class FeedValidationError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class FeedProfile:
+    name: str
+    required: tuple[str, ...]
+    # Job-ID auf der AutomationsPage (JobBoard)
+    job: str
+    gtin_lengths: tuple[int, ...] = (8, 13, 14)
+    # None = Feed enthält keinen Preis (Bauhaus: keine UVP-Spalte)
+    price_bounds: tuple[float, float] | None = (0.01, 10000.0)
+
+
+# Pflichtfelder = Felder aus map_shopify_product hinter den Spalten in ObiTab/BauhausTab
+PROFILES = {
+    "obi": FeedProfile("obi", required=("ean", "sku", "title", "description", "price", "image"), job="obi-export"),
+    "bauhaus": FeedProfile("bauhaus", required=("ean", "sku", "title", "description", "image"), job="bauhaus-feed", price_bounds=None),
+}
+
+
+def get_profile(name: str | None) -> FeedProfile:
+    profile = PROFILES.get((name or "").strip().lower())
+    if profile is None:
+        raise FeedValidationError(f"unknown retailer: {name!r} (expected one of {', '.join(PROFILES)})")
+    return profile
+
+
+def text_column(products: list[dict], name: str) -> list[str]:
+    raw = [p.get(name) or "" for p in products]
+    try:
+        return list(map(str.strip, raw))
+    except TypeError:  # Nicht-Strings (z. B. EAN als Zahl aus einem Upload)
+        return [str(v).strip() for v in raw]
+
+
+def _digit_rows(rows: list[int], group: list[str]) -> list[int]:
+    """Zeilen der Gruppe, die nur aus ASCII-Ziffern bestehen (schneller Pfad: ein Check für alle)."""
+    blob = "".join(group)
+    if blob.isascii() and blob.isdigit():
+        return rows
+    return [row for row, value in zip(rows, group) if value.isascii() and value.isdigit()]
+
+
+def gtin_errors(values: list[str], lengths: tuple[int, ...] = GTIN_LENGTHS) -> dict[int, str]:
+    """row -> "gtin_format" | "gtin_checksum" für alle nicht leeren Werte; leere Werte zählen nicht."""
+    n = len(values)
+    lens = list(map(len, values))
+    known = {0, *lengths}
+    errors = dict.fromkeys(compress(range(n), map(not_, map(known.__contains__, lens))), "gtin_format")
+
+    present = set(lens)
+    for length in lengths:
+        if length not in present:
+            continue
+        rows = list(compress(range(n), map(length.__eq__, lens)))
+        group = [values[i] for i in rows]
+        digit_rows = _digit_rows(rows, group)
+        if len(digit_rows) != len(rows):
+            errors.update(dict.fromkeys(set(rows).difference(digit_rows), "gtin_format"))
+            group = [values[i] for i in digit_rows]
+        blob = "".join(group).encode("ascii")
+
+        total = [0] * len(digit_rows)
+        for pos in range(length - 1):
+            # Stelle pos aller GTINs dieser Länge; Gewicht 3 für jede zweite Stelle von rechts
+            weights = _TRIPLE if (length - pos) % 2 == 0 else _DIGIT
+            total = list(map(add, total, blob[pos::length].translate(weights)))
+        expected = bytes(map(_CHECK_DIGIT.__getitem__, total))
+        actual = blob[length - 1 :: length].translate(_DIGIT)
+        if expected != actual:
+            errors.update(dict.fromkeys(compress(digit_rows, map(ne, expected, actual)), "gtin_checksum"))
+    return errors
+
+
+def duplicate_rows(values: list[str]) -> list[int]:
+    """Zeilen, deren (nicht leerer) Wert mehrfach vorkommt – alle Vorkommen."""
+    counts = Counter(values)
+    dups = {v for v, c in counts.items() if c > 1 and v}
+    if not dups:
+        return []
+    return list(compress(range(len(values)), map(dups.__contains__, values)))
+
+
+def price_column(products: list[dict]) -> list[float]:
+    raw = [p.get("price") for p in products]
+    try:
+        return list(map(float, raw))
+    except (TypeError, ValueError):
+        pass
+    prices = []
+    for value in raw:
+        try:
+            prices.append(float(str(value).replace(",", ".")))
+        except (TypeError, ValueError):
+            prices.append(float("nan"))
+    return prices
+
+
+def validate_feed(products: list[dict], profile: FeedProfile, max_issues: int = 1000) -> dict:
+    """
+    Maschinenlesbarer Bericht: Zähler je Fehlercode, betroffene Zeilen und die ersten
+    `max_issues` Einzelbefunde (row, id, sku, field, code, value), nach Zeile sortiert.
+    """
+    started = time.perf_counter()
+    n = len(products)
+    found: list[tuple[int, str, str]] = []  # (row, field, code)
+
+    columns = {name: text_column(products, name) for name in dict.fromkeys(("id", "sku", "ean", *profile.required)) if name != "price"}
+    prices = price_column(products) if "price" in profile.required or profile.price_bounds else None
+
+    for name in profile.required:
+        if name == "price":
+            missing = compress(range(n), map(not_, prices))
+        else:
+            missing = compress(range(n), map(not_, columns[name]))
+        found.extend((row, name, "missing") for row in missing)
+
+    found.extend((row, "ean", code) for row, code in gtin_errors(columns["ean"], profile.gtin_lengths).items())
+    for name in ("ean", "sku"):
+        found.extend((row, name, "duplicate") for row in duplicate_rows(columns[name]))
+
+    if profile.price_bounds:
+        lo, hi = profile.price_bounds
+        # NaN fällt durch beide Vergleiche; 0 ist bereits "missing"
+        out_of_range = [i for i, v in enumerate(prices) if v and not lo <= v <= hi]
+        found.extend((row, "price", "price_out_of_range") for row in out_of_range)
+
+    found.sort()
+    invalid_rows = len({row for row, _field, _code in found})
+    issues = []
+    for row, field, code in found[:max_issues]:
+        value = prices[row] if field == "price" else columns[field][row]
+        if value != value:
+            value = None  # NaN ist kein gültiges JSON
+        issues.append({"row": row, "id": columns["id"][row], "sku": columns["sku"][row], "field": field, "code": code, "value": value})
+
+    return {
+        "profile": profile.name,
+        "total": n,
+        "valid": n - invalid_rows,
+        "invalid": invalid_rows,
+        "ok": not found,
+        "counts": dict(Counter(f"{field}.{code}" for _row, field, code in found)),
+        "issues": issues,
+        "truncated": len(found) > max_issues,
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+    }
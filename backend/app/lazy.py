@@ -0,0 +1,44 @@
+"""
+Verzögerte Imports für schwere Module (requests, bcrypt, pymysql, jwt).
+
+Das Modul-Objekt existiert sofort, geladen wird es erst beim ersten Attributzugriff.
+Spart Import-Zeit beim Worker-Start, z.B. für Health-Checks direkt nach einem Scale-up.
+
+Der erste Zugriff ist nicht thread-sicher (LazyLoader, Python < 3.12): greifen zwei Threads
+gleichzeitig zu, kann einer ein halb initialisiertes Modul sehen. Mit Threads/Greenlets pro
+Worker daher vorher warm_lazy_modules() aufrufen (gunicorn.conf.py macht das).
+"""
+from __future__ import annotations
+
+import importlib.util
+import sys
+import threading
+
+_lock = threading.Lock()
+_lazy_names: list[str] = []
+
+
+def lazy_import(name: str):
+    with _lock:
+        if name in sys.modules:
+            return sys.modules[name]
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        _lazy_names.append(name)
+        loader.exec_module(module)
+        return module
+
+
+def warm_lazy_modules() -> list[str]:
+    """Lädt alle noch verzögerten Module jetzt. Mit --preload im Master, vor dem fork."""
+    with _lock:
+        names = list(_lazy_names)
+        for name in names:
+            getattr(sys.modules[name], "__spec__")  # erster Attributzugriff führt das Modul aus
+        _lazy_names.clear()
+    return names
@@ -0,0 +1,103 @@
+"""
+Länder-Storefronts (Shopify Markets).
+
+Standard: ein Store, Land/Sprache per @inContext(country:, language:) – Preise, Währung und
+Verfügbarkeit kommen dann aus dem jeweiligen Markt. Länder mit eigenem Store (z. B. CH, UK)
+bekommen über SHOPIFY_MARKETS eigene Zugangsdaten:
+
+    SHOPIFY_MARKETS="CH=neudorff-ch.myshopify.com:<token>,UK=neudorff-uk.myshopify.com:<token>"
+
+Die Codes entsprechen COUNTRY_OPTIONS im NeudorffTab (UK statt ISO GB).
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+# Code im Frontend -> (Shopify CountryCode, Shopify LanguageCode)
+MARKET_DEFAULTS = {
+    "DE": ("DE", "DE"),
+    "AT": ("AT", "DE"),
+    "CH": ("CH", "DE"),
+    "ES": ("ES", "ES"),
+    "NO": ("NO", "NB"),
+    "SE": ("SE", "SV"),
+    "FI": ("FI", "FI"),
+    "UK": ("GB", "EN"),
+}
+
+_OPERATION_RE = re.compile(r"^(\s*query(?:\s+\w+)?)\s*(?:\(([^)]*)\))?", re.S)
+
+
+class MarketError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Market:
+    code: str
+    country: str
+    language: str
+    domain: str
+    token: str
+
+    @property
+    def context_variables(self) -> dict:
+        return {"country": self.country, "language": self.language}
+
+
+def parse_market_credentials(raw: str) -> dict[str, tuple[str, str]]:
+    """"CH=domain:token,UK=domain:token" -> {"CH": (domain, token), ...}"""
+    creds = {}
+    for part in (raw or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        code, _, rest = part.partition("=")
+        domain, _, token = rest.partition(":")
+        code = code.strip().upper()
+        if code not in MARKET_DEFAULTS or not domain.strip() or not token.strip():
+            raise MarketError(f"invalid SHOPIFY_MARKETS entry: {code or part!r}")
+        creds[code] = (domain.strip(), token.strip())
+    return creds
+
+
+def build_markets(default_domain: str, default_token: str, credentials: dict[str, tuple[str, str]]) -> dict[str, Market]:
+    markets = {}
+    for code, (country, language) in MARKET_DEFAULTS.items():
+        domain, token = credentials.get(code, (default_domain, default_token))
+        markets[code] = Market(code, country, language, domain, token)
+    return markets
+
+
+def resolve_codes(raw: str | None, markets: dict[str, Market]) -> list[str]:
+    """"de,at" -> ["DE", "AT"]; leer = alle."""
+    if not raw:
+        return list(markets)
+    codes = []
+    for code in raw.split(","):
+        code = code.strip().upper()
+        if not code:
+            continue
+        if code not in markets:
+            raise MarketError(f"unknown market: {code}")
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+def with_context(query: str) -> str:
+    """
+    Ergänzt die GraphQL-Operation um $country/$language und @inContext:
+    "query Products($first: Int!) {" -> "query Products($first: Int!, $country: CountryCode, ...) @inContext(...) {"
+    """
+    m = _OPERATION_RE.match(query)
+    if not m:
+        raise MarketError("query must start with a named or anonymous query operation")
+    params = (m.group(2) or "").strip()
+    params = f"{params}, " if params else ""
+    head = (
+        f"{m.group(1)}({params}$country: CountryCode, $language: LanguageCode) "
+        "@inContext(country: $country, language: $language)"
+    )
+    return head + query[m.end():]
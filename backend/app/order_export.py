@@ -0,0 +1,116 @@
+"""
+Bestell-Export (CSV / NDJSON) als Stream.
+
+Die Zeilen kommen über einen ungepufferten Server-Side-Cursor (SSDictCursor) und werden
+sofort in Chunks von ~64 KB umgewandelt – der Speicher bleibt flach, egal wie viele
+Bestellungen im Zeitraum liegen, und das erste Byte geht raus, bevor MySQL fertig ist.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+CHUNK_BYTES = 64 * 1024
+FETCH_ROWS = 500
+
+# eine Zeile pro Bestellposition; Bestellungen ohne Positionen mit leeren Positionsfeldern
+EXPORT_QUERY = """
+SELECT
+  o.id AS order_id, o.created_at, o.currency, o.total_price, o.notes,
+  a.salutation, a.first_name, a.last_name, a.company,
+  a.street, a.number, a.zip, a.city, a.country, a.email, a.phone,
+  i.product_id, i.title, i.sku, i.ean, i.qty, i.unit_price
+FROM orders o
+LEFT JOIN order_addresses a ON a.order_id = o.id
+LEFT JOIN order_items i ON i.order_id = o.id
+WHERE o.created_at >= %s AND o.created_at < %s
+ORDER BY o.id, i.id
+"""
+
+ORDER_FIELDS = ("order_id", "created_at", "currency", "total_price", "notes")
+ADDRESS_FIELDS = ("salutation", "first_name", "last_name", "company", "street", "number", "zip", "city", "country", "email", "phone")
+ITEM_FIELDS = ("product_id", "title", "sku", "ean", "qty", "unit_price")
+CSV_COLUMNS = ORDER_FIELDS + ADDRESS_FIELDS + ITEM_FIELDS
+
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def parse_range(raw_from: str | None, raw_to: str | None) -> tuple[datetime, datetime]:
+    """from/to als YYYY-MM-DD, beide inklusive. Ohne Angabe: die letzten 30 Tage."""
+    today = date.today()
+    start = date.fromisoformat(raw_from) if raw_from else today - timedelta(days=30)
+    end = date.fromisoformat(raw_to) if raw_to else today
+    if end < start:
+        raise ValueError("to must not be before from")
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+
+def iter_rows(cursor, size: int = FETCH_ROWS):
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield from rows
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _chunked(lines):
+    buf, size = [], 0
+    for line in lines:
+        buf.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf)
+
+
+def _csv_lines(rows):
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=";", lineterminator="\r\n")
+
+    def take() -> str:
+        line = out.getvalue()
+        out.seek(0)
+        out.truncate()
+        return line
+
+    out.write("\ufeff")  # BOM, damit Excel UTF-8 erkennt
+    writer.writerow(CSV_COLUMNS)
+    yield take()
+    for row in rows:
+        writer.writerow(["" if row.get(c) is None else _plain(row.get(c)) for c in CSV_COLUMNS])
+        yield take()
+
+
+def _ndjson_lines(rows):
+    """Eine Bestellung pro Zeile mit Adresse und Positionen (Zeilen kommen nach order_id sortiert)."""
+    current = None
+    for row in rows:
+        if current is None or current["order_id"] != row["order_id"]:
+            if current is not None:
+                yield json.dumps(current, ensure_ascii=False, default=str) + "\n"
+            current = {f: _plain(row.get(f)) for f in ORDER_FIELDS}
+            address = {f: row.get(f) for f in ADDRESS_FIELDS}
+            current["address"] = address if any(v is not None for v in address.values()) else None
+            current["items"] = []
+        if row.get("qty") is not None:
+            current["items"].append({f: _plain(row.get(f)) for f in ITEM_FIELDS})
+    if current is not None:
+        yield json.dumps(current, ensure_ascii=False, default=str) + "\n"
+
+
+def render(rows, fmt: str):
+    lines = _csv_lines(rows) if fmt == "csv" else _ndjson_lines(rows)
+    return _chunked(lines)
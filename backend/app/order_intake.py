@@ -0,0 +1,364 @@
+"""
+Bestellungen: Validierung + Insert (synchron) und asynchrone Annahme über einen Spool.
+
+Asynchron (ORDER_INTAKE_MODE=async):
+- Request: validieren, als JSON-Zeile an den Spool hängen (flock + fsync), 202 + Referenz
+- ein Hintergrund-Thread schreibt den Spool in Batches (eine Transaktion pro Batch) nach
+  orders / order_items / order_addresses und trägt die Referenz in order_intake ein
+- der Lese-Offset steht in "<spool>.offset" und wird erst nach dem Commit weitergesetzt;
+  nach einem Crash dazwischen verhindert order_intake (PK = Referenz) Doppel-Inserts
+- der Spool wird von allen Workern eines Hosts geteilt; es schreibt immer nur ein Worker
+  (nicht blockierender flock auf "<spool>.drain")
+- DB weg: Offset bleibt stehen, nächster Versuch nach flush_interval; einzelne Bestellungen,
+  die MySQL ablehnt, werden als "failed" markiert statt den Spool zu blockieren
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+log = logging.getLogger(__name__)
+
+STATUS_PERSISTED, STATUS_FAILED, STATUS_QUEUED = "persisted", "failed", "queued"
+
+ORDER_INSERT = "INSERT INTO orders (currency, notes, total_price) VALUES (%s, %s, %s)"
+ITEM_INSERT = """
+INSERT INTO order_items (order_id, product_id, title, sku, ean, qty, unit_price)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+ADDRESS_INSERT = """
+INSERT INTO order_addresses
+  (order_id, salutation, first_name, last_name, company, street, number, zip, city, country, email, phone)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+ADDRESS_FIELDS = ("salutation", "first_name", "last_name", "company", "street", "number", "zip", "city", "country", "email", "phone")
+
+
+def money(v) -> Decimal:
+    try:
+        return Decimal(str(v or "0")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"Invalid price: {v!r}")
+
+
+def require_field(obj: dict, name: str) -> str:
+    val = (obj.get(name) or "").strip()
+    if not val:
+        raise ValueError(f"Missing field: {name}")
+    return val
+
+
+def normalize_order(payload: dict) -> dict:
+    """Validiertes, JSON-serialisierbares Order-Dict (ValueError mit Feldhinweis)."""
+    items = payload.get("items") or []
+    address = payload.get("address") or {}
+    if not isinstance(items, list) or len(items) == 0:
+        raise ValueError("items must be a non-empty list")
+
+    normalized_address = {
+        "salutation": require_field(address, "salutation"),
+        "first_name": (address.get("firstName") or "").strip() or None,
+        "last_name": require_field(address, "lastName"),
+        "company": (address.get("company") or "").strip() or None,
+        "street": require_field(address, "street"),
+        "number": require_field(address, "number"),
+        "zip": require_field(address, "zip"),
+        "city": require_field(address, "city"),
+        "country": (address.get("country") or "de").strip().lower(),
+        "email": require_field(address, "email"),
+        "phone": (address.get("phone") or "").strip() or None,
+    }
+
+    total = Decimal("0.00")
+    normalized_items = []
+    for idx, it in enumerate(items):
+        qty = int(it.get("qty") or 0)
+        if qty <= 0:
+            raise ValueError(f"Invalid qty at items[{idx}]")
+        unit_price = money(it.get("unitPrice"))
+        total += unit_price * qty
+        normalized_items.append(
+            {
+                "product_id": it.get("productId"),
+                "title": it.get("title"),
+                "sku": it.get("sku"),
+                "ean": it.get("ean"),
+                "qty": qty,
+                "unit_price": str(unit_price),
+            }
+        )
+
+    return {
+        "currency": "EUR",
+        "notes": payload.get("notes"),
+        "total_price": str(total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)),
+        "items": normalized_items,
+        "address": normalized_address,
+    }
+
+
+def insert_order(cur, order: dict) -> int:
+    cur.execute(ORDER_INSERT, (order["currency"], order["notes"], order["total_price"]))
+    order_id = cur.lastrowid
+    cur.executemany(
+        ITEM_INSERT,
+        [(order_id, it["product_id"], it["title"], it["sku"], it["ean"], it["qty"], it["unit_price"]) for it in order["items"]],
+    )
+    address = order["address"]
+    cur.execute(ADDRESS_INSERT, (order_id, *(address[f] for f in ADDRESS_FIELDS)))
+    return order_id
+
+
+def ensure_intake_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS order_intake (
+              ref VARCHAR(40) PRIMARY KEY,
+              status VARCHAR(16) NOT NULL,
+              order_id INT NULL,
+              error VARCHAR(255) NULL,
+              received_at DATETIME(3) NOT NULL,
+              persisted_at DATETIME(3) NOT NULL
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """
+        )
+
+
+def new_reference() -> str:
+    return f"ord_{datetime.now().strftime('%Y%m%d')}_{secrets.token_hex(6)}"
+
+
+class OrderSpool:
+    """Append-only JSON-Lines-Datei + Offset-Datei (bis hierhin ist alles in MySQL)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset_path = f"{path}.offset"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def append(self, record: dict):
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b"\n":
+                line = b"\n" + line  # abgebrochene Zeile eines Crashs abschließen
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)  # gibt auch den flock frei
+
+    def committed_offset(self) -> int:
+        try:
+            with open(self.offset_path, encoding="ascii") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_offset(self, offset: int):
+        tmp = f"{self.offset_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="ascii") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.offset_path)
+
+    def read_pending(self, limit: int) -> tuple[list[dict], int]:
+        """(records, offset hinter dem letzten gelesenen Record). Nur vollständige Zeilen."""
+        offset = self.committed_offset()
+        records = []
+        try:
+            with open(self.path, "rb") as f:
+                if offset > os.fstat(f.fileno()).st_size:
+                    offset = 0  # Spool wurde nach einem Crash geleert, Offset nicht mehr
+                f.seek(offset)
+                while len(records) < limit:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break  # leer oder (noch) unvollständig
+                    offset += len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        log.error("skipping corrupt order spool line at offset %d", offset - len(line))
+        except FileNotFoundError:
+            pass
+        return records, offset
+
+    def commit(self, offset: int):
+        """Offset weitersetzen; ist alles abgearbeitet, wird der Spool geleert."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)  # keine gleichzeitigen append()
+            if offset >= os.fstat(fd).st_size:
+                # erst Offset 0, dann leeren: ein Crash dazwischen liest höchstens erneut
+                # (order_intake verhindert Doppel-Inserts), verliert aber nichts
+                self._write_offset(0)
+                os.ftruncate(fd, 0)
+                os.fsync(fd)
+            else:
+                self._write_offset(offset)
+        finally:
+            os.close(fd)
+
+    def find(self, ref: str) -> bool:
+        needle = f'"ref":"{ref}"'.encode("utf-8")
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.committed_offset())
+                return any(needle in line for line in f)
+        except FileNotFoundError:
+            return False
+
+    def pending_bytes(self) -> int:
+        try:
+            return max(0, os.path.getsize(self.path) - self.committed_offset())
+        except FileNotFoundError:
+            return 0
+
+
+class OrderIntakeWriter:
+    """
+    `connect`: neue Writer-Connection. `permanent_errors`: Exceptions, bei denen eine einzelne
+    Bestellung als "failed" markiert wird (z. B. DataError); alles andere gilt als DB-Ausfall.
+    """
+
+    def __init__(self, spool: OrderSpool, connect, permanent_errors: tuple = (ValueError,), batch_size: int = 50, flush_interval: float = 0.5):
+        self.spool = spool
+        self.connect = connect
+        self.permanent_errors = permanent_errors
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._table_ready = False
+        self.stats = {"accepted": 0, "persisted": 0, "failed": 0, "batches": 0, "errors": 0}
+
+    def submit(self, order: dict) -> str:
+        ref = new_reference()
+        self.spool.append({"ref": ref, "received_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3], "order": order})
+        self.stats["accepted"] += 1
+        self.ensure_running()
+        self._wake.set()
+        return ref
+
+    def ensure_running(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._wake = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="order-intake", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                while self.drain_once():
+                    pass
+            except Exception:
+                self.stats["errors"] += 1
+                log.exception("order intake drain failed; retrying")
+
+    def drain_once(self) -> int:
+        """Einen Batch schreiben. 0 = nichts zu tun oder ein anderer Worker ist dran."""
+        lock_fd = os.open(f"{self.spool.path}.drain", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            records, offset = self.spool.read_pending(self.batch_size)
+            if not records:
+                return 0
+            self._persist(records)
+            self.spool.commit(offset)
+            self.stats["batches"] += 1
+            return len(records)
+        finally:
+            os.close(lock_fd)
+
+    def _persist(self, records: list[dict]):
+        conn = self.connect()
+        try:
+            if not self._table_ready:
+                ensure_intake_table(conn)
+                conn.commit()
+                self._table_ready = True
+            todo = self._not_yet_persisted(conn, records)
+            try:
+                self._insert_all(conn, todo)
+                conn.commit()
+                self.stats["persisted"] += len(todo)
+            except self.permanent_errors:
+                # einzeln nachziehen: die schuldige Bestellung als failed markieren, der Rest geht durch
+                conn.rollback()
+                for record in todo:
+                    self._persist_one(conn, record)
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _not_yet_persisted(conn, records: list[dict]) -> list[dict]:
+        refs = [r["ref"] for r in records]
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT ref FROM order_intake WHERE ref IN ({', '.join(['%s'] * len(refs))})", refs)
+            done = {row["ref"] for row in cur.fetchall()}
+        return [r for r in records if r["ref"] not in done]
+
+    @staticmethod
+    def _insert_all(conn, records: list[dict]):
+        with conn.cursor() as cur:
+            for record in records:
+                order_id = insert_order(cur, record["order"])
+                cur.execute(
+                    "INSERT INTO order_intake (ref, status, order_id, received_at, persisted_at) VALUES (%s, %s, %s, %s, NOW(3))",
+                    (record["ref"], STATUS_PERSISTED, order_id, record["received_at"]),
+                )
+
+    def _persist_one(self, conn, record: dict):
+        try:
+            self._insert_all(conn, [record])
+            conn.commit()
+            self.stats["persisted"] += 1
+        except self.permanent_errors as e:
+            conn.rollback()
+            log.error("order %s rejected by database: %s", record["ref"], e)
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO order_intake (ref, status, error, received_at, persisted_at) VALUES (%s, %s, %s, %s, NOW(3))",
+                    (record["ref"], STATUS_FAILED, str(e)[:255], record["received_at"]),
+                )
+            conn.commit()
+            self.stats["failed"] += 1
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Für Shutdown/Tests: warten, bis der Spool leer ist."""
+        deadline = time.monotonic() + timeout
+        while self.spool.pending_bytes() and time.monotonic() < deadline:
+            self._wake.set()
+            time.sleep(0.01)
+        return not self.spool.pending_bytes()
@@ -0,0 +1,132 @@
+"""
+Spekulatives Vorladen der nächsten Seite bei Cursor-Pagination (Shopify-Produktsuche).
+
+Wer Seite N bekommt, lädt sehr wahrscheinlich gleich Seite N+1 ("Mehr laden" im
+BestellCockpit). Während Seite N ausgeliefert wird, holt ein kleiner Thread-Pool die
+nächste Seite im Hintergrund; der Folge-Request wird dann aus dem Speicher bedient.
+
+- Schlüssel: (q, first, endCursor)
+- Budget: höchstens `max_inflight` gleichzeitige Prefetches pro Worker, sonst wird verzichtet
+- Speicher: LRU bis `max_bytes` (JSON-Größe), Einträge leben `ttl` Sekunden
+- Metriken: hits / misses / wasted (nie abgeholt: verdrängt oder abgelaufen) / skipped
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+class PagePrefetcher:
+    def __init__(self, max_inflight: int = 2, max_bytes: int = 8 * 1024 * 1024, ttl: float = 60.0, wait_seconds: float = 2.0):
+        self.max_inflight = max_inflight
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # läuft der Prefetch für genau diese Seite noch, lohnt kurzes Warten mehr als ein zweiter Call
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[float, int, object]] = OrderedDict()
+        self._inflight: dict[tuple, threading.Event] = {}
+        self._bytes = 0
+        self._executor = None
+        self._pid = None
+        self._stats = {"scheduled": 0, "hits": 0, "misses": 0, "wasted": 0, "skipped": 0, "errors": 0}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # nach fork ist der Pool des Elternprozesses tot
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_inflight, thread_name_prefix="prefetch")
+            self._pid = os.getpid()
+            self._inflight = {}
+        return self._executor
+
+    def take(self, key: tuple):
+        """Vorgeladene Seite (einmalig) oder None."""
+        with self._lock:
+            done = self._inflight.get(key)
+        if done is not None:
+            done.wait(self.wait_seconds)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+                if entry[0] > now:
+                    self._stats["hits"] += 1
+                    return entry[2]
+                self._stats["wasted"] += 1
+            self._stats["misses"] += 1
+            return None
+
+    def schedule(self, key: tuple, fetch) -> bool:
+        """fetch() im Hintergrund ausführen und das Ergebnis unter key ablegen."""
+        if self.max_inflight <= 0:
+            return False
+        with self._lock:
+            pool = self._pool()
+            if key in self._entries or key in self._inflight:
+                return False
+            if len(self._inflight) >= self.max_inflight:
+                self._stats["skipped"] += 1
+                return False
+            done = self._inflight[key] = threading.Event()
+            self._stats["scheduled"] += 1
+        pool.submit(self._run, key, fetch, done)
+        return True
+
+    def _run(self, key: tuple, fetch, done: threading.Event):
+        try:
+            data = fetch()
+            size = len(json.dumps(data, default=str))
+        except Exception as e:
+            log.info("prefetch %r failed: %s", key, e)
+            with self._lock:
+                self._stats["errors"] += 1
+            data = None
+        try:
+            if data is not None:
+                self._store(key, data, size)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    def _store(self, key: tuple, data, size: int):
+        if size > self.max_bytes:
+            with self._lock:
+                self._stats["wasted"] += 1
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            while self._entries and self._bytes + size > self.max_bytes:
+                _key, (_exp, old_size, _data) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self._stats["wasted"] += 1
+            self._entries[key] = (now + self.ttl, size, data)
+            self._bytes += size
+
+    def _evict_expired(self, now: float):
+        for key in [k for k, (exp, _size, _data) in self._entries.items() if exp <= now]:
+            _exp, size, _data = self._entries.pop(key)
+            self._bytes -= size
+            self._stats["wasted"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            served = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hitRate": round(self._stats["hits"] / served, 3) if served else None,
+                "inflight": len(self._inflight),
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
@@ -0,0 +1,184 @@
+"""
+Produktdaten pro Kanal und Land (Neudorff-Datenblatt), Schlüssel = EAN.
+
+Gespeichert wird schmal statt breit: eine Zeile pro (EAN, Kanal, Land, Attribut).
+Nicht gepflegte Felder kosten nichts, und eine Abfrage liest nur die angefragten
+Spalten – 1.000 Produkte x 5 Spalten sind höchstens 5.000 kleine Zeilen, nie 30 Felder.
+
+Land "" = gilt für alle Länder; ein länderspezifischer Wert überschreibt ihn.
+"""
+from __future__ import annotations
+
+# Spaltenbezeichnung im Frontend (NeudorffTab COLUMN_OPTIONS) -> Attribut-Key in der DB
+COLUMNS = {
+    "SKU": "sku",
+    "EAN": "ean",
+    "Title": "title",
+    "Title 2": "title_2",
+    "Einleitungstext": "intro",
+    "Produkt Kategorie": "category",
+    "UVP": "uvp",
+    "Subline": "subline",
+    "Bulletpoints": "bulletpoints",
+    "Produktbeschreibung": "description",
+    "Produktbeschreibung (clean)": "description_clean",
+    "Anwendungstext": "usage",
+    "Packungsgroeße": "package_size",
+    "Hero": "image_hero",
+    **{f"Bild {i}": f"image_{i}" for i in range(1, 10)},
+    "Sicherheitsblatt": "sds_1",
+    "Sicherheitsblatt 2": "sds_2",
+    "Sicherheitsblatt 3": "sds_3",
+    "Gebrauchsanweisungen": "instructions",
+    "CLP": "clp",
+}
+COUNTRIES = ("DE", "ES", "AT", "CH", "NO", "SE", "FI", "UK")
+CHANNELS = ("neudorff", "shopify", "obi", "bauhaus")
+DEFAULT_CHANNEL = "neudorff"
+
+MAX_EANS = 5000
+# Obergrenze für Platzhalter pro Statement (IN-Listen)
+EAN_CHUNK = 500
+
+
+class ProductStoreError(ValueError):
+    pass
+
+
+def ensure_product_store_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS product_attributes (
+              ean VARCHAR(14) NOT NULL,
+              channel VARCHAR(16) NOT NULL,
+              country CHAR(2) NOT NULL DEFAULT '',
+              attr VARCHAR(32) NOT NULL,
+              value TEXT NOT NULL,
+              updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+              PRIMARY KEY (ean, channel, country, attr)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """
+        )
+
+
+def normalize_ean(raw) -> str:
+    ean = str(raw or "").strip()
+    if not ean.isdigit() or not 8 <= len(ean) <= 14:
+        raise ProductStoreError(f"invalid ean: {raw!r}")
+    return ean
+
+
+def resolve_columns(labels) -> list[tuple[str, str]]:
+    """[(Label, Attribut-Key)] in angefragter Reihenfolge, ohne Duplikate."""
+    if not isinstance(labels, list) or not labels:
+        raise ProductStoreError("columns must be a non-empty list")
+    resolved = {}
+    for label in labels:
+        key = COLUMNS.get(label)
+        if key is None:
+            raise ProductStoreError(f"unknown column: {label!r}")
+        resolved[label] = key
+    return list(resolved.items())
+
+
+def resolve_scope(channel, country) -> tuple[str, str]:
+    channel = (channel or DEFAULT_CHANNEL).strip().lower()
+    country = (country or "").strip().upper()
+    if channel not in CHANNELS:
+        raise ProductStoreError(f"unknown channel: {channel!r}")
+    if country and country not in COUNTRIES:
+        raise ProductStoreError(f"unknown country: {country!r}")
+    return channel, country
+
+
+def fetch_columns(conn, eans: list[str], columns: list[tuple[str, str]], channel: str, country: str) -> dict[str, dict]:
+    """
+    EAN -> {Label: Wert} nur für die angefragten Spalten.
+    Fehlende Werte bleiben None; EANs ohne jeden Eintrag fehlen im Ergebnis.
+    """
+    keys = [key for _label, key in columns if key != "ean"]
+    labels_by_key = {}
+    for label, key in columns:
+        labels_by_key.setdefault(key, []).append(label)
+
+    found: dict[str, dict] = {}
+    # (ean, attr), für die schon ein länderspezifischer Wert gesetzt wurde
+    specific: set[tuple[str, str]] = set()
+    countries = (country, "") if country else ("",)
+
+    for start in range(0, len(eans), EAN_CHUNK):
+        chunk = eans[start : start + EAN_CHUNK]
+        where = (
+            f"channel = %s AND country IN ({', '.join(['%s'] * len(countries))})"
+            f" AND ean IN ({', '.join(['%s'] * len(chunk))})"
+        )
+        params = [channel, *countries, *chunk]
+        with conn.cursor() as cur:
+            if not keys:
+                # nur EAN angefragt: Existenz reicht
+                cur.execute(f"SELECT DISTINCT ean FROM product_attributes WHERE {where}", params)
+            else:
+                cur.execute(
+                    f"SELECT ean, country, attr, value FROM product_attributes WHERE {where}"
+                    f" AND attr IN ({', '.join(['%s'] * len(keys))})",
+                    (*params, *keys),
+                )
+            for row in cur.fetchall() or []:
+                ean = row["ean"]
+                item = found.get(ean)
+                if item is None:
+                    item = found[ean] = {label: None for label, _key in columns}
+                    for label in labels_by_key.get("ean", ()):
+                        item[label] = ean
+                if not keys:
+                    continue
+                attr = row["attr"]
+                if row["country"]:
+                    specific.add((ean, attr))
+                elif (ean, attr) in specific:
+                    continue
+                for label in labels_by_key.get(attr, ()):
+                    item[label] = row["value"]
+    return found
+
+
+def upsert_values(conn, channel: str, country: str, items) -> int:
+    """items: [{"ean": ..., "values": {Label: Wert}}]; Wert None löscht das Attribut."""
+    if items is not None and not isinstance(items, list):
+        raise ProductStoreError("items must be a list")
+    upserts, deletes = [], []
+    for item in items or []:
+        if not isinstance(item, dict):
+            raise ProductStoreError("items must be objects")
+        ean = normalize_ean(item.get("ean"))
+        values = item.get("values") or {}
+        if not isinstance(values, dict):
+            raise ProductStoreError("values must be an object")
+        for label, value in values.items():
+            key = COLUMNS.get(label)
+            if key is None:
+                raise ProductStoreError(f"unknown column: {label!r}")
+            if key == "ean":
+                continue
+            if value is None:
+                deletes.append((ean, channel, country, key))
+            else:
+                upserts.append((ean, channel, country, key, str(value)))
+
+    with conn.cursor() as cur:
+        if upserts:
+            cur.executemany(
+                """
+                INSERT INTO product_attributes (ean, channel, country, attr, value)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE value = VALUES(value)
+                """,
+                upserts,
+            )
+        if deletes:
+            cur.executemany(
+                "DELETE FROM product_attributes WHERE ean = %s AND channel = %s AND country = %s AND attr = %s",
+                deletes,
+            )
+    return len(upserts) + len(deletes)
@@ -0,0 +1,233 @@
+"""
+Shopify-Produkt-Webhooks (products/create, products/update, products/delete).
+
+- Signatur: X-Shopify-Hmac-Sha256 = base64(HMAC-SHA256(App-Secret, Roh-Body))
+- Bursts: mehrere Updates desselben Produkts innerhalb von `delay` Sekunden werden zu einem
+  zusammengefasst (das letzte gewinnt, spätestens nach `max_delay` wird angewendet)
+- Shopify wiederholt Zustellungen: gleiche X-Shopify-Webhook-Id und Events mit älterem
+  updated_at als dem zuletzt angewendeten werden verworfen
+- Abgleich: alle `reconcile_seconds` ein kompletter Crawl im selben Thread, der verpasste
+  Events nachholt (Events, die währenddessen ankommen, werden danach angewendet)
+
+Die Payloads kommen aus der Admin-API (REST-Form); admin_product_to_node() bringt sie in die
+Storefront-Form, damit überall dasselbe map_shopify_product gilt.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import html
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+log = logging.getLogger(__name__)
+
+TOPICS = {"products/create": "upsert", "products/update": "upsert", "products/delete": "delete"}
+
+MAX_SEEN_IDS = 5000
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def verify_hmac(body: bytes, signature: str | None, secret: str) -> bool:
+    if not secret or not signature:
+        return False
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode("ascii"), signature.strip())
+
+
+def product_gid(payload: dict) -> str:
+    gid = payload.get("admin_graphql_api_id")
+    if gid:
+        return gid
+    return f"gid://shopify/Product/{payload['id']}"
+
+
+def parse_timestamp(value: str | None) -> datetime | None:
+    """ISO-8601 -> aware datetime (ohne Offset = UTC); None bei fehlendem/ungültigem Wert."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _plain_text(body_html: str | None) -> str:
+    # Storefront liefert "description" ohne HTML
+    text = html.unescape(_TAG_RE.sub(" ", body_html or ""))
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def admin_product_to_node(payload: dict) -> dict:
+    variants = payload.get("variants") or []
+    image = payload.get("image") or (payload.get("images") or [None])[0] or {}
+    node = {
+        "id": product_gid(payload),
+        "title": payload.get("title") or "",
+        "description": _plain_text(payload.get("body_html")),
+        "featuredImage": {"url": image["src"]} if image.get("src") else None,
+        "variants": {"edges": []},
+    }
+    if variants:
+        v = min(variants, key=lambda x: x.get("position") or 0)
+        node["variants"]["edges"].append(
+            {"node": {"sku": v.get("sku"), "barcode": v.get("barcode"), "price": {"amount": v.get("price")}}}
+        )
+    return node
+
+
+def parse_event(topic: str, payload: dict) -> tuple[str, str, dict | None]:
+    """(op, product_gid, node) – nicht aktive Produkte (draft/archived) sind im Storefront unsichtbar -> delete."""
+    op = TOPICS[topic]
+    pid = product_gid(payload)
+    if op == "delete" or (payload.get("status") or "active") != "active":
+        return "delete", pid, None
+    return "upsert", pid, admin_product_to_node(payload)
+
+
+class ProductWebhookQueue:
+    """
+    `apply(changes)`: changes = [(op, product_gid, node | None), ...], läuft im Hintergrund-Thread.
+    `reconcile()`: kompletter Abgleich (optional).
+    """
+
+    def __init__(self, apply, reconcile=None, delay: float = 2.0, max_delay: float = 10.0, reconcile_seconds: float = 0):
+        self.apply = apply
+        self.reconcile = reconcile
+        self.delay = delay
+        self.max_delay = max_delay
+        self.reconcile_seconds = reconcile_seconds
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending: dict[str, dict] = {}
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._versions: dict[str, datetime] = {}
+        self._last_reconcile = time.monotonic()
+        self._thread = None
+        self._pid = None
+        self._stats = {"received": 0, "coalesced": 0, "duplicates": 0, "outdated": 0, "applied": 0, "reconciled": 0, "errors": 0}
+
+    def submit(self, op: str, pid: str, node: dict | None, updated_at: str | None = None, webhook_id: str | None = None) -> str:
+        """'queued' | 'coalesced' | 'duplicate' | 'outdated'"""
+        self.ensure_running()
+        now = time.monotonic()
+        updated = parse_timestamp(updated_at)
+        with self._lock:
+            self._stats["received"] += 1
+            if webhook_id:
+                if webhook_id in self._seen:
+                    self._stats["duplicates"] += 1
+                    return "duplicate"
+                self._seen[webhook_id] = None
+                if len(self._seen) > MAX_SEEN_IDS:
+                    self._seen.popitem(last=False)
+
+            # als Zeitpunkte vergleichen: Shopify liefert die Shop-Zeitzone, der Offset wechselt mit der Sommerzeit
+            entry = self._pending.get(pid)
+            latest = entry["updated_at"] if entry else self._versions.get(pid)
+            if updated and latest and updated < latest:
+                self._stats["outdated"] += 1
+                return "outdated"
+
+            if entry is None:
+                self._pending[pid] = {"op": op, "node": node, "updated_at": updated, "first": now, "last": now}
+                result = "queued"
+            else:
+                entry.update(op=op, node=node, updated_at=updated or entry["updated_at"], last=now)
+                self._stats["coalesced"] += 1
+                result = "coalesced"
+        self._wake.set()
+        return result
+
+    def _take_due(self, now: float, force: bool = False) -> list[tuple]:
+        with self._lock:
+            due = [
+                pid
+                for pid, e in self._pending.items()
+                if force or now - e["last"] >= self.delay or now - e["first"] >= self.max_delay
+            ]
+            changes = []
+            for pid in due:
+                e = self._pending.pop(pid)
+                if e["updated_at"]:
+                    self._versions[pid] = e["updated_at"]
+                changes.append((e["op"], pid, e["node"]))
+            return changes
+
+    def flush(self, force: bool = False) -> int:
+        changes = self._take_due(time.monotonic(), force)
+        if not changes:
+            return 0
+        try:
+            self.apply(changes)
+        except Exception:
+            log.exception("applying %d product webhook changes failed", len(changes))
+            with self._lock:
+                self._stats["errors"] += 1
+            return 0
+        with self._lock:
+            self._stats["applied"] += len(changes)
+        return len(changes)
+
+    def reconcile_now(self):
+        if self.reconcile is None:
+            return
+        self._last_reconcile = time.monotonic()
+        try:
+            self.reconcile()
+        except Exception:
+            log.exception("product reconciliation failed")
+            with self._lock:
+                self._stats["errors"] += 1
+            return
+        with self._lock:
+            self._stats["reconciled"] += 1
+
+    def _next_wait(self, now: float) -> float | None:
+        waits = []
+        with self._lock:
+            for e in self._pending.values():
+                waits.append(min(e["last"] + self.delay, e["first"] + self.max_delay) - now)
+        if self.reconcile is not None and self.reconcile_seconds > 0:
+            waits.append(self._last_reconcile + self.reconcile_seconds - now)
+        return max(0.0, min(waits)) if waits else None
+
+    def ensure_running(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # geforkt: Lock/Event des Elternprozesses sind hier wertlos
+                self._lock = threading.Lock()
+            self._pid = os.getpid()
+            self._wake = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="product-webhooks", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._next_wait(time.monotonic()))
+            self._wake.clear()
+            self.flush()
+            if (
+                self.reconcile is not None
+                and self.reconcile_seconds > 0
+                and time.monotonic() - self._last_reconcile >= self.reconcile_seconds
+            ):
+                self.reconcile_now()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending)}
@@ -0,0 +1,124 @@
+"""
+Token-Bucket Rate-Limiting für die unauthentifizierten Auth-Endpunkte.
+
+Zwei Stores mit identischem Interface:
+- MemoryBucketStore: pro Worker, begrenzte Anzahl Keys (LRU-Eviction)
+- SQLiteBucketStore: gemeinsame Datei auf dem Host, damit Limits über alle gunicorn-Worker gelten
+"""
+from __future__ import annotations
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def parse_rate(value: str, default: str) -> tuple[int, float]:
+    """'10/60' -> (capacity=10, period=60s)."""
+    raw = (value or default).strip()
+    try:
+        capacity, period = raw.split("/", 1)
+        capacity_i, period_f = int(capacity), float(period)
+    except ValueError:
+        capacity, period = default.split("/", 1)
+        capacity_i, period_f = int(capacity), float(period)
+    return max(1, capacity_i), max(1.0, period_f)
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: int, period: float) -> float:
+    return min(float(capacity), tokens + (now - updated) * (capacity / period))
+
+
+def _retry_after(tokens: float, capacity: int, period: float, cost: float) -> int:
+    missing = cost - tokens
+    return max(1, math.ceil(missing * period / capacity))
+
+
+class MemoryBucketStore:
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, period: float, cost: float = 1.0) -> tuple[bool, int]:
+        """Zieht `cost` Tokens ab. Rückgabe: (erlaubt, Retry-After in Sekunden)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(capacity), now))
+            tokens = _refill(tokens, updated, now, capacity, period)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        if allowed:
+            return True, 0
+        return False, _retry_after(tokens, capacity, period, cost)
+
+
+class SQLiteBucketStore:
+    """
+    Host-weiter Store (alle Worker teilen sich eine SQLite-Datei im WAL-Modus).
+    Aufräumen alter Buckets passiert nebenbei alle `sweep_every` Zugriffe.
+    """
+
+    def __init__(self, path: str, max_idle_seconds: float = 3600, sweep_every: int = 500):
+        self.path = path
+        self.max_idle_seconds = max_idle_seconds
+        self.sweep_every = sweep_every
+        self._local = threading.local()
+        self._ops = 0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # nach fork (gunicorn --preload) nie die Connection des Elternprozesses weiterbenutzen
+            conn = sqlite3.connect(self.path, timeout=2.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key: str, capacity: int, period: float, cost: float = 1.0) -> tuple[bool, int]:
+        # Wall-Clock statt monotonic: Werte werden zwischen Prozessen geteilt
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (float(capacity), now)
+            tokens = _refill(tokens, updated, now, capacity, period)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            self._ops += 1
+            if self._ops % self.sweep_every == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.max_idle_seconds,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if allowed:
+            return True, 0
+        return False, _retry_after(tokens, capacity, period, cost)
+
+
+def create_store(settings):
+    if settings.rate_limit_backend == "sqlite":
+        return SQLiteBucketStore(settings.rate_limit_sqlite_path)
+    return MemoryBucketStore(max_keys=settings.rate_limit_max_keys)
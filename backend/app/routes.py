@@ -1,67 +1,273 @@
-import os
-from decimal import Decimal, ROUND_HALF_UP
 from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from functools import wraps
 import hashlib
+import contextvars
+import json
+import logging
+import os
 import secrets
-from urllib.parse import urlparse, unquote
-
-import pymysql
-import requests
-import bcrypt
-from flask import Blueprint, jsonify, request
+import threading
+import time
+
+from flask import Blueprint, Response, after_this_request, g, has_request_context, jsonify, make_response, redirect, request, send_file
+
+from .audit import create_audit_log, make_event
+from .cache import create_cache
+from .catalog_snapshot import CatalogSnapshot, write_snapshot
+from .circuit import CircuitBreaker, CircuitOpenError
+from .concurrency import max_streams, run_blocking
+from .events import JobBoard, stream as sse_stream
+from .feed_validation import get_profile, validate_feed
+from .lazy import lazy_import
+from .markets import MARKET_DEFAULTS, Market, MarketError, build_markets, resolve_codes, with_context
+from .order_export import EXPORT_QUERY, FORMATS as EXPORT_FORMATS, iter_rows, parse_range, render as render_export
+from .order_intake import STATUS_QUEUED, OrderIntakeWriter, OrderSpool, insert_order, normalize_order
+from .prefetch import PagePrefetcher
+from .product_store import (
+    CHANNELS,
+    COLUMNS,
+    COUNTRIES,
+    MAX_EANS,
+    ProductStoreError,
+    ensure_product_store_table,
+    fetch_columns,
+    normalize_ean,
+    resolve_columns,
+    resolve_scope,
+    upsert_values,
+)
+from .product_webhooks import TOPICS as WEBHOOK_TOPICS, ProductWebhookQueue, parse_event, verify_hmac
+from .ratelimit import create_store
+from .search_index import ProductSearchIndex
+from .session_tokens import RevocationList, decode_access_token, encode_access_token, is_bound_to, user_from_claims
+from .settings import get_settings
+from .thumbnails import CONTENT_TYPE as THUMB_CONTENT_TYPE
+from .thumbnails import ThumbnailCache, ThumbnailError, is_allowed_source, snap_width, thumbnail_path, verify_source
+from .tracing import KIND_CLIENT, TRACE_HEADER, FileExporter, Tracer, instrument_connection, span as trace_span, traced, traced_cursor, traceparent_header
+from .user_import import UserImportError, hash_passwords, parse_payload, validate_rows
+
+# schwere Module erst beim ersten Zugriff laden (schnellerer Worker-Start)
+pymysql = lazy_import("pymysql")
+requests = lazy_import("requests")
+bcrypt = lazy_import("bcrypt")
 
 api_bp = Blueprint("api", __name__)
+log = logging.getLogger(__name__)
+
+# Cache-Control pro Route: Admin-Daten nur privat + immer revalidieren (304 ist billig),
+# Katalog darf kurz von Browser/Proxy gehalten werden.
+CACHE_CONTROL_ADMIN = "private, no-cache"
+# Shopify-CDN-URLs sind versioniert (?v=...) -> Thumbnails ändern sich nie
+CACHE_CONTROL_THUMBS = "public, max-age=31536000, immutable"
+
+
+def products_cache_control() -> str:
+    ttl = get_settings().products_cache_ttl
+    return f"public, max-age={ttl}, stale-while-revalidate={ttl * 5}"
+
+
+# ----------------------------
+# Cache (L1 pro Worker + L2 SQLite pro Host, siehe cache.py)
+# ----------------------------
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache(get_settings())
+    return _cache
+
+
+# ----------------------------
+# Tracing (Span pro Request, Export als OTLP-JSON in eine rotierende Datei)
+# ----------------------------
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                settings = get_settings()
+                exporter = None
+                if settings.trace_sample_rate > 0 or settings.trace_parent_based:
+                    exporter = FileExporter(settings.trace_file, settings.trace_file_max_bytes, settings.trace_file_backups)
+                _tracer = Tracer(exporter, settings.trace_sample_rate, settings.trace_parent_based)
+    return _tracer
+
+
+@api_bp.before_app_request
+def start_request_trace():
+    trace_id, root = get_tracer().start_request(request.headers.get("traceparent"))
+    if root is not None:
+        root.name = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        root.set("http.method", request.method)
+        root.set("http.target", request.path)
+        root.set("net.peer.ip", get_request_meta()[0])
+    g.trace = (trace_id, root)
+
+
+@api_bp.after_app_request
+def add_trace_headers(resp):
+    trace_id, root = g.get("trace") or (None, None)
+    if trace_id:
+        resp.headers[TRACE_HEADER] = trace_id
+        resp.headers["traceparent"] = traceparent_header(trace_id, root.span_id if root else None, root is not None)
+        if root is not None:
+            root.set("http.status_code", resp.status_code)
+    return resp
+
 
-SESSION_COOKIE_NAME = os.getenv("SESSION_COOKIE_NAME", "np_session")
-SESSION_TTL_DAYS = int(os.getenv("SESSION_TTL_DAYS", "30"))
+@api_bp.teardown_app_request
+def finish_request_trace(exc):
+    _trace_id, root = g.pop("trace", None) or (None, None)
+    if root is not None:
+        status = root.attributes.get("http.status_code")
+        get_tracer().finish_request(root, status, exc)
 
 
 # ----------------------------
 # DB Helper (Raw SQL via PyMySQL)
 # ----------------------------
-def get_conn():
-    host = os.getenv("MYSQLHOST")
-    user = os.getenv("MYSQLUSER")
-    password = os.getenv("MYSQLPASSWORD")
-    database = os.getenv("MYSQLDATABASE")
-    port = int(os.getenv("MYSQLPORT", "3306"))
-
-    # Fallback: Railway gibt oft nur MYSQL_URL/MYSQL_PUBLIC_URL (oder DATABASE_URL) mit.
-    if not all([host, user, password, database]):
-        url = (os.getenv("MYSQL_URL") or os.getenv("MYSQL_PUBLIC_URL") or os.getenv("DATABASE_URL") or "").strip()
-        if url:
-            # SQLAlchemy-Style URLs tolerieren
-            if url.startswith("mysql+pymysql://"):
-                url = url.replace("mysql+pymysql://", "mysql://", 1)
-            parsed = urlparse(url)
-            if parsed.scheme.startswith("mysql"):
-                host = parsed.hostname or host
-                user = unquote(parsed.username) if parsed.username else user
-                password = unquote(parsed.password) if parsed.password else password
-                db_from_path = (parsed.path or "").lstrip("/")
-                database = db_from_path or database
-                port = parsed.port or port
-
-    if not all([host, user, password, database]):
+def _connect(target, role: str):
+    settings = get_settings()
+    conn = pymysql.connect(
+        host=target.host,
+        user=target.user,
+        password=target.password,
+        database=target.database,
+        port=target.port,
+        charset="utf8mb4",
+        cursorclass=traced_cursor(pymysql.cursors.DictCursor),
+        autocommit=False,
+        connect_timeout=5,
+        read_timeout=settings.db_read_timeout_seconds or None,
+        write_timeout=settings.db_read_timeout_seconds or None,
+    )
+    conn.np_role = role
+    instrument_connection(conn)
+    if settings.db_statement_timeout_ms:
+        set_statement_timeout(conn, settings.db_statement_timeout_ms)
+    return conn
+
+
+def set_statement_timeout(conn, timeout_ms: int):
+    """
+    Obergrenze für SELECTs dieser Connection (MySQL: MAX_EXECUTION_TIME, MariaDB: max_statement_time).
+    Handler mit bewusst langen Abfragen (Exporte) setzen hier einen höheren Wert.
+    """
+    with conn.cursor() as cur:
+        try:
+            cur.execute("SET SESSION MAX_EXECUTION_TIME = %s", (int(timeout_ms),))
+        except pymysql.err.MySQLError:
+            try:
+                cur.execute("SET SESSION max_statement_time = %s", (timeout_ms / 1000.0,))
+            except pymysql.err.MySQLError:
+                pass  # Server kennt keins von beiden -> nur Socket-Timeout
+
+
+def get_conn(role: str = "writer"):
+    """
+    role="reader": Read-Replica (MYSQL_READER_URL), falls konfiguriert, gesund und der
+    Client nicht gerade selbst geschrieben hat (read-your-writes). Sonst immer Primary.
+    Nur für Handler verwenden, die ausschließlich lesen.
+    """
+    settings = get_settings()
+    if role == "reader" and settings.mysql_reader is not None and not read_your_writes_active():
+        conn = _get_reader_conn(settings)
+        if conn is not None:
+            return conn
+
+    target = settings.mysql
+    if target is None:
         raise RuntimeError(
             "Missing MySQL connection vars. Provide either MYSQLHOST/MYSQLUSER/MYSQLPASSWORD/MYSQLDATABASE "
             "or MYSQL_URL/MYSQL_PUBLIC_URL."
         )
+    return _connect(target, "writer")
 
-    return pymysql.connect(
-        host=host,
-        user=user,
-        password=password,
-        database=database,
-        port=port,
-        charset="utf8mb4",
-        cursorclass=pymysql.cursors.DictCursor,
-        autocommit=False,
-    )
+
+def is_reader(conn) -> bool:
+    return getattr(conn, "np_role", "writer") == "reader"
+
+
+# Replica-Zustand pro Worker: nach einem Fehler / zu viel Lag wird replica_check_seconds
+# lang direkt der Primary genutzt, danach erneut geprüft.
+_replica_state = {"checked_at": float("-inf"), "usable": True}
+_replica_lock = threading.Lock()
+
+
+def _get_reader_conn(settings):
+    now = time.monotonic()
+    with _replica_lock:
+        state = dict(_replica_state)
+    due = now - state["checked_at"] >= settings.replica_check_seconds
+    if not state["usable"] and not due:
+        return None
+
+    try:
+        conn = _connect(settings.mysql_reader, "reader")
+    except pymysql.err.MySQLError:
+        _set_replica_state(now, usable=False)
+        return None
+
+    if due:
+        usable = replica_lag_ok(conn, settings.replica_max_lag_seconds)
+        _set_replica_state(now, usable=usable)
+        if not usable:
+            conn.close()
+            return None
+    return conn
+
+
+def _set_replica_state(now: float, usable: bool):
+    with _replica_lock:
+        _replica_state.update({"checked_at": now, "usable": usable})
+
+
+def replica_lag_ok(conn, max_lag_seconds: int) -> bool:
+    try:
+        with conn.cursor() as cur:
+            try:
+                cur.execute("SHOW REPLICA STATUS")
+            except pymysql.err.ProgrammingError:
+                # MySQL < 8.0.22
+                cur.execute("SHOW SLAVE STATUS")
+            row = cur.fetchone()
+    except pymysql.err.MySQLError:
+        # keine REPLICATION CLIENT-Rechte: Lag nicht prüfbar -> Replica trotzdem nutzen
+        return True
+
+    if not row:
+        # kein klassisches Replica-Setup (z.B. Proxy/Read-Endpoint) -> nichts zu prüfen
+        return True
+    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+    # NULL = Replikation steht
+    return lag is not None and int(lag) <= max_lag_seconds
+
+
+def read_your_writes_active() -> bool:
+    return has_request_context() and bool(request.cookies.get(rw_cookie_name()))
 
 
-def money(v) -> Decimal:
-    return Decimal(str(v or "0")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+def rw_cookie_name() -> str:
+    return f"{get_settings().session_cookie_name}_rw"
+
+
+@api_bp.after_request
+def stick_to_primary_after_write(resp):
+    """Nach erfolgreichen Schreib-Requests liest derselbe Client kurz nur vom Primary."""
+    settings = get_settings()
+    if settings.mysql_reader is not None and request.method in ("POST", "PUT", "PATCH", "DELETE") and resp.status_code < 400:
+        resp.set_cookie(rw_cookie_name(), "1", max_age=settings.read_your_writes_seconds, **cookie_options())
+    return resp
 
 
 def require_field(obj: dict, name: str) -> str:
@@ -75,15 +281,37 @@ def normalize_email(email: str) -> str:
     return (email or "").strip().lower()
 
 
+def hash_password(password: str) -> str:
+    with trace_span("bcrypt.hashpw"):
+        return run_blocking(lambda: bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8"))
+
+
+def check_password(password: str, stored_hash: str) -> bool:
+    """ValueError bei Hashes, die nicht im bcrypt-Format sind."""
+    with trace_span("bcrypt.checkpw"):
+        return run_blocking(bcrypt.checkpw, password.encode("utf-8"), stored_hash.encode("utf-8"))
+
+
 def token_sha256(token: str) -> str:
     return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
+_auth_tables_ready = False
+
+
 def ensure_auth_tables(conn):
     """
     Lightweight 'migration': stellt sicher, dass die Sessions-Tabelle existiert.
     (Railway/MySQL: keine Migration-Tooling im Repo)
+    Läuft vor jeder Mutation (Auth-Check) – legt daher auch data_versions an, denn
+    CREATE TABLE committet implizit und darf nicht mitten in einer Schreib-Transaktion passieren.
+    Auf Reader-Connections no-op: Schema kommt per Replikation vom Primary.
+    Einmal pro Prozess – danach kostet der Aufruf keine Query mehr.
     """
+    global _auth_tables_ready
+    if _auth_tables_ready or is_reader(conn):
+        return
+    ensure_version_table(conn)
     with conn.cursor() as cur:
         cur.execute(
             """
@@ -102,49 +330,48 @@ def ensure_auth_tables(conn):
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
             """
         )
+        # Access-Tokens eines Users, die vor revoked_at ausgestellt wurden, sind ungültig
+        # (z. B. nach Abteilungswechsel) – von allen Workern über RevocationList.sync gelesen
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_token_revocations (
+              user_id INT NOT NULL PRIMARY KEY,
+              revoked_at DATETIME(3) NOT NULL,
+              CONSTRAINT fk_utr_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+              INDEX idx_utr_revoked (revoked_at)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """
+        )
+    _auth_tables_ready = True
 
 
-def set_session_cookie(resp, token: str):
-    secure = (os.getenv("COOKIE_SECURE") or "").strip().lower() in (
-        "1",
-        "true",
-        "yes",
-        "on",
-        # tolerant (falls jemand DE-Werte setzt)
-        "ja",
-        "treu",
-        "wahr",
-    )
-    cookie_samesite = (os.getenv("COOKIE_SAMESITE") or "").strip()
-    # Für getrennte Frontend/Backend-Domains (Railway) braucht es oft SameSite=None + Secure
-    if cookie_samesite:
-        s = cookie_samesite.strip().lower()
-        if s == "none":
-            samesite = "None"
-        elif s == "lax":
-            samesite = "Lax"
-        elif s == "strict":
-            samesite = "Strict"
-        else:
-            # ungewohnter Wert: unverändert durchreichen (kann dann von Werkzeug abgelehnt werden)
-            samesite = cookie_samesite
-    else:
-        samesite = "None" if secure else "Lax"
-    max_age = int(timedelta(days=SESSION_TTL_DAYS).total_seconds())
-    resp.set_cookie(
-        SESSION_COOKIE_NAME,
-        token,
-        max_age=max_age,
-        httponly=True,
-        secure=secure,
-        samesite=samesite,
-        path="/",
-    )
+def cookie_options() -> dict:
+    settings = get_settings()
+    return {"httponly": True, "secure": settings.cookie_secure, "samesite": settings.cookie_samesite, "path": "/"}
+
+
+def set_session_cookie(resp, token: str | None, user: dict | None = None, session_id: int | None = None):
+    """
+    Setzt das DB-Session-Cookie (token) und – im JWT-Modus, wenn user/session_id bekannt –
+    zusätzlich das kurzlebige Access-Cookie, gebunden an das neue bzw. mitgeschickte Session-Cookie.
+    """
+    settings = get_settings()
+    opts = cookie_options()
+    if token:
+        max_age = int(timedelta(days=settings.session_ttl_days).total_seconds())
+        resp.set_cookie(settings.session_cookie_name, token, max_age=max_age, **opts)
+    session_token = token or request.cookies.get(settings.session_cookie_name)
+    if user and session_id and session_token and settings.session_tokens_enabled:
+        ttl = settings.session_jwt_ttl_seconds
+        access = encode_access_token(user, session_id, settings.session_jwt_secret, ttl, session_token=session_token)
+        resp.set_cookie(settings.access_cookie_name, access, max_age=ttl, **opts)
     return resp
 
 
 def clear_session_cookie(resp):
-    resp.delete_cookie(SESSION_COOKIE_NAME, path="/")
+    settings = get_settings()
+    resp.delete_cookie(settings.session_cookie_name, path="/")
+    resp.delete_cookie(settings.access_cookie_name, path="/")
     return resp
 
 
@@ -154,41 +381,150 @@ def get_request_meta():
     return ip, ua
 
 
-def get_current_user(conn):
-    token = request.cookies.get(SESSION_COOKIE_NAME)
-    if not token:
-        return None, None
+# ----------------------------
+# Stateless Sessions (SESSION_MODE=jwt)
+# ----------------------------
+_revocations = None
+_revocations_lock = threading.Lock()
+
+
+def get_revocations() -> RevocationList:
+    global _revocations
+    if _revocations is None:
+        with _revocations_lock:
+            if _revocations is None:
+                settings = get_settings()
+                _revocations = RevocationList(
+                    window_seconds=settings.session_jwt_ttl_seconds + 2 * settings.session_revocation_sync_seconds,
+                    sync_interval=settings.session_revocation_sync_seconds,
+                )
+    return _revocations
 
-    ensure_auth_tables(conn)
-    th = token_sha256(token)
 
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT s.id AS session_id, s.user_id, u.email, u.first_name, u.last_name, u.department_id, u.is_owner, u.is_active,
-                   d.name AS department_name
-            FROM user_sessions s
-            JOIN users u ON u.id = s.user_id
-            LEFT JOIN departments d ON d.id = u.department_id
-            WHERE s.token_hash = %s AND s.revoked_at IS NULL
-            LIMIT 1
-            """,
-            (th,),
-        )
-        row = cur.fetchone()
+def get_token_user(conn=None):
+    """
+    User aus dem Access-Cookie – ohne DB. Ist die Revocation-Liste fällig und keine
+    Connection da, wird (None, None) geliefert und der Aufrufer fällt auf den DB-Pfad zurück.
+    """
+    settings = get_settings()
+    if not settings.session_tokens_enabled:
+        return None, None
+    access = request.cookies.get(settings.access_cookie_name)
+    session_token = request.cookies.get(settings.session_cookie_name)
+    if not access or not session_token:
+        return None, None
 
-    if not row:
+    claims = decode_access_token(access, settings.session_jwt_secret)
+    # ein Access-Token zu einem anderen (oder erfundenen) Session-Cookie zählt nicht
+    if not claims or not is_bound_to(claims, session_token, settings.session_jwt_secret):
         return None, None
 
-    if int(row.get("is_active") or 0) != 1:
+    revocations = get_revocations()
+    if revocations.needs_sync():
+        if conn is None:
+            return None, None
+        try:
+            revocations.sync(conn)
+        except pymysql.err.ProgrammingError:
+            return None, None  # Tabellen (noch) nicht da -> DB-Pfad
+    if revocations.is_revoked(claims):
         return None, None
 
-    # touch session
+    return user_from_claims(claims), int(claims["sid"])
+
+
+def revoke_user_tokens(cur, user_id: int):
+    """
+    Access-Tokens des Users ab jetzt ungültig – in der laufenden Transaktion, damit es alle
+    Worker (und Hosts) beim nächsten Revocation-Sync sehen. Nach dem Commit zusätzlich
+    get_revocations().revoke_user() für diesen Prozess sofort.
+    """
+    cur.execute(
+        """
+        INSERT INTO user_token_revocations (user_id, revoked_at) VALUES (%s, NOW(3))
+        ON DUPLICATE KEY UPDATE revoked_at = VALUES(revoked_at)
+        """,
+        (user_id,),
+    )
+
+
+def get_cached_permissions(user: dict):
+    """Permission-Keys der Abteilung aus dem Prozess-Cache, None bei Miss."""
+    department_id = user.get("departmentId")
+    if not department_id:
+        return []
+    cache = get_cache()
+    return cache.get(cache.key("perms", department_id))
+
+
+def cache_permissions(user: dict, perms: list[str]):
+    department_id = user.get("departmentId")
+    if department_id:
+        cache = get_cache()
+        cache.set(cache.key("perms", department_id), perms, get_settings().permissions_cache_ttl)
+
+
+def invalidate_permissions():
+    # Namespace-Version hochzählen: gilt für alle Worker auf dem Host
+    get_cache().bump("perms")
+
+
+# Auth-Kontext pro Request: Session + User + Abteilung + Permission-Keys in genau einer Query,
+# danach auf flask.g gemerkt (get_current_user/require_admin/@requires fragen nicht erneut).
+# Die Session wird nur angefasst (last_seen_at), wenn der letzte Touch länger als
+# SESSION_TOUCH_SECONDS her ist.
+SESSION_TOUCH_SECONDS = 60
+
+AUTH_CONTEXT_QUERY = """
+SELECT s.id AS session_id, s.user_id, u.email, u.first_name, u.last_name, u.department_id, u.is_owner, u.is_active,
+       d.name AS department_name,
+       s.last_seen_at < NOW() - INTERVAL %s SECOND AS needs_touch,
+       GROUP_CONCAT(DISTINCT p.key_name ORDER BY p.key_name SEPARATOR ',') AS permission_keys
+FROM user_sessions s
+JOIN users u ON u.id = s.user_id
+LEFT JOIN departments d ON d.id = u.department_id
+LEFT JOIN department_permissions dp ON dp.department_id = u.department_id
+LEFT JOIN permissions p ON p.id = dp.permission_id
+WHERE s.token_hash = %s AND s.revoked_at IS NULL
+GROUP BY s.id
+LIMIT 1
+"""
+
+_NO_AUTH = (None, None, [])
+
+
+def get_auth_context(conn):
+    """(user, session_id, permissions) oder (None, None, []) – pro Request nur einmal aufgelöst."""
+    if "auth_context" not in g:
+        g.auth_context = _load_auth_context(conn)
+    return g.auth_context
+
+
+def _load_auth_context(conn):
+    settings = get_settings()
+    token = request.cookies.get(settings.session_cookie_name)
+    if not token:
+        return _NO_AUTH
+
+    if settings.session_tokens_enabled:
+        user, session_id = get_token_user(conn)
+        if user:
+            perms = get_cached_permissions(user)
+            if perms is not None:
+                return user, session_id, perms
+
+    ensure_auth_tables(conn)
     with conn.cursor() as cur:
-        cur.execute(
-            "UPDATE user_sessions SET last_seen_at = NOW() WHERE id = %s",
-            (row["session_id"],),
-        )
+        cur.execute(AUTH_CONTEXT_QUERY, (SESSION_TOUCH_SECONDS, token_sha256(token)))
+        row = cur.fetchone()
+
+    if not row or int(row.get("is_active") or 0) != 1:
+        return _NO_AUTH
+
+    # touch session (nicht auf der Replica – die ist read-only)
+    if row.get("needs_touch") and not is_reader(conn):
+        with conn.cursor() as cur:
+            cur.execute("UPDATE user_sessions SET last_seen_at = NOW() WHERE id = %s", (row["session_id"],))
 
     user = {
         "id": row["user_id"],
@@ -200,72 +536,374 @@ def get_current_user(conn):
         "isOwner": bool(row.get("is_owner")),
         "isActive": bool(row.get("is_active")),
     }
+    perms = [k for k in (row.get("permission_keys") or "").split(",") if k] if user["departmentId"] else []
+    cache_permissions(user, perms)
 
-    return user, row["session_id"]
+    if settings.session_tokens_enabled:
+        # transparenter Refresh: frisches Access-Cookie an die Response hängen
+        @after_this_request
+        def _refresh_access_cookie(resp):
+            return set_session_cookie(resp, None, user=user, session_id=row["session_id"])
 
+    return user, row["session_id"], perms
 
-def get_user_permissions(conn, user_id: int) -> list[str]:
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT p.key_name
-            FROM users u
-            JOIN department_permissions dp ON dp.department_id = u.department_id
-            JOIN permissions p ON p.id = dp.permission_id
-            WHERE u.id = %s
-            ORDER BY p.key_name
-            """,
-            (user_id,),
-        )
-        rows = cur.fetchall() or []
-    return [r["key_name"] for r in rows if r.get("key_name")]
 
+def get_current_user(conn):
+    user, session_id, _perms = get_auth_context(conn)
+    return user, session_id
 
-def require_owner(conn):
-    user, _sid = get_current_user(conn)
+
+def has_permission(user: dict, perms: list[str], permission: str | None) -> bool:
+    if permission is None or user.get("isOwner"):
+        return True
+    if permission == "owner":
+        return False
+    return permission in perms
+
+
+def check_access(conn, permission: str | None):
+    """(user, None) oder (None, Fehler-Response) – 401 ohne Login, 403 ohne Permission."""
+    user, _sid, perms = get_auth_context(conn)
     if not user:
         return None, (jsonify({"error": "unauthorized"}), 401)
-    if not user.get("isOwner"):
+    if not has_permission(user, perms, permission):
         return None, (jsonify({"error": "forbidden"}), 403)
     return user, None
 
 
+class LazyConnection:
+    """
+    Verbindet erst beim ersten Zugriff (get_conn(role)). Auth über Access-Token + gecachte
+    Permissions und Handler ohne g.db öffnen so gar keine Connection.
+    """
+
+    def __init__(self, role: str):
+        self.role = role
+        self._conn = None
+
+    @property
+    def opened(self) -> bool:
+        return self._conn is not None
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            self._conn = get_conn(self.role)
+        return getattr(self._conn, name)
+
+    def commit(self):
+        if self._conn is not None:
+            self._conn.commit()
+
+    def rollback(self):
+        if self._conn is not None:
+            self._conn.rollback()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+
+def requires(permission: str | None = None, db: str | None = None):
+    """
+    @requires("admin_panel") – Login + Permission prüfen (Owner dürfen alles, "owner" = nur Owner,
+    None = nur eingeloggt). Stellt dem Handler g.db bereit (GET -> Reader, sonst Writer; verbunden
+    wird erst bei Bedarf), legt g.user / g.session_id / g.permissions ab und schließt die
+    Connection nach dem Handler.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            conn = LazyConnection(db or ("reader" if request.method in ("GET", "HEAD") else "writer"))
+            try:
+                user, err = check_access(conn, permission)
+                if err:
+                    conn.commit()
+                    return err
+                g.db = conn
+                g.user = user
+                _user, g.session_id, g.permissions = get_auth_context(conn)
+                return fn(*args, **kwargs)
+            finally:
+                g.pop("db", None)
+                conn.close()
+
+        return wrapper
+
+    return decorator
+
+
+def require_owner(conn):
+    return check_access(conn, "owner")
+
+
 def require_admin(conn):
-    user, _sid = get_current_user(conn)
-    if not user:
-        return None, (jsonify({"error": "unauthorized"}), 401)
-    if user.get("isOwner"):
-        return user, None
+    return check_access(conn, "admin_panel")
 
-    perms = get_user_permissions(conn, user["id"]) if user.get("departmentId") else []
-    if "admin_panel" not in perms:
-        return None, (jsonify({"error": "forbidden"}), 403)
 
-    return user, None
+# ----------------------------
+# Rate-Limiting (Login/Registrierung, vor DB + bcrypt)
+# ----------------------------
+_rate_store = None
+_rate_store_lock = threading.Lock()
+
+
+def get_rate_store():
+    global _rate_store
+    if _rate_store is None:
+        with _rate_store_lock:
+            if _rate_store is None:
+                _rate_store = create_store(get_settings())
+    return _rate_store
+
+
+def throttle_auth(scope: str, email: str | None):
+    """
+    Token-Buckets pro IP und pro E-Mail. Gibt eine 429-Response (mit Retry-After) zurück
+    oder None. Muss vor get_conn()/bcrypt aufgerufen werden.
+    """
+    settings = get_settings()
+    if not settings.auth_rate_limit:
+        return None
+
+    ip, _ua = get_request_meta()
+    checks = [(f"{scope}:ip:{ip or '-'}", settings.auth_rate_ip)]
+    if email:
+        checks.append((f"{scope}:email:{token_sha256(email)[:16]}", settings.auth_rate_email))
+
+    store = get_rate_store()
+    for key, (capacity, period) in checks:
+        try:
+            allowed, retry_after = store.take(key, capacity, period)
+        except Exception:
+            # Limiter-Probleme (z.B. SQLite gelockt) dürfen Logins nicht blockieren
+            continue
+        if not allowed:
+            resp = jsonify({"error": "too_many_requests", "retryAfter": retry_after})
+            resp.status_code = 429
+            resp.headers["Retry-After"] = str(retry_after)
+            return resp
+    return None
+
+
+# ----------------------------
+# Audit-Log (Write-Behind, siehe audit.py)
+# ----------------------------
+_audit_log = None
+_audit_log_lock = threading.Lock()
+
+
+def get_audit_log():
+    """None, wenn AUDIT_LOG aus ist."""
+    global _audit_log
+    settings = get_settings()
+    if not settings.audit_enabled:
+        return None
+    if _audit_log is None:
+        with _audit_log_lock:
+            if _audit_log is None:
+                _audit_log = create_audit_log(
+                    settings,
+                    lambda: _connect(get_settings().mysql, "writer"),
+                    # von MySQL abgelehnte Einzel-Events -> Dead-Letter-Datei; alles andere = DB-Ausfall
+                    permanent_errors=(pymysql.err.IntegrityError, pymysql.err.DataError, ValueError),
+                )
+    return _audit_log
+
+
+def audit(action: str, actor: dict | None = None, target_type: str | None = None, target_id=None, **detail):
+    """Nach dem Commit aufrufen; kostet nur ein Queue-put."""
+    audit_log = get_audit_log()
+    if audit_log is None:
+        return
+    ip = get_request_meta()[0] if has_request_context() else None
+    audit_log.emit(make_event(action, actor["id"] if actor else None, target_type, target_id, ip, detail))
+
+
+# ----------------------------
+# HTTP-Caching (ETag / Conditional GET)
+# ----------------------------
+_data_versions_ready = False
+
+
+def ensure_version_table(conn):
+    """
+    Generationszähler pro Ressource (departments, users, permissions, ...).
+    Mutationen zählen im selben Commit hoch; GETs vergleichen nur den Zähler (PK-Lookup)
+    und können so vor der eigentlichen Abfrage mit 304 antworten.
+    Bei manuellen Änderungen direkt in der DB: data_versions.version ebenfalls erhöhen.
+    """
+    global _data_versions_ready
+    if _data_versions_ready or is_reader(conn):
+        return
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS data_versions (
+              name VARCHAR(64) NOT NULL PRIMARY KEY,
+              version BIGINT NOT NULL DEFAULT 0,
+              updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """
+        )
+    _data_versions_ready = True
+
+
+def get_data_versions(conn, *names: str) -> dict:
+    ensure_version_table(conn)
+    placeholders = ",".join(["%s"] * len(names))
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT name, version FROM data_versions WHERE name IN ({placeholders})", names)
+            rows = cur.fetchall() or []
+    except pymysql.err.ProgrammingError:
+        if not is_reader(conn):
+            raise
+        # Tabelle noch nicht auf die Replica repliziert
+        rows = []
+    versions = {n: 0 for n in names}
+    versions.update({r["name"]: int(r["version"]) for r in rows})
+    return versions
+
+
+def bump_data_version(conn, *names: str):
+    # Tabelle existiert bereits (ensure_auth_tables lief vor der Mutation)
+    with conn.cursor() as cur:
+        cur.executemany(
+            """
+            INSERT INTO data_versions (name, version) VALUES (%s, 1)
+            ON DUPLICATE KEY UPDATE version = version + 1
+            """,
+            [(n,) for n in names],
+        )
+
+
+def make_etag(*parts) -> str:
+    raw = "|".join(str(p) for p in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def not_modified(etag: str, cache_control: str):
+    """304-Response, falls If-None-Match den aktuellen ETag enthält – sonst None."""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    resp = make_response("", 304)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = cache_control
+    return resp
+
+
+def with_cache_headers(resp, etag: str, cache_control: str):
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = cache_control
+    return resp
 
 
 # ----------------------------
 # Shopify (wie bisher)
 # ----------------------------
-def shopify_graphql(query: str, variables: dict | None = None):
-    domain = os.getenv("SHOPIFY_STORE_DOMAIN")
-    token = os.getenv("SHOPIFY_STOREFRONT_TOKEN")
+# ein Breaker pro Store-Domain (Länder mit eigenem Store fallen unabhängig aus)
+_shopify_breakers: dict[str, CircuitBreaker] = {}
+_shopify_breaker_lock = threading.Lock()
+
+
+def get_shopify_breaker(domain: str | None = None) -> CircuitBreaker:
+    settings = get_settings()
+    domain = domain or settings.shopify_store_domain
+    breaker = _shopify_breakers.get(domain)
+    if breaker is None:
+        with _shopify_breaker_lock:
+            breaker = _shopify_breakers.get(domain)
+            if breaker is None:
+                breaker = _shopify_breakers[domain] = CircuitBreaker(
+                    "shopify" if domain == settings.shopify_store_domain else f"shopify:{domain}",
+                    failure_threshold=settings.shopify_breaker_failures,
+                    window=settings.shopify_breaker_window,
+                    slow_seconds=settings.shopify_slow_seconds,
+                    open_seconds=settings.shopify_breaker_open_seconds,
+                    timeout=settings.shopify_timeout_seconds,
+                    probe_timeout=settings.shopify_probe_timeout_seconds,
+                )
+    return breaker
+
+
+# eine Session pro Prozess: Keep-Alive statt TLS-Handshake pro Call; der urllib3-Pool ist
+# thread-sicher. Nach fork neu, sonst teilen sich Worker die Sockets des Masters.
+_http_session: tuple = (None, None)
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    global _http_session
+    pid, session = _http_session
+    if pid != os.getpid():
+        with _http_session_lock:
+            pid, session = _http_session
+            if pid != os.getpid():
+                size = get_settings().shopify_http_pool_size
+                session = requests.Session()
+                session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=len(MARKET_DEFAULTS), pool_maxsize=size))
+                _http_session = (os.getpid(), session)
+    return session
+
+
+_markets_memo: tuple = (None, {})
+
+
+def get_markets() -> dict[str, Market]:
+    global _markets_memo
+    settings = get_settings()
+    if _markets_memo[0] is not settings:
+        credentials = {code: (domain, token) for code, domain, token in settings.shopify_markets}
+        _markets_memo = (settings, build_markets(settings.shopify_store_domain, settings.shopify_storefront_token, credentials))
+    return _markets_memo[1]
+
+
+def get_market(raw: str | None) -> Market | None:
+    """?country=AT -> Market; ohne Angabe None (Standard-Store ohne @inContext)."""
+    if not raw:
+        return None
+    market = get_markets().get(raw.strip().upper())
+    if market is None:
+        raise MarketError(f"unknown market: {raw}")
+    return market
+
+
+@traced("shopify.graphql", KIND_CLIENT)
+def shopify_graphql(query: str, variables: dict | None = None, market: Market | None = None):
+    settings = get_settings()
+    domain = market.domain if market else settings.shopify_store_domain
+    token = market.token if market else settings.shopify_storefront_token
 
     if not domain or not token:
         raise RuntimeError("Missing SHOPIFY_STORE_DOMAIN or SHOPIFY_STOREFRONT_TOKEN")
 
-    url = f"https://{domain}/api/2024-07/graphql.json"
+    if market:
+        query = with_context(query)
+        variables = {**(variables or {}), **market.context_variables}
+
+    url = f"https://{domain}/api/{settings.shopify_api_version}/graphql.json"
     headers = {
         "Content-Type": "application/json",
         "X-Shopify-Storefront-Access-Token": token,
     }
 
-    resp = requests.post(
-        url,
-        json={"query": query, "variables": variables or {}},
-        headers=headers,
-        timeout=20,
-    )
+    breaker = get_shopify_breaker(domain)
+    timeout = breaker.before_call()
+    started = time.monotonic()
+    try:
+        resp = get_http_session().post(
+            url,
+            json={"query": query, "variables": variables or {}},
+            headers=headers,
+            timeout=timeout,
+        )
+        # 5xx / 429 = Shopify hat ein Problem; andere 4xx sind unsere (zählen nicht gegen den Breaker)
+        healthy = resp.status_code < 500 and resp.status_code != 429
+    except requests.RequestException:
+        breaker.record(False, time.monotonic() - started)
+        raise
+    breaker.record(healthy, time.monotonic() - started)
     resp.raise_for_status()
     payload = resp.json()
 
@@ -275,10 +913,41 @@ def shopify_graphql(query: str, variables: dict | None = None):
     return payload["data"]
 
 
+def shopify_graphql_or_stale(query: str, variables: dict | None = None, market: Market | None = None) -> tuple[dict, bool]:
+    """
+    (data, stale). Jede erfolgreiche Antwort wird als "last known good" pro Query (und Markt)
+    abgelegt; ist der Breaker offen oder Shopify nicht erreichbar, kommt diese zurück (stale=True).
+    """
+    cache = get_cache()
+    digest = hashlib.sha256(json.dumps([query, variables], sort_keys=True).encode("utf-8")).hexdigest()
+    key = cache.key("shopify_lkg", market.code if market else "", digest)
+    try:
+        data = shopify_graphql(query, variables, market)
+    except (CircuitOpenError, requests.RequestException):
+        cached = cache.get(key)
+        if cached is None:
+            raise
+        return cached, True
+    cache.set(key, data, get_settings().shopify_stale_ttl)
+    return data, False
+
+
+def shopify_unavailable(error: Exception):
+    resp = jsonify({"error": "upstream_unavailable", "detail": str(error)})
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        resp.headers["Retry-After"] = str(max(1, int(retry_after)))
+    return resp, 503
+
+
 def map_shopify_product(node: dict) -> dict:
     v_edges = node.get("variants", {}).get("edges", [])
     v = v_edges[0]["node"] if v_edges else {}
 
+    image = (node.get("featuredImage") or {}).get("url") or ""
+    settings = get_settings()
+    allowed = image and is_allowed_source(image, settings.thumb_allowed_hosts, settings.thumb_allowed_path_prefix)
+
     return {
         "id": node.get("id", ""),
         "title": node.get("title", ""),
@@ -286,77 +955,935 @@ def map_shopify_product(node: dict) -> dict:
         "ean": v.get("barcode") or "",
         "price": float((v.get("price") or {}).get("amount") or 0),
         "description": node.get("description") or "",
-        "image": (node.get("featuredImage") or {}).get("url") or "",
+        "image": image,
+        "thumbnail": thumbnail_path(image, secret=settings.thumb_signing_secret) if allowed else image,
     }
 
 
-@api_bp.get("/products")
-def list_products():
-    query = """
-    query Products($first: Int!) {
-      products(first: $first) {
-        edges {
-          node {
-            id
-            title
-            description
-            featuredImage { url }
-            variants(first: 1) {
-              edges {
-                node {
-                  sku
-                  barcode
-                  price { amount }
-                }
-              }
-            }
-          }
-        }
-      }
-    }
+# Katalog-Version = Hash der zuletzt geladenen Produktliste; innerhalb von products_cache_ttl
+# wird If-None-Match ohne Shopify-Call beantwortet (geteilt über alle Worker, siehe get_cache()).
+@api_bp.get("/products")
+def list_products():
+    query = """
+    query Products($first: Int!) {
+      products(first: $first) {
+        edges {
+          node {
+            id
+            title
+            description
+            featuredImage { url }
+            variants(first: 1) {
+              edges {
+                node {
+                  sku
+                  barcode
+                  price { amount }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+    """
+    try:
+        market = get_market(request.args.get("country"))
+    except MarketError as e:
+        return jsonify({"error": "bad_request", "detail": str(e)}), 400
+
+    cache_control = products_cache_control()
+    cache = get_cache()
+    cache_key = cache.key("products", "list", market.code if market else "")
+    cached = cache.get(cache_key)
+
+    if cached is not None:
+        resp = not_modified(cached["version"], cache_control)
+        if resp is not None:
+            return resp
+        items, version = cached["items"], cached["version"]
+    else:
+        try:
+            data, stale = shopify_graphql_or_stale(query, {"first": 20}, market)
+        except (CircuitOpenError, requests.RequestException) as e:
+            return shopify_unavailable(e)
+        items = [map_shopify_product(edge["node"]) for edge in data["products"]["edges"]]
+        if stale:
+            # nicht cachen und nicht per ETag festschreiben – beim nächsten Request neu versuchen
+            resp = jsonify({"items": items, "stale": True})
+            resp.headers["Cache-Control"] = "no-store"
+            return resp
+        if market is None:
+            # lokaler Suchindex = Standard-Store (Preise der Länder-Märkte nicht mischen)
+            get_search_index().upsert_many(items)
+        version = make_etag("products", market.code if market else "", json.dumps(items, sort_keys=True))
+        cache.set(cache_key, {"version": version, "items": items}, get_settings().products_cache_ttl)
+
+        resp = not_modified(version, cache_control)
+        if resp is not None:
+            return resp
+
+    return with_cache_headers(jsonify({"items": items}), version, cache_control)
+
+
+SEARCH_PRODUCTS_QUERY = """
+query Products($first: Int!, $after: String, $query: String) {
+  products(first: $first, after: $after, query: $query) {
+    pageInfo { hasNextPage endCursor }
+    edges {
+      node {
+        id
+        title
+        description
+        featuredImage { url }
+        variants(first: 1) {
+          edges {
+            node {
+              sku
+              barcode
+              price { amount }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# "Mehr laden" im BestellCockpit folgt pageInfo.endCursor -> nächste Seite schon vorladen
+_search_prefetcher = None
+_search_prefetcher_lock = threading.Lock()
+
+
+def get_search_prefetcher() -> PagePrefetcher:
+    global _search_prefetcher
+    if _search_prefetcher is None:
+        with _search_prefetcher_lock:
+            if _search_prefetcher is None:
+                settings = get_settings()
+                _search_prefetcher = PagePrefetcher(
+                    max_inflight=settings.search_prefetch_workers,
+                    max_bytes=settings.search_prefetch_max_bytes,
+                    ttl=settings.search_prefetch_ttl,
+                )
+    return _search_prefetcher
+
+
+def prefetch_next_page(q: str, first: int, page_info: dict, market: Market | None = None):
+    if not page_info.get("hasNextPage") or not page_info.get("endCursor"):
+        return
+    cursor = page_info["endCursor"]
+    variables = {"first": first, "after": cursor, "query": q if q else None}
+    get_search_prefetcher().schedule(
+        (q, first, cursor, market.code if market else ""),
+        lambda: shopify_graphql(SEARCH_PRODUCTS_QUERY, variables, market),
+    )
+
+
+@api_bp.get("/products/search")
+def search_products():
+    q = (request.args.get("q") or "").strip()
+    first = int(request.args.get("first") or 20)
+    after = request.args.get("after")
+
+    first = max(1, min(first, 50))
+    try:
+        market = get_market(request.args.get("country"))
+    except MarketError as e:
+        return jsonify({"error": "bad_request", "detail": str(e)}), 400
+
+    data = get_search_prefetcher().take((q, first, after, market.code if market else "")) if after else None
+    stale = False
+    if data is None:
+        try:
+            data, stale = shopify_graphql_or_stale(
+                SEARCH_PRODUCTS_QUERY, {"first": first, "after": after, "query": q if q else None}, market
+            )
+        except (CircuitOpenError, requests.RequestException) as e:
+            return shopify_unavailable(e)
+    products = data["products"]
+    items = [map_shopify_product(edge["node"]) for edge in products["edges"]]
+    if stale:
+        return jsonify({"items": items, "pageInfo": products["pageInfo"], "stale": True})
+    prefetch_next_page(q, first, products["pageInfo"], market)
+    if market is None:
+        get_search_index().upsert_many(items)
+    return jsonify({"items": items, "pageInfo": products["pageInfo"]})
+
+
+@api_bp.get("/admin/search-prefetch")
+@requires("admin_panel")
+def search_prefetch_stats():
+    return jsonify(get_search_prefetcher().stats())
+
+
+# ----------------------------
+# Ländervergleich (Preis + Verfügbarkeit über alle Märkte)
+# ----------------------------
+# Alle Märkte gleichzeitig abfragen: Latenz = langsamster Markt statt Summe.
+MARKET_OFFER_FIELDS = """
+fragment MarketOffer on Product {
+  id
+  title
+  availableForSale
+  variants(first: 1) {
+    edges {
+      node {
+        sku
+        availableForSale
+        price { amount currencyCode }
+      }
+    }
+  }
+}
+"""
+
+MARKET_OFFER_BY_ID_QUERY = """
+query MarketOfferById($id: ID!) {
+  product(id: $id) { ...MarketOffer }
+}
+""" + MARKET_OFFER_FIELDS
+
+MARKET_OFFER_BY_SKU_QUERY = """
+query MarketOfferBySku($query: String!) {
+  products(first: 1, query: $query) { edges { node { ...MarketOffer } } }
+}
+""" + MARKET_OFFER_FIELDS
+
+_market_pool: tuple = (None, None)
+_market_pool_lock = threading.Lock()
+
+
+def get_market_pool() -> ThreadPoolExecutor:
+    global _market_pool
+    pid, pool = _market_pool
+    if pid != os.getpid():
+        # Threads des Elternprozesses überleben den fork nicht
+        with _market_pool_lock:
+            pid, pool = _market_pool
+            if pid != os.getpid():
+                # geteilt von allen Requests des Workers: ein Slot pro Markt und parallelem Vergleich,
+                # sonst warten gleichzeitige Vergleiche hintereinander auf Shopify
+                workers = len(get_markets()) * get_settings().market_compare_concurrency
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="markets")
+                _market_pool = (os.getpid(), pool)
+    return pool
+
+
+def fetch_market_offer(market: Market, product_id: str | None, sku: str | None) -> dict:
+    cache = get_cache()
+    key = cache.key("market_offer", market.code, product_id or f"sku:{sku}")
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    if product_id:
+        data, stale = shopify_graphql_or_stale(MARKET_OFFER_BY_ID_QUERY, {"id": product_id}, market)
+        node = data.get("product")
+    else:
+        data, stale = shopify_graphql_or_stale(MARKET_OFFER_BY_SKU_QUERY, {"query": f"sku:{sku}"}, market)
+        edges = data["products"]["edges"]
+        node = edges[0]["node"] if edges else None
+
+    if not node:
+        offer = {"found": False}
+    else:
+        v_edges = node.get("variants", {}).get("edges", [])
+        v = v_edges[0]["node"] if v_edges else {}
+        price = v.get("price") or {}
+        offer = {
+            "found": True,
+            "id": node.get("id"),
+            "title": node.get("title") or "",
+            "sku": v.get("sku") or "",
+            "available": bool(v.get("availableForSale", node.get("availableForSale"))),
+            "price": float(price.get("amount") or 0),
+            "currency": price.get("currencyCode") or "",
+        }
+    if stale:
+        return {**offer, "stale": True}
+    cache.set(key, offer, get_settings().products_cache_ttl)
+    return offer
+
+
+@api_bp.get("/products/compare")
+def compare_markets():
+    product_id = (request.args.get("id") or "").strip() or None
+    sku = (request.args.get("sku") or "").strip() or None
+    if not product_id and not sku:
+        return jsonify({"error": "bad_request", "detail": "id or sku required"}), 400
+    markets = get_markets()
+    try:
+        codes = resolve_codes(request.args.get("markets"), markets)
+    except MarketError as e:
+        return jsonify({"error": "bad_request", "detail": str(e)}), 400
+
+    started = time.monotonic()
+    pool = get_market_pool()
+    # copy_context: Tracing-Spans der Markt-Calls hängen am Request-Span
+    futures = {
+        code: pool.submit(contextvars.copy_context().run, fetch_market_offer, markets[code], product_id, sku)
+        for code in codes
+    }
+    settings = get_settings()
+    wait_futures(futures.values(), timeout=settings.shopify_timeout_seconds + 2)
+
+    result = {}
+    for code, future in futures.items():
+        if not future.done():
+            # noch nicht gestartete Calls verwerfen, damit sie keine Slots späterer Requests belegen
+            future.cancel()
+            result[code] = {"error": "timeout"}
+            continue
+        try:
+            result[code] = future.result()
+        except CircuitOpenError as e:
+            result[code] = {"error": "upstream_unavailable", "retryAfter": max(1, int(e.retry_after))}
+        except requests.RequestException as e:
+            result[code] = {"error": "upstream_unavailable", "detail": str(e)}
+        except Exception as e:
+            result[code] = {"error": "upstream_error", "detail": str(e)}
+
+    return jsonify({"markets": result, "elapsedMs": round((time.monotonic() - started) * 1000)})
+
+
+# ----------------------------
+# Lokale Produktsuche (In-Memory-Index, tippfehlertolerant)
+# ----------------------------
+# Der Index wird mit allem gefüttert, was über map_shopify_product hereinkommt
+# (Liste, Shopify-Suche) und kann per Admin-Endpoint komplett neu aufgebaut werden.
+_search_index = None
+_search_index_lock = threading.Lock()
+
+PRODUCTS_PAGE_QUERY = """
+query ProductsPage($first: Int!, $after: String) {
+  products(first: $first, after: $after) {
+    pageInfo { hasNextPage endCursor }
+    edges {
+      node {
+        id
+        title
+        description
+        featuredImage { url }
+        variants(first: 1) {
+          edges {
+            node {
+              sku
+              barcode
+              price { amount }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def get_search_index() -> ProductSearchIndex:
+    global _search_index
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                _search_index = ProductSearchIndex()
+    return _search_index
+
+
+def fetch_all_products(page_size: int = 250):
+    """Alle Shopify-Produkte seitenweise (Generator, bereits gemappt)."""
+    after = None
+    while True:
+        data = shopify_graphql(PRODUCTS_PAGE_QUERY, {"first": page_size, "after": after})
+        products = data["products"]
+        for edge in products["edges"]:
+            yield map_shopify_product(edge["node"])
+        if not products["pageInfo"]["hasNextPage"]:
+            break
+        after = products["pageInfo"]["endCursor"]
+
+
+# ----------------------------
+# Katalog-Snapshot (Warmstart neuer Worker)
+# ----------------------------
+# reconcile_catalog() schreibt die gemappten Produkte als mmap-fähige Datei; create_app()
+# öffnet sie. Bis der volle Suchindex (im Hintergrund aus dem Snapshot) steht, sucht
+# local-search direkt im Snapshot.
+_catalog_snapshot = None
+_index_warmup = {"pid": None, "done": threading.Event()}
+_index_warmup_lock = threading.Lock()
+
+
+def load_catalog_snapshot(path: str | None = None):
+    global _catalog_snapshot
+    path = get_settings().catalog_snapshot_path if path is None else path
+    # alten Snapshot nicht schließen – laufende Requests können noch darauf lesen
+    _catalog_snapshot = CatalogSnapshot.open(path)
+    return _catalog_snapshot
+
+
+def get_catalog_snapshot():
+    return _catalog_snapshot
+
+
+def save_catalog_snapshot(products: list[dict]):
+    """Der neu geladene Snapshot, None ohne Pfad oder wenn das Schreiben scheitert."""
+    path = get_settings().catalog_snapshot_path
+    if not path:
+        return None
+    try:
+        write_snapshot(path, products)
+    except OSError:
+        log.exception("writing catalog snapshot %s failed", path)
+        return None
+    return load_catalog_snapshot(path)
+
+
+def _warm_search_index(snapshot, done: threading.Event):
+    try:
+        index = get_search_index()
+        # live eingespielte Produkte (Webhooks, Shopify-Suche) sind neuer als der Snapshot
+        index.upsert_many(p for p in snapshot if index.get(p["id"]) is None)
+    except Exception:
+        log.exception("warming search index from snapshot failed")
+    finally:
+        done.set()
+
+
+def search_index_ready() -> bool:
+    """False, solange der Index (in diesem Prozess) noch aus dem Snapshot aufgebaut wird."""
+    snapshot = get_catalog_snapshot()
+    if snapshot is None or not len(snapshot):
+        return True
+    if _index_warmup["pid"] != os.getpid():
+        with _index_warmup_lock:
+            if _index_warmup["pid"] != os.getpid():
+                done = threading.Event()
+                _index_warmup.update(pid=os.getpid(), done=done)
+                threading.Thread(target=_warm_search_index, args=(snapshot, done), name="index-warmup", daemon=True).start()
+    return _index_warmup["done"].is_set()
+
+
+@api_bp.get("/products/local-search")
+def local_search_products():
+    q = (request.args.get("q") or "").strip()
+    limit = max(1, min(int(request.args.get("limit") or 20), 100))
+    sync_product_changes()
+    index = get_search_index()
+    if not search_index_ready():
+        result = get_catalog_snapshot().search(q, limit) if q else {"items": [], "total": 0}
+        return jsonify({"items": result["items"], "total": result["total"], "indexed": len(index), "source": "snapshot"})
+    result = index.search(q, limit) if q else {"items": [], "total": 0}
+    return jsonify({"items": result["items"], "total": result["total"], "indexed": len(index)})
+
+
+# Karte "Shopify Sync" auf der AutomationsPage
+CATALOG_SYNC_JOB = "shopify-sync"
+
+
+def reconcile_catalog() -> int:
+    """Kompletter Crawl -> Index ersetzen (Admin-Rebuild und periodischer Webhook-Abgleich)."""
+    board = get_job_board()
+    board.started(CATALOG_SYNC_JOB, message="Shopify-Katalog wird geladen")
+    # Bündel, die während des Crawls eintreffen, spielen alle Worker nach dem Neuaufbau erneut ein
+    last = get_cache().last_event(PRODUCT_EVENTS)
+    crawl_seq = last[0] if last else 0
+    products = []
+    try:
+        for product in fetch_all_products():
+            products.append(product)
+            board.progress(CATALOG_SYNC_JOB, len(products))
+    except Exception as e:
+        board.finished(CATALOG_SYNC_JOB, ok=False, message=str(e))
+        raise
+
+    get_search_index().replace_all(products)
+    get_cache().bump("products")
+    snapshot = save_catalog_snapshot(products)
+    if snapshot is not None:
+        # ohne Snapshot-Datei können die anderen Worker nicht nachladen – sie gleichen selbst ab
+        publish_catalog_reload(crawl_seq, snapshot.created_at)
+    board.finished(CATALOG_SYNC_JOB, message=f"{len(products)} Produkte indexiert")
+    return len(products)
+
+
+# Der Crawl dauert bei großen Katalogen Minuten – länger als WEB_TIMEOUT. Deshalb im
+# Hintergrund; Fortschritt und Ergebnis meldet reconcile_catalog über den JobBoard (CATALOG_SYNC_JOB).
+_catalog_rebuild = {"thread": None}
+_catalog_rebuild_lock = threading.Lock()
+
+
+def _run_catalog_rebuild():
+    try:
+        reconcile_catalog()
+    except Exception:
+        log.exception("catalog rebuild failed")  # Fehler steht auch im JobBoard
+
+
+def start_catalog_rebuild() -> bool:
+    """False, wenn in diesem Prozess bereits ein Neuaufbau läuft."""
+    with _catalog_rebuild_lock:
+        thread = _catalog_rebuild["thread"]
+        if thread is not None and thread.is_alive():
+            return False
+        thread = threading.Thread(target=_run_catalog_rebuild, name="catalog-rebuild", daemon=True)
+        _catalog_rebuild["thread"] = thread
+        thread.start()
+    return True
+
+
+@api_bp.post("/products/local-search/rebuild")
+@requires("admin_panel", db="reader")
+def rebuild_search_index():
+    if not start_catalog_rebuild():
+        return jsonify({"error": "rebuild_running", "job": CATALOG_SYNC_JOB}), 409
+    return jsonify({"ok": True, "job": CATALOG_SYNC_JOB, "statusUrl": "/api/automations"}), 202
+
+
+# ----------------------------
+# Shopify-Webhooks (Produkte inkrementell statt Re-Crawl)
+# ----------------------------
+# products/create|update|delete landen gebündelt im Suchindex; die gecachte Produktliste
+# wird pro Bündel einmal invalidiert. Ein periodischer Abgleich (reconcile_catalog) holt
+# verpasste Events nach. Lokal testbar mit signierten Fixtures (siehe tests/test_product_webhooks.py).
+#
+# Jeder Worker bekommt nur einen Teil der Webhooks. Damit alle denselben Katalog durchsuchen,
+# gehen Bündel und Neuaufbauten ins host-weite Ereignisprotokoll (L2-Cache-Datei); jeder Worker
+# spielt es vor der Suche in derselben Reihenfolge nach (sync_product_changes). Ohne L2
+# (CACHE_BACKEND=memory) wird direkt angewendet – dann nur in diesem Prozess.
+_product_webhooks = None
+_product_webhooks_lock = threading.Lock()
+
+PRODUCT_EVENTS = "products"
+PRODUCT_SYNC_SECONDS = 1.0
+# seq = zuletzt angewendetes Ereignis, reloaded = zuletzt übernommener Neuaufbau
+_product_sync = {"pid": None, "seq": 0, "reloaded": 0, "checked": 0.0, "busy": False}
+_product_sync_lock = threading.Lock()
+
+
+def _apply_changes(changes):
+    index = get_search_index()
+    upserts = []
+    for op, pid, node in changes:
+        if op == "delete":
+            index.remove(pid)
+        else:
+            upserts.append(map_shopify_product(node))
+    index.upsert_many(upserts)
+    get_cache().bump("products")
+
+
+def apply_product_changes(changes):
+    """Webhook-Bündel ins Protokoll schreiben und von dort anwenden – wie jeder andere Worker auch."""
+    changes = [[op, pid, node] for op, pid, node in changes]
+    if get_cache().publish(PRODUCT_EVENTS, "changes", changes) is None:
+        _apply_changes(changes)
+        return
+    sync_product_changes(force=True)
+
+
+def publish_catalog_reload(crawl_seq: int, created_at: float):
+    cache = get_cache()
+    payload = {"origin": os.getpid(), "after": crawl_seq, "createdAt": created_at}
+    if cache.publish(PRODUCT_EVENTS, "reload", payload) is not None:
+        # alles bis Crawl-Beginn steckt im neuen Snapshot
+        cache.trim_events(PRODUCT_EVENTS, crawl_seq + 1)
+
+
+def _reload_search_index(seq: int, after: int):
+    try:
+        snapshot = load_catalog_snapshot()
+        if snapshot is not None:
+            get_search_index().replace_all(snapshot)
+    except Exception:
+        log.exception("reloading search index from snapshot failed")
+    finally:
+        with _product_sync_lock:
+            _product_sync.update(seq=after, reloaded=seq, checked=0.0, busy=False)
+
+
+def sync_product_changes(force: bool = False):
+    """Protokoll nachspielen: höchstens alle PRODUCT_SYNC_SECONDS, ohne auf andere Threads zu warten."""
+    state = _product_sync
+    pid = os.getpid()
+    if state["pid"] == pid and not force and time.monotonic() - state["checked"] < PRODUCT_SYNC_SECONDS:
+        return
+    if not _product_sync_lock.acquire(blocking=False):
+        return
+    try:
+        cache = get_cache()
+        if state["pid"] != pid:
+            # neuer Worker: Snapshot = Stand des letzten Neuaufbaus, danach nur spätere Bündel
+            last = cache.last_event(PRODUCT_EVENTS, "reload")
+            state.update(pid=pid, seq=0, reloaded=0, busy=False)
+            if last is not None:
+                seq, payload, _created = last
+                snapshot = get_catalog_snapshot()
+                if snapshot is None or snapshot.created_at < payload["createdAt"]:
+                    load_catalog_snapshot()  # der Master hat einen älteren Snapshot gemappt
+                state.update(seq=payload["after"], reloaded=seq)
+        # während eines Neuaufbaus / Warmstarts aus dem Snapshot später nachspielen
+        if state["busy"] or not search_index_ready():
+            return
+        state["checked"] = time.monotonic()
+
+        events = cache.events_since(PRODUCT_EVENTS, state["seq"])
+        reload = next((e for e in reversed(events) if e[1] == "reload" and e[0] > state["reloaded"]), None)
+        if reload is not None:
+            seq, _kind, payload = reload
+            if payload["origin"] != pid:
+                state["busy"] = True
+                threading.Thread(target=_reload_search_index, args=(seq, payload["after"]), name="index-reload", daemon=True).start()
+                return
+            # eigener Abgleich hat den Index schon ersetzt; Bündel seit Crawl-Beginn erneut anwenden
+            state.update(seq=payload["after"], reloaded=seq)
+            events = cache.events_since(PRODUCT_EVENTS, state["seq"])
+
+        for seq, kind, payload in events:
+            if kind == "changes":
+                _apply_changes(payload)
+            state["seq"] = seq
+    finally:
+        _product_sync_lock.release()
+
+
+def periodic_reconcile() -> int:
+    """Abgleich aus dem Webhook-Thread; entfällt, wenn ein anderer Worker gerade abgeglichen hat."""
+    last = get_cache().last_event(PRODUCT_EVENTS, "reload")
+    if last is not None and time.time() - last[2] < get_settings().shopify_reconcile_seconds / 2:
+        return 0
+    return reconcile_catalog()
+
+
+def get_product_webhooks() -> ProductWebhookQueue:
+    global _product_webhooks
+    if _product_webhooks is None:
+        with _product_webhooks_lock:
+            if _product_webhooks is None:
+                settings = get_settings()
+                _product_webhooks = ProductWebhookQueue(
+                    apply_product_changes,
+                    reconcile=periodic_reconcile,
+                    delay=settings.shopify_webhook_delay_seconds,
+                    max_delay=settings.shopify_webhook_max_delay_seconds,
+                    reconcile_seconds=settings.shopify_reconcile_seconds,
+                )
+    return _product_webhooks
+
+
+@api_bp.post("/webhooks/shopify/products")
+def shopify_product_webhook():
+    body = request.get_data(cache=False)
+    if not verify_hmac(body, request.headers.get("X-Shopify-Hmac-Sha256"), get_settings().shopify_webhook_secret):
+        return jsonify({"error": "invalid_signature"}), 401
+
+    topic = request.headers.get("X-Shopify-Topic") or ""
+    if topic not in WEBHOOK_TOPICS:
+        # 2xx, sonst stellt Shopify erneut zu
+        return jsonify({"ok": True, "ignored": topic})
+    try:
+        payload = json.loads(body)
+        if not isinstance(payload, dict):
+            raise TypeError("payload must be an object")
+        op, pid, node = parse_event(topic, payload)
+    except (ValueError, KeyError, TypeError):
+        return jsonify({"error": "invalid_payload"}), 400
+
+    result = get_product_webhooks().submit(
+        op, pid, node, payload.get("updated_at"), request.headers.get("X-Shopify-Webhook-Id")
+    )
+    return jsonify({"ok": True, "result": result})
+
+
+@api_bp.get("/admin/product-webhooks")
+@requires("admin_panel")
+def product_webhook_stats():
+    return jsonify(get_product_webhooks().stats())
+
+
+# ----------------------------
+# Automations (Job-Status per Server-Sent Events)
+# ----------------------------
+# Jobs im Prozess melden sich über get_job_board().started/progress/finished;
+# die AutomationsPage hört auf /automations/stream statt zu pollen.
+# Job-IDs = IDs der Karten auf der AutomationsPage (CATALOG_SYNC_JOB, FeedProfile.job).
+# Jede Änderung geht zusätzlich ins Ereignisprotokoll des L2-Caches (Stream "jobs"); die anderen
+# Worker übernehmen sie in sync_job_board(). Ohne L2 (CACHE_BACKEND=memory) sieht jeder Worker
+# nur seine eigenen Jobs.
+_job_board = None
+_job_board_lock = threading.Lock()
+
+JOB_EVENTS = "jobs"
+JOB_SYNC_SECONDS = 1.0
+# ältere Einträge kappen, sobald ein Job endet (Protokoll-seq ist streamübergreifend)
+JOB_EVENTS_KEEP = 2000
+_job_sync = {"pid": None, "seq": 0, "checked": 0.0}
+_job_sync_lock = threading.Lock()
+
+
+def _share_job_event(kind: str, job: dict):
+    cache = get_cache()
+    seq = cache.publish(JOB_EVENTS, kind, {"origin": os.getpid(), "job": job})
+    if seq and kind == "state" and job["state"] != "running":
+        cache.trim_events(JOB_EVENTS, seq - JOB_EVENTS_KEEP)
+
+
+def get_job_board() -> JobBoard:
+    global _job_board
+    if _job_board is None:
+        with _job_board_lock:
+            if _job_board is None:
+                _job_board = JobBoard(max_buffer=get_settings().sse_buffer_events, on_change=_share_job_event)
+    return _job_board
+
+
+def sync_job_board():
+    """Job-Events der anderen Worker übernehmen: höchstens alle JOB_SYNC_SECONDS, ohne zu warten."""
+    state = _job_sync
+    pid = os.getpid()
+    if state["pid"] == pid and time.monotonic() - state["checked"] < JOB_SYNC_SECONDS:
+        return
+    if not _job_sync_lock.acquire(blocking=False):
+        return
+    try:
+        if state["pid"] != pid:
+            state.update(pid=pid, seq=0)  # neuer Worker: vorhandenes Protokoll komplett nachspielen
+        state["checked"] = time.monotonic()
+        cache, board = get_cache(), get_job_board()
+        while True:
+            events = cache.events_since(JOB_EVENTS, state["seq"])
+            for seq, kind, payload in events:
+                if payload["origin"] != pid:
+                    board.apply(kind, payload["job"])
+                state["seq"] = seq
+            if len(events) < 500:
+                break
+    finally:
+        _job_sync_lock.release()
+
+
+@api_bp.get("/automations")
+@requires()
+def automations_status():
+    sync_job_board()
+    return jsonify(get_job_board().snapshot())
+
+
+# @requires schließt die Connection, sobald der Handler die Response zurückgibt –
+# also bevor der Stream beginnt
+@api_bp.get("/automations/stream")
+@requires()
+def automations_stream():
+    settings = get_settings()
+    board = get_job_board()
+    limit = max_streams(settings.sse_max_clients)
+    if limit == 0:
+        # sync-Worker: ein Stream würde den ganzen Prozess belegen -> die Seite pollt /automations
+        return jsonify({"error": "streaming_unavailable", "pollUrl": "/api/automations"}), 409
+    # jeder Stream belegt einen Worker-Thread -> hart begrenzen
+    if board.subscriber_count() >= limit:
+        resp = jsonify({"error": "too_many_streams"})
+        resp.headers["Retry-After"] = "10"
+        return resp, 503
+
+    gen = sse_stream(
+        board,
+        heartbeat=settings.sse_heartbeat_seconds,
+        max_seconds=settings.sse_max_seconds,
+        poll=sync_job_board,
+        poll_interval=JOB_SYNC_SECONDS,
+    )
+    resp = Response(gen, mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"  # nginx/Railway-Proxy nicht puffern lassen
+    return resp
+
+
+# ----------------------------
+# Produktdaten (Neudorff-Datenblatt: Spalten x Länder x Kanäle)
+# ----------------------------
+_product_store_ready = False
+
+
+@api_bp.get("/product-data/columns")
+def product_data_columns():
+    return jsonify({"columns": list(COLUMNS), "countries": list(COUNTRIES), "channels": list(CHANNELS)})
+
+
+@api_bp.post("/product-data/query")
+@requires(db="reader")
+def product_data_query():
+    """
+    { "columns": ["EAN", "UVP", "Bild 1"], "eans": ["4006925001234", ...], "country": "DE", "channel": "neudorff" }
+    -> nur die angefragten Spalten, Reihenfolge wie in "eans"
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        columns = resolve_columns(payload.get("columns"))
+        channel, country = resolve_scope(payload.get("channel"), payload.get("country"))
+        raw_eans = payload.get("eans")
+        if not isinstance(raw_eans, list) or not raw_eans:
+            raise ProductStoreError("eans must be a non-empty list")
+        if len(raw_eans) > MAX_EANS:
+            raise ProductStoreError(f"at most {MAX_EANS} eans per request")
+        eans = list(dict.fromkeys(normalize_ean(e) for e in raw_eans))
+    except ProductStoreError as e:
+        return jsonify({"error": "bad_request", "detail": str(e)}), 400
+
+    conn = g.db
+    try:
+        try:
+            found = fetch_columns(conn, eans, columns, channel, country)
+        except pymysql.err.ProgrammingError as e:
+            if not e.args or e.args[0] != pymysql.constants.ER.NO_SUCH_TABLE:
+                raise
+            # Tabelle entsteht erst beim ersten Upsert (bzw. ist noch nicht repliziert) -> nichts gepflegt
+            found = {}
+        conn.commit()
+
+        return jsonify(
+            {
+                "columns": [label for label, _key in columns],
+                "items": [found[e] for e in eans if e in found],
+                "missing": [e for e in eans if e not in found],
+            }
+        ), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": "internal_error", "detail": str(e)}), 500
+
+
+@api_bp.post("/product-data")
+@requires("admin_panel")
+def product_data_upsert():
+    """
+    { "channel": "neudorff", "country": "DE", "items": [{ "ean": "...", "values": { "UVP": "12,99", "CLP": null } }] }
+    country leer = gilt für alle Länder; null löscht den Wert.
+    """
+    global _product_store_ready
+    payload = request.get_json(silent=True) or {}
+    try:
+        channel, country = resolve_scope(payload.get("channel"), payload.get("country"))
+    except ProductStoreError as e:
+        return jsonify({"error": "bad_request", "detail": str(e)}), 400
+
+    conn = g.db
+    user = g.user
+    try:
+        if not _product_store_ready:
+            ensure_product_store_table(conn)
+            _product_store_ready = True
+
+        try:
+            changed = upsert_values(conn, channel, country, payload.get("items"))
+        except ProductStoreError as e:
+            conn.rollback()
+            return jsonify({"error": "bad_request", "detail": str(e)}), 400
+
+        conn.commit()
+        audit("product_data.upsert", user, "product_data", None, channel=channel, country=country, changed=changed)
+        return jsonify({"ok": True, "changed": changed}), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": "internal_error", "detail": str(e)}), 500
+
+
+# ----------------------------
+# Händler-Feeds (Prüfung vor dem Export an OBI / Bauhaus)
+# ----------------------------
+def current_catalog() -> list[dict]:
+    """Gemappte Produkte des Standard-Stores; solange der Suchindex noch aufgebaut wird, aus dem Snapshot."""
+    sync_product_changes()
+    if search_index_ready():
+        return get_search_index().products()
+    return list(get_catalog_snapshot())
+
+
+@api_bp.post("/feeds/<retailer>/validate")
+@requires(db="reader")
+def validate_retailer_feed(retailer: str):
+    """
+    Body optional: { "items": [...] } (gemappte Produkte, z. B. die Exportauswahl); ohne Body
+    wird der ganze lokale Katalog geprüft. Auch bei Befunden 200 – Ergebnis steht in "ok".
     """
-    data = shopify_graphql(query, {"first": 20})
-    items = [map_shopify_product(edge["node"]) for edge in data["products"]["edges"]]
-    return jsonify({"items": items})
+    payload = request.get_json(silent=True) or {}
+    try:
+        profile = get_profile(retailer)
+        max_issues = max(0, min(int(request.args.get("maxIssues") or 1000), 10000))
+    except ValueError as e:
+        return jsonify({"error": "bad_request", "detail": str(e)}), 400
 
+    items = payload.get("items")
+    if items is not None:
+        if not isinstance(items, list) or not all(isinstance(p, dict) for p in items):
+            return jsonify({"error": "bad_request", "detail": "items must be a list of products"}), 400
+        # 100k Produkte ~ einige 100 ms CPU -> unter gevent nicht im Hub rechnen
+        return jsonify(run_blocking(validate_feed, items, profile, max_issues))
+
+    items = current_catalog()
+    if not items:
+        return jsonify({"error": "catalog_empty", "detail": "rebuild the local search index first"}), 409
+    # ganzer Katalog = der Export-Feed des Händlers -> Lauf auf der AutomationsPage zeigen
+    board = get_job_board()
+    board.started(profile.job, total=len(items), message="Feed wird geprüft")
+    try:
+        report = run_blocking(validate_feed, items, profile, max_issues)
+    except Exception as e:
+        board.finished(profile.job, ok=False, message=str(e))
+        raise
+    message = f"{report['total']} Produkte geprüft" if report["ok"] else f"{report['invalid']} von {report['total']} Produkten fehlerhaft"
+    board.finished(profile.job, ok=report["ok"], message=message)
+    return jsonify(report)
 
-@api_bp.get("/products/search")
-def search_products():
-    q = (request.args.get("q") or "").strip()
-    first = int(request.args.get("first") or 20)
-    after = request.args.get("after")
 
-    first = max(1, min(first, 50))
+# ----------------------------
+# Produktbilder (Thumbnail-Proxy mit Disk-Cache)
+# ----------------------------
+_thumb_cache = None
+_thumb_cache_lock = threading.Lock()
+
+
+def get_thumb_cache() -> ThumbnailCache:
+    global _thumb_cache
+    if _thumb_cache is None:
+        with _thumb_cache_lock:
+            if _thumb_cache is None:
+                settings = get_settings()
+                _thumb_cache = ThumbnailCache(settings.thumb_cache_dir, settings.thumb_cache_max_bytes)
+    return _thumb_cache
+
+
+@api_bp.get("/images/thumb")
+def image_thumbnail():
+    src = (request.args.get("src") or "").strip()
+    width = snap_width(request.args.get("w"))
+    settings = get_settings()
+    if not is_allowed_source(src, settings.thumb_allowed_hosts, settings.thumb_allowed_path_prefix):
+        return jsonify({"error": "bad_request", "detail": "src not allowed"}), 400
+    # nur von map_shopify_product ausgegebene URLs – sonst ist jede Query-Variante ein neuer Fetch
+    if not verify_source(src, width, request.args.get("sig"), settings.thumb_signing_secret):
+        return jsonify({"error": "forbidden", "detail": "invalid signature"}), 403
+
+    cache = get_thumb_cache()
+    hit = cache.lookup(src, width)
+    if hit:
+        resp = not_modified(hit[0], CACHE_CONTROL_THUMBS)
+        if resp is not None:
+            return resp
 
-    query = """
-    query Products($first: Int!, $after: String, $query: String) {
-      products(first: $first, after: $after, query: $query) {
-        pageInfo { hasNextPage endCursor }
-        edges {
-          node {
-            id
-            title
-            description
-            featuredImage { url }
-            variants(first: 1) {
-              edges {
-                node {
-                  sku
-                  barcode
-                  price { amount }
-                }
-              }
-            }
-          }
-        }
-      }
-    }
-    """
+    try:
+        digest, path = hit or cache.get_or_create(src, width)
+    except ImportError:
+        # Pillow fehlt: lieber das Original als gar kein Bild
+        return redirect(src, 302)
+    except ThumbnailError as e:
+        return jsonify({"error": "bad_request", "detail": str(e)}), 413
+    except Exception as e:
+        return jsonify({"error": "upstream_error", "detail": str(e)}), 502
 
-    data = shopify_graphql(query, {"first": first, "after": after, "query": q if q else None})
-    products = data["products"]
-    items = [map_shopify_product(edge["node"]) for edge in products["edges"]]
-    return jsonify({"items": items, "pageInfo": products["pageInfo"]})
+    resp = send_file(path, mimetype=THUMB_CONTENT_TYPE, conditional=False, etag=False)
+    return with_cache_headers(resp, digest, CACHE_CONTROL_THUMBS)
 
 
 # ----------------------------
@@ -375,6 +1902,39 @@ def db_health():
         conn.close()
 
 
+# Asynchrone Annahme (ORDER_INTAKE_MODE=async): Spool + Hintergrund-Writer, siehe order_intake.py.
+# Der Writer startet mit dem Worker (start_background_workers) und arbeitet auch
+# liegengebliebene Spool-Einträge (z. B. nach einem Neustart) ab.
+_order_intake = None
+_order_intake_lock = threading.Lock()
+
+
+def get_order_intake() -> OrderIntakeWriter:
+    global _order_intake
+    if _order_intake is None:
+        with _order_intake_lock:
+            if _order_intake is None:
+                settings = get_settings()
+                _order_intake = OrderIntakeWriter(
+                    OrderSpool(settings.order_intake_spool_path),
+                    lambda: get_conn(),
+                    # von MySQL abgelehnte Einzelbestellungen -> "failed"; alles andere = DB-Ausfall, später erneut
+                    permanent_errors=(pymysql.err.IntegrityError, pymysql.err.DataError, ValueError),
+                    batch_size=settings.order_intake_batch_size,
+                    flush_interval=settings.order_intake_flush_seconds,
+                )
+    return _order_intake
+
+
+def start_background_workers():
+    """
+    Hintergrund-Threads dieses Prozesses starten. create_app() ruft das auf; unter gunicorn
+    erst in post_worker_init im Worker (Threads überleben keinen fork).
+    """
+    if get_settings().order_intake_mode == "async":
+        get_order_intake().ensure_running()
+
+
 @api_bp.post("/orders")
 def create_order():
     """
@@ -384,137 +1944,85 @@ def create_order():
       "address": { "salutation":"Herr", "firstName":"Max", "lastName":"Mustermann", "company":"", "street":"...", "number":"1", "zip":"12345", "city":"...", "country":"de", "email":"...", "phone":"..." },
       "notes": "..."
     }
+    Synchron: 201 {id, totalPrice, currency}. Mit ORDER_INTAKE_MODE=async: 202 {reference, statusUrl, ...}.
     """
     payload = request.get_json(silent=True) or {}
-    items = payload.get("items") or []
-    address = payload.get("address") or {}
-    notes = payload.get("notes")
-
-    if not isinstance(items, list) or len(items) == 0:
-        return jsonify({"error": "items must be a non-empty list"}), 400
-
     try:
-        salutation = require_field(address, "salutation")
-        last_name = require_field(address, "lastName")
-        street = require_field(address, "street")
-        number = require_field(address, "number")
-        zip_code = require_field(address, "zip")
-        city = require_field(address, "city")
-        country = (address.get("country") or "de").strip().lower()
-        email = require_field(address, "email")
-
-        first_name = (address.get("firstName") or "").strip() or None
-        company = (address.get("company") or "").strip() or None
-        phone = (address.get("phone") or "").strip() or None
-
-        total = Decimal("0.00")
-        normalized_items = []
-
-        for idx, it in enumerate(items):
-            qty = int(it.get("qty") or 0)
-            if qty <= 0:
-                raise ValueError(f"Invalid qty at items[{idx}]")
-            unit_price = money(it.get("unitPrice"))
-            total += unit_price * qty
-
-            normalized_items.append(
+        order = normalize_order(payload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if get_settings().order_intake_mode == "async":
+        try:
+            ref = get_order_intake().submit(order)
+        except OSError:
+            log.exception("order spool not writable, falling back to synchronous insert")
+        else:
+            status_url = f"/api/orders/intake/{ref}"
+            resp = jsonify(
                 {
-                    "product_id": it.get("productId"),
-                    "title": it.get("title"),
-                    "sku": it.get("sku"),
-                    "ean": it.get("ean"),
-                    "qty": qty,
-                    "unit_price": unit_price,
+                    "reference": ref,
+                    "status": STATUS_QUEUED,
+                    "statusUrl": status_url,
+                    "totalPrice": order["total_price"],
+                    "currency": order["currency"],
                 }
             )
+            resp.headers["Location"] = status_url
+            return resp, 202
 
-        total = total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-
+    try:
         conn = get_conn()
         try:
             with conn.cursor() as cur:
-                # 1) orders
-                cur.execute(
-                    """
-                    INSERT INTO orders (currency, notes, total_price)
-                    VALUES (%s, %s, %s)
-                    """,
-                    ("EUR", notes, str(total)),
-                )
-                order_id = cur.lastrowid
-
-                # 2) order_items
-                for it in normalized_items:
-                    cur.execute(
-                        """
-                        INSERT INTO order_items
-                          (order_id, product_id, title, sku, ean, qty, unit_price)
-                        VALUES
-                          (%s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        (
-                            order_id,
-                            it["product_id"],
-                            it["title"],
-                            it["sku"],
-                            it["ean"],
-                            it["qty"],
-                            str(it["unit_price"]),
-                        ),
-                    )
-
-                # 3) order_addresses
-                cur.execute(
-                    """
-                    INSERT INTO order_addresses
-                      (order_id, salutation, first_name, last_name, company,
-                       street, number, zip, city, country, email, phone)
-                    VALUES
-                      (%s, %s, %s, %s, %s,
-                       %s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        order_id,
-                        salutation,
-                        first_name,
-                        last_name,
-                        company,
-                        street,
-                        number,
-                        zip_code,
-                        city,
-                        country,
-                        email,
-                        phone,
-                    ),
-                )
-
+                order_id = insert_order(cur, order)
             conn.commit()
-
-            return jsonify(
-                {
-                    "id": order_id,
-                    "totalPrice": str(total),
-                    "currency": "EUR",
-                }
-            ), 201
-
         except Exception:
             conn.rollback()
             raise
         finally:
             conn.close()
-
-    except ValueError as e:
-        return jsonify({"error": str(e)}), 400
     except Exception as e:
         # in prod lieber ohne detail
         return jsonify({"error": "internal_error", "detail": str(e)}), 500
 
+    return jsonify({"id": order_id, "totalPrice": order["total_price"], "currency": order["currency"]}), 201
+
+
+@api_bp.get("/orders/intake/<ref>")
+def order_intake_status(ref: str):
+    # nur lesen: der Writer läuft ab Start des Workers (start_background_workers), nicht erst hier
+    row = None
+    try:
+        conn = get_conn("reader")
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT status, order_id, error FROM order_intake WHERE ref = %s", (ref,))
+                row = cur.fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+    except pymysql.err.MySQLError:
+        # Tabelle entsteht erst mit dem ersten Batch; bei DB-Ausfall bleibt der Spool als Auskunft
+        log.warning("order intake status for %s: database unavailable, checking spool", ref, exc_info=True)
+
+    if row:
+        return jsonify({"reference": ref, "status": row["status"], "orderId": row["order_id"], "error": row["error"]})
+    if get_order_intake().spool.find(ref):
+        return jsonify({"reference": ref, "status": STATUS_QUEUED})
+    return jsonify({"error": "not_found"}), 404
+
+
+@api_bp.get("/admin/order-intake")
+@requires("admin_panel")
+def order_intake_stats():
+    intake = get_order_intake()
+    return jsonify({**intake.stats, "mode": get_settings().order_intake_mode, "pendingBytes": intake.spool.pending_bytes()})
+
 
 @api_bp.get("/orders")
 def list_orders():
-    conn = get_conn()
+    conn = get_conn("reader")
     try:
         with conn.cursor() as cur:
             cur.execute(
@@ -532,18 +2040,70 @@ def list_orders():
         conn.close()
 
 
+@api_bp.get("/orders/export")
+def export_orders():
+    """
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD&format=csv|ndjson
+    Streamt direkt aus einem Server-Side-Cursor; die Connection lebt genau so lange wie der Download.
+    """
+    fmt = (request.args.get("format") or "csv").strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": "bad_request", "detail": "format must be csv or ndjson"}), 400
+    try:
+        start, end = parse_range(request.args.get("from"), request.args.get("to"))
+    except ValueError as e:
+        return jsonify({"error": "bad_request", "detail": str(e)}), 400
+
+    conn = get_conn("reader")
+    try:
+        _user, err = require_admin(conn)
+        if err:
+            conn.close()
+            return err
+        conn.commit()
+        set_statement_timeout(conn, get_settings().orders_export_timeout_ms)
+        cur = conn.cursor(traced_cursor(pymysql.cursors.SSDictCursor))
+        cur.execute(EXPORT_QUERY, (start, end))
+    except Exception as e:
+        conn.close()
+        return jsonify({"error": "internal_error", "detail": str(e)}), 500
+
+    def generate():
+        finished = False
+        try:
+            yield from render_export(iter_rows(cur), fmt)
+            finished = True
+        finally:
+            # bei Abbruch nicht cur.close(): das würde den Rest des Resultsets erst noch lesen
+            if finished:
+                cur.close()
+            conn.close()
+
+    filename = f"orders_{start:%Y%m%d}_{(end - timedelta(days=1)):%Y%m%d}.{fmt}"
+    resp = Response(generate(), content_type=EXPORT_FORMATS[fmt])
+    resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    resp.headers["Cache-Control"] = "no-store"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+
 # ----------------------------
 # Auth (Register/Login/Logout + Sessions in DB)
 # ----------------------------
 @api_bp.get("/auth/me")
 def auth_me():
-    conn = get_conn()
+    # JWT-Modus: gültiges Access-Cookie + gecachte Permissions -> kein DB-Roundtrip
+    user, _session_id = get_token_user()
+    if user:
+        perms = get_cached_permissions(user)
+        if perms is not None:
+            return jsonify({"user": user, "permissions": perms}), 200
+
+    conn = get_conn("reader")
     try:
-        user, _session_id = get_current_user(conn)
+        user, _session_id, perms = get_auth_context(conn)
         if not user:
             return jsonify({"user": None}), 200
-
-        perms = get_user_permissions(conn, user["id"]) if user.get("departmentId") else []
         conn.commit()
         return jsonify({"user": user, "permissions": perms}), 200
     except Exception as e:
@@ -555,11 +2115,14 @@ def auth_me():
 
 @api_bp.post("/auth/register")
 def auth_register():
-    allow = (os.getenv("AUTH_ALLOW_REGISTRATION") or "true").strip().lower() in ("1", "true", "yes", "on")
-    if not allow:
+    if not get_settings().allow_registration:
         return jsonify({"error": "registration_disabled"}), 403
 
     payload = request.get_json(silent=True) or {}
+    throttled = throttle_auth("register", normalize_email(str(payload.get("email") or "")))
+    if throttled is not None:
+        return throttled
+
     try:
         email = normalize_email(require_field(payload, "email"))
         password = require_field(payload, "password")
@@ -573,7 +2136,7 @@ def auth_register():
         if not email or "@" not in email:
             return jsonify({"error": "email_invalid"}), 400
 
-        pw_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        pw_hash = hash_password(password)
 
         conn = get_conn()
         try:
@@ -602,6 +2165,8 @@ def auth_register():
                     (user_id, th, ip, ua),
                 )
                 cur.execute("UPDATE users SET last_login_at = NOW() WHERE id = %s", (user_id,))
+            if department_id is not None:
+                bump_data_version(conn, "users")
 
             conn.commit()
 
@@ -626,6 +2191,10 @@ def auth_register():
 @api_bp.post("/auth/login")
 def auth_login():
     payload = request.get_json(silent=True) or {}
+    throttled = throttle_auth("login", normalize_email(str(payload.get("email") or "")))
+    if throttled is not None:
+        return throttled
+
     try:
         email = normalize_email(require_field(payload, "email"))
         password = require_field(payload, "password")
@@ -646,6 +2215,7 @@ def auth_login():
                 row = cur.fetchone()
 
             if not row or int(row.get("is_active") or 0) != 1:
+                audit("auth.login_failed", target_type="user", target_id=row["id"] if row else None, email=email)
                 return jsonify({"error": "invalid_credentials"}), 401
 
             stored_hash = (row.get("password_hash") or "").strip()
@@ -655,18 +2225,19 @@ def auth_login():
             # und migrieren bei erfolgreichem Login auf bcrypt.
             ok = False
             try:
-                ok = bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("utf-8"))
+                ok = check_password(password, stored_hash)
             except ValueError:
                 if stored_hash and not stored_hash.startswith("$2"):
                     ok = password == stored_hash
                     if ok:
-                        new_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+                        new_hash = hash_password(password)
                         with conn.cursor() as cur:
                             cur.execute("UPDATE users SET password_hash=%s WHERE id=%s", (new_hash, row["id"]))
                 else:
                     ok = False
 
             if not ok:
+                audit("auth.login_failed", target_type="user", target_id=row["id"], email=email)
                 return jsonify({"error": "invalid_credentials"}), 401
 
             token = secrets.token_urlsafe(32)
@@ -682,6 +2253,7 @@ def auth_login():
                 )
                 cur.execute("UPDATE users SET last_login_at = NOW() WHERE id = %s", (row["id"],))
             conn.commit()
+            audit("auth.login", {"id": row["id"]}, "user", row["id"])
 
             resp = jsonify({"ok": True})
             return set_session_cookie(resp, token), 200
@@ -706,6 +2278,8 @@ def auth_logout():
             with conn.cursor() as cur:
                 cur.execute("UPDATE user_sessions SET revoked_at = NOW() WHERE id = %s", (session_id,))
             conn.commit()
+            get_revocations().revoke_session(session_id)
+            audit("auth.logout", user, "session", session_id)
 
         resp = jsonify({"ok": True, "user": user})
         return clear_session_cookie(resp), 200
@@ -720,12 +2294,16 @@ def auth_logout():
 # Admin (Owner-only): Users / Departments / Permissions
 # ----------------------------
 @api_bp.get("/admin/departments")
+@requires("admin_panel")
 def admin_list_departments():
-    conn = get_conn()
+    conn = g.db
     try:
-        _user, err = require_admin(conn)
-        if err:
-            return err
+        versions = get_data_versions(conn, "departments", "users")
+        etag = make_etag("departments", versions["departments"], versions["users"])
+        resp = not_modified(etag, CACHE_CONTROL_ADMIN)
+        if resp is not None:
+            conn.commit()
+            return resp
 
         with conn.cursor() as cur:
             cur.execute(
@@ -739,22 +2317,18 @@ def admin_list_departments():
             )
             rows = cur.fetchall() or []
         conn.commit()
-        return jsonify({"items": rows}), 200
+        return with_cache_headers(jsonify({"items": rows}), etag, CACHE_CONTROL_ADMIN), 200
     except Exception as e:
         conn.rollback()
         return jsonify({"error": "internal_error", "detail": str(e)}), 500
-    finally:
-        conn.close()
 
 
 @api_bp.post("/admin/departments")
+@requires("admin_panel")
 def admin_create_department():
-    conn = get_conn()
+    conn = g.db
+    user = g.user
     try:
-        _user, err = require_admin(conn)
-        if err:
-            return err
-
         payload = request.get_json(silent=True) or {}
         try:
             name = require_field(payload, "name")
@@ -769,8 +2343,10 @@ def admin_create_department():
             dep_id = cur.lastrowid
             cur.execute("SELECT id, name, created_at FROM departments WHERE id=%s LIMIT 1", (dep_id,))
             dep = cur.fetchone()
+        bump_data_version(conn, "departments")
 
         conn.commit()
+        audit("department.create", user, "department", dep_id, name=name)
         return jsonify({"item": dep}), 201
     except pymysql.err.IntegrityError:
         conn.rollback()
@@ -778,37 +2354,47 @@ def admin_create_department():
     except Exception as e:
         conn.rollback()
         return jsonify({"error": "internal_error", "detail": str(e)}), 500
-    finally:
-        conn.close()
 
 
 @api_bp.get("/admin/permissions")
+@requires("admin_panel")
 def admin_list_permissions():
-    conn = get_conn()
+    conn = g.db
     try:
-        _user, err = require_admin(conn)
-        if err:
-            return err
+        versions = get_data_versions(conn, "permissions")
+        etag = make_etag("permissions", versions["permissions"])
+        resp = not_modified(etag, CACHE_CONTROL_ADMIN)
+        if resp is not None:
+            conn.commit()
+            return resp
 
         with conn.cursor() as cur:
             cur.execute("SELECT id, key_name, label, created_at FROM permissions ORDER BY key_name")
             rows = cur.fetchall() or []
         conn.commit()
-        return jsonify({"items": rows}), 200
+        return with_cache_headers(jsonify({"items": rows}), etag, CACHE_CONTROL_ADMIN), 200
     except Exception as e:
         conn.rollback()
         return jsonify({"error": "internal_error", "detail": str(e)}), 500
-    finally:
-        conn.close()
 
 
 @api_bp.get("/admin/departments/<int:department_id>/permissions")
+@requires("admin_panel")
 def admin_get_department_permissions(department_id: int):
-    conn = get_conn()
+    conn = g.db
     try:
-        _user, err = require_admin(conn)
-        if err:
-            return err
+        versions = get_data_versions(conn, "departments", "permissions", "department_permissions")
+        etag = make_etag(
+            "department_permissions",
+            department_id,
+            versions["departments"],
+            versions["permissions"],
+            versions["department_permissions"],
+        )
+        resp = not_modified(etag, CACHE_CONTROL_ADMIN)
+        if resp is not None:
+            conn.commit()
+            return resp
 
         with conn.cursor() as cur:
             cur.execute("SELECT id, name FROM departments WHERE id=%s LIMIT 1", (department_id,))
@@ -829,22 +2415,18 @@ def admin_get_department_permissions(department_id: int):
             perms = cur.fetchall() or []
 
         conn.commit()
-        return jsonify({"department": dep, "permissions": perms}), 200
+        return with_cache_headers(jsonify({"department": dep, "permissions": perms}), etag, CACHE_CONTROL_ADMIN), 200
     except Exception as e:
         conn.rollback()
         return jsonify({"error": "internal_error", "detail": str(e)}), 500
-    finally:
-        conn.close()
 
 
 @api_bp.post("/admin/departments/<int:department_id>/permissions")
+@requires("admin_panel")
 def admin_set_department_permissions(department_id: int):
-    conn = get_conn()
+    conn = g.db
+    user = g.user
     try:
-        _user, err = require_admin(conn)
-        if err:
-            return err
-
         payload = request.get_json(silent=True) or {}
         keys = payload.get("permissionKeys")
         if not isinstance(keys, list):
@@ -876,25 +2458,22 @@ def admin_set_department_permissions(department_id: int):
                     "INSERT INTO department_permissions (department_id, permission_id) VALUES (%s, %s)",
                     [(department_id, pid) for pid in perm_ids],
                 )
+        bump_data_version(conn, "department_permissions")
 
         conn.commit()
+        invalidate_permissions()
+        audit("department.permissions", user, "department", department_id, permissionKeys=keys)
         return jsonify({"ok": True}), 200
     except Exception as e:
         conn.rollback()
         return jsonify({"error": "internal_error", "detail": str(e)}), 500
-    finally:
-        conn.close()
 
 
 @api_bp.get("/admin/users")
+@requires("admin_panel")
 def admin_list_users():
-    conn = get_conn()
+    conn = g.db
     try:
-        ensure_auth_tables(conn)
-        _user, err = require_admin(conn)
-        if err:
-            return err
-
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -921,19 +2500,14 @@ def admin_list_users():
     except Exception as e:
         conn.rollback()
         return jsonify({"error": "internal_error", "detail": str(e)}), 500
-    finally:
-        conn.close()
 
 
 @api_bp.post("/admin/users")
+@requires("admin_panel")
 def admin_create_user():
-    conn = get_conn()
+    conn = g.db
+    user = g.user
     try:
-        ensure_auth_tables(conn)
-        _user, err = require_admin(conn)
-        if err:
-            return err
-
         payload = request.get_json(silent=True) or {}
         try:
             email = normalize_email(require_field(payload, "email"))
@@ -968,7 +2542,7 @@ def admin_create_user():
                 if not cur.fetchone():
                     return jsonify({"error": "bad_request", "detail": "Unknown departmentId"}), 400
 
-        pw_hash = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        pw_hash = hash_password(new_password)
 
         with conn.cursor() as cur:
             cur.execute(
@@ -996,8 +2570,10 @@ def admin_create_user():
                 (user_id,),
             )
             user_row = cur.fetchone()
+        bump_data_version(conn, "users")
 
         conn.commit()
+        audit("user.create", user, "user", user_id, email=email, departmentId=department_id, isOwner=is_owner)
         return jsonify({"item": user_row, "temporaryPassword": generated_password}), 201
     except pymysql.err.IntegrityError:
         conn.rollback()
@@ -1005,18 +2581,104 @@ def admin_create_user():
     except Exception as e:
         conn.rollback()
         return jsonify({"error": "internal_error", "detail": str(e)}), 500
-    finally:
-        conn.close()
+
+
+@api_bp.post("/admin/users/import")
+@requires("admin_panel")
+def admin_import_users():
+    """
+    CSV (Kopfzeile: email, firstName, lastName, departmentId oder department, isOwner, isActive, password)
+    oder JSON ([{...}] bzw. {"users": [...]}).
+    Standard: alles oder nichts – ein Fehler in einer Zeile -> 400 mit Ergebnis pro Zeile.
+    ?partial=1: gültige Zeilen trotzdem anlegen.
+    """
+    settings = get_settings()
+    partial = str(request.args.get("partial") or "").strip().lower() in ("1", "true", "yes", "on", "ja")
+    upload = request.files.get("file")
+    raw = upload.read() if upload else request.get_data()
+    content_type = (upload.mimetype if upload else request.content_type) or ""
+
+    try:
+        rows = parse_payload(raw, content_type)
+        if not rows:
+            raise UserImportError("no rows")
+        if len(rows) > settings.user_import_max_rows:
+            raise UserImportError(f"at most {settings.user_import_max_rows} rows per import")
+    except UserImportError as e:
+        return jsonify({"error": "bad_request", "detail": str(e)}), 400
+
+    conn = g.db
+    user = g.user
+    try:
+        emails = list({str(r.get("email") or "").strip().lower() for r in rows} - {""})
+        existing = set()
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, name FROM departments")
+            departments = {int(r["id"]): r["name"] for r in cur.fetchall() or []}
+            for start in range(0, len(emails), 500):
+                chunk = emails[start : start + 500]
+                cur.execute(f"SELECT email FROM users WHERE email IN ({','.join(['%s'] * len(chunk))})", chunk)
+                existing.update(r["email"].lower() for r in cur.fetchall() or [])
+        conn.commit()
+
+        results, passwords = validate_rows(rows, departments, existing)
+        valid = [r for r in results if "error" not in r]
+        failed = len(results) - len(valid)
+        if failed and not partial:
+            return jsonify({"error": "validation_failed", "created": 0, "failed": failed, "results": results}), 400
+
+        # teuer, aber außerhalb der Transaktion: keine Locks während bcrypt läuft
+        with trace_span("bcrypt.hash_passwords", count=len(valid)):
+            hashed = hash_passwords([passwords[r["row"]] for r in valid], settings.user_import_workers)
+
+        values = []
+        for r, (generated, pw_hash) in zip(valid, hashed):
+            if generated:
+                r["temporaryPassword"] = generated
+            values.append((r["email"], pw_hash, r["firstName"], r["lastName"], r["departmentId"], r["isOwner"], r["isActive"]))
+
+        with conn.cursor() as cur:
+            for start in range(0, len(values), 200):
+                chunk = values[start : start + 200]
+                cur.execute(
+                    "INSERT INTO users (email, password_hash, first_name, last_name, department_id, is_owner, is_active) VALUES "
+                    + ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(chunk)),
+                    [v for row in chunk for v in row],
+                )
+            ids = {}
+            for start in range(0, len(valid), 500):
+                chunk = [r["email"] for r in valid[start : start + 500]]
+                if chunk:
+                    cur.execute(f"SELECT id, email FROM users WHERE email IN ({','.join(['%s'] * len(chunk))})", chunk)
+                    ids.update({r["email"].lower(): r["id"] for r in cur.fetchall() or []})
+        if valid:
+            bump_data_version(conn, "users")
+        conn.commit()
+        if valid:
+            audit("user.import", user, "user", None, created=len(valid), failed=failed, emails=[r["email"] for r in valid])
+
+        for r in valid:
+            r["id"] = ids.get(r["email"])
+            r["status"] = "created"
+        for r in results:
+            r.setdefault("status", "error")
+
+        return jsonify({"created": len(valid), "failed": failed, "results": results}), 201 if valid else 200
+    except pymysql.err.IntegrityError:
+        # parallel angelegte E-Mail zwischen Prüfung und INSERT
+        conn.rollback()
+        return jsonify({"error": "email_exists"}), 409
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": "internal_error", "detail": str(e)}), 500
 
 
 @api_bp.post("/admin/users/<int:user_id>/department")
+@requires("admin_panel")
 def admin_set_user_department(user_id: int):
-    conn = get_conn()
+    conn = g.db
+    user = g.user
     try:
-        _user, err = require_admin(conn)
-        if err:
-            return err
-
         payload = request.get_json(silent=True) or {}
         department_id = payload.get("departmentId")
         department_id = int(department_id) if department_id not in (None, "", 0, "0") else None
@@ -1032,24 +2694,25 @@ def admin_set_user_department(user_id: int):
                     return jsonify({"error": "bad_request", "detail": "Unknown departmentId"}), 400
 
             cur.execute("UPDATE users SET department_id=%s WHERE id=%s", (department_id, user_id))
+            revoke_user_tokens(cur, user_id)
+        bump_data_version(conn, "users")
 
         conn.commit()
+        # Access-Tokens tragen die Abteilung -> beim nächsten Request über die DB neu ausstellen
+        get_revocations().revoke_user(user_id)
+        audit("user.department", user, "user", user_id, departmentId=department_id)
         return jsonify({"ok": True}), 200
     except Exception as e:
         conn.rollback()
         return jsonify({"error": "internal_error", "detail": str(e)}), 500
-    finally:
-        conn.close()
 
 
 @api_bp.post("/admin/users/<int:user_id>/active")
+@requires("admin_panel")
 def admin_set_user_active(user_id: int):
-    conn = get_conn()
+    conn = g.db
+    user = g.user
     try:
-        _user, err = require_admin(conn)
-        if err:
-            return err
-
         payload = request.get_json(silent=True) or {}
         is_active = payload.get("isActive")
         is_active = 1 if str(is_active).strip().lower() in ("1", "true", "yes", "on", "ja") else 0
@@ -1064,25 +2727,24 @@ def admin_set_user_active(user_id: int):
                 # revoke sessions if user is disabled
                 ensure_auth_tables(conn)
                 cur.execute("UPDATE user_sessions SET revoked_at = NOW() WHERE user_id=%s AND revoked_at IS NULL", (user_id,))
+                revoke_user_tokens(cur, user_id)
 
         conn.commit()
+        if is_active == 0:
+            get_revocations().revoke_user(user_id)
+        audit("user.active", user, "user", user_id, isActive=is_active)
         return jsonify({"ok": True}), 200
     except Exception as e:
         conn.rollback()
         return jsonify({"error": "internal_error", "detail": str(e)}), 500
-    finally:
-        conn.close()
 
 
 @api_bp.post("/admin/users/<int:user_id>/reset-password")
+@requires("admin_panel")
 def admin_reset_password(user_id: int):
-    conn = get_conn()
+    conn = g.db
+    user = g.user
     try:
-        ensure_auth_tables(conn)
-        _user, err = require_admin(conn)
-        if err:
-            return err
-
         payload = request.get_json(silent=True) or {}
         provided = (payload.get("password") or "").strip()
         if provided:
@@ -1094,7 +2756,7 @@ def admin_reset_password(user_id: int):
         if not (6 <= len(new_password) <= 128):
             return jsonify({"error": "password_policy"}), 400
 
-        pw_hash = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        pw_hash = hash_password(new_password)
 
         with conn.cursor() as cur:
             cur.execute("SELECT id FROM users WHERE id=%s LIMIT 1", (user_id,))
@@ -1104,11 +2766,67 @@ def admin_reset_password(user_id: int):
             cur.execute("UPDATE users SET password_hash=%s WHERE id=%s", (pw_hash, user_id))
             # revoke sessions (force re-login)
             cur.execute("UPDATE user_sessions SET revoked_at = NOW() WHERE user_id=%s AND revoked_at IS NULL", (user_id,))
+            revoke_user_tokens(cur, user_id)
 
         conn.commit()
+        get_revocations().revoke_user(user_id)
+        audit("user.reset_password", user, "user", user_id, generated=not provided)
         return jsonify({"ok": True, "temporaryPassword": new_password if not provided else None}), 200
     except Exception as e:
         conn.rollback()
         return jsonify({"error": "internal_error", "detail": str(e)}), 500
-    finally:
-        conn.close()
+
+
+@api_bp.get("/admin/audit")
+@requires("admin_panel")
+def admin_list_audit():
+    """
+    Neueste zuerst, Keyset-Paginierung: ?limit=50&before=<id> (nextBefore aus der letzten Antwort).
+    Optional gefiltert: ?action=user.active&actorId=3
+    """
+    try:
+        limit = max(1, min(int(request.args.get("limit") or 50), 500))
+        before = int(request.args["before"]) if request.args.get("before") else None
+        actor_id = int(request.args["actorId"]) if request.args.get("actorId") else None
+    except ValueError:
+        return jsonify({"error": "bad_request", "detail": "limit, before and actorId must be integers"}), 400
+    action = (request.args.get("action") or "").strip()
+
+    where, params = [], []
+    if before is not None:
+        where.append("id < %s")
+        params.append(before)
+    if action:
+        where.append("action = %s")
+        params.append(action)
+    if actor_id is not None:
+        where.append("actor_user_id = %s")
+        params.append(actor_id)
+
+    conn = g.db
+    try:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    SELECT id, created_at, actor_user_id, action, target_type, target_id, ip, detail
+                    FROM audit_log
+                    {"WHERE " + " AND ".join(where) if where else ""}
+                    ORDER BY id DESC
+                    LIMIT %s
+                    """,
+                    (*params, limit + 1),
+                )
+                rows = cur.fetchall() or []
+        except pymysql.err.ProgrammingError:
+            rows = []  # noch kein Event geschrieben -> Tabelle existiert noch nicht
+        conn.commit()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        for r in rows:
+            r["detail"] = json.loads(r["detail"]) if r.get("detail") else None
+        return jsonify({"items": rows, "nextBefore": rows[-1]["id"] if has_more else None}), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": "internal_error", "detail": str(e)}), 500
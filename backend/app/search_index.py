@@ -0,0 +1,573 @@
+"""
+In-Memory-Volltextindex für Produkte (Titel, SKU, EAN, Beschreibung).
+
+- Umlaut-Faltung: "Schädlingsfrei" findet man mit "schaedlingsfrei" und "schadlingsfrei"
+- Präfix-Suche über ein sortiertes Vokabular (bisect), ohne Obergrenze: total stimmt auch für
+  EAN-Präfixe wie "4006925". Tokens mit Ziffern (EAN/SKU) liegen zusätzlich als sortierte
+  (Token, Produkt)-Paare vor – ein Präfix ist dort ein Bereich, gezählt ohne Vereinigung
+- Tippfehler / Komposita über Trigramme auf dem Vokabular (nicht auf den Dokumenten): Kandidaten
+  über gemeinsame Trigramme, angenommen bei Editierdistanz <= 1 (ab 8 Zeichen <= 2, Vertauschung
+  zählt einfach) oder Trigramm-Jaccard >= FUZZY_MIN_SIMILARITY
+- Ranking: Feldgewicht (Code > Titel > Beschreibung) x Trefferart (exakt > Präfix > unscharf),
+  höchstens MAX_SCORED Kandidaten per Heap; mehrere Wörter werden vom seltensten aus geschnitten
+  (Messwerte: benchmarks/bench_search_index.py)
+
+Wird inkrementell über upsert()/remove() mit den Dicts aus map_shopify_product gepflegt.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from functools import lru_cache
+from itertools import chain, islice
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+FIELD_WEIGHTS = {"code": 5.0, "title": 3.0, "desc": 1.0}
+MATCH_WEIGHTS = {"exact": 3.0, "prefix": 2.0, "fuzzy": 1.0}
+
+MIN_PREFIX = 2
+MAX_FUZZY_EXPANSIONS = 16
+# Begriffe mit mehr Posting-Sets (Präfix "nd" bei 100k SKUs) werden pro Kandidat geprüft statt vereinigt
+MAX_MERGED_SETS = 64
+FUZZY_MIN_SIMILARITY = 0.45
+MAX_SCORED = 1000
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def fold_variants(text: str) -> set[str]:
+    """Kleinschreibung + beide Umlaut-Schreibweisen (ä -> ae und ä -> a)."""
+    low = (text or "").lower()
+    return {_strip_accents(low.translate(_UMLAUTS)), _strip_accents(low)}
+
+
+@lru_cache(maxsize=1 << 16)
+def _word_tokens(word: str) -> frozenset[str]:
+    tokens = set()
+    for variant in fold_variants(word):
+        tokens.update(_TOKEN_RE.findall(variant))
+    return frozenset(tokens)
+
+
+def tokenize(text: str) -> set[str]:
+    low = (text or "").lower()
+    if low.isascii():
+        return set(_TOKEN_RE.findall(low))
+    # pro Wort falten (Tokens enthalten nie Leerraum) – Wörter wiederholen sich im Katalog ständig
+    tokens = set()
+    for word in low.split():
+        tokens.update(_TOKEN_RE.findall(word) if word.isascii() else _word_tokens(word))
+    return tokens
+
+
+def query_tokens(text: str) -> list[str]:
+    # Query nur mit ae/oe/ue falten – das Vokabular enthält beide Varianten
+    low = _strip_accents((text or "").lower().translate(_UMLAUTS))
+    return list(dict.fromkeys(_TOKEN_RE.findall(low)))
+
+
+def trigrams(token: str) -> set[str]:
+    padded = f" {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def max_typos(token: str) -> int:
+    return 2 if len(token) >= 8 else 1
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Damerau-Levenshtein (Vertauschung benachbarter Zeichen = 1); > limit wird als limit + 1 gemeldet."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if prev2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return min(prev[-1], limit + 1)
+
+
+def _common_prefix(a: str, b: str) -> str:
+    n = 0
+    for ca, cb in zip(a, b):
+        if ca != cb:
+            break
+        n += 1
+    return a[:n]
+
+
+def _overlaps(codes: list[str]) -> list[tuple[str, bool]]:
+    """
+    Gemeinsame Präfixe benachbarter (sortierter) Codes eines Dokuments, dazu ob der erste Code selbst
+    dieser Präfix ist – so oft steht das Dokument in einem Präfix-Bereich von _codes doppelt.
+    """
+    found = []
+    for a, b in zip(codes, codes[1:]):
+        common = _common_prefix(a, b)
+        if len(common) >= MIN_PREFIX:
+            found.append((common, common == a))
+    return found
+
+
+def _discard_sorted(items: list, item):
+    i = bisect_left(items, item)
+    if i < len(items) and items[i] == item:
+        del items[i]
+
+
+class _CodeRange:
+    """Produkte mit einem Code, der echt mit qt beginnt – ein Bereich in _codes[field], nicht kopiert."""
+
+    __slots__ = ("entries", "lo", "hi", "qt", "field", "doc_tokens", "size", "seen")
+
+    def __init__(self, entries: list, lo: int, hi: int, qt: str, field: str, doc_tokens: dict, duplicates: int):
+        self.entries = entries
+        self.lo = lo
+        self.hi = hi
+        self.qt = qt
+        self.field = field
+        self.doc_tokens = doc_tokens
+        self.size = hi - lo - duplicates
+        # schon ausgegebene Produkte – das Ranking fragt genau nach diesen
+        self.seen = set()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, pid: str) -> bool:
+        if pid in self.seen:
+            return True
+        fields = self.doc_tokens.get(pid)
+        return fields is not None and any(t.startswith(self.qt) and t != self.qt for t in fields[self.field])
+
+    def __iter__(self):
+        # Dubletten gibt es nur bei Überlappungen – dann lokal aussortieren, ohne den Bereich zu kopieren
+        emitted = set() if self.size != self.hi - self.lo else None
+        for i in range(self.lo, self.hi):
+            pid = self.entries[i][1]
+            if emitted is not None:
+                if pid in emitted:
+                    continue
+                emitted.add(pid)
+            self.seen.add(pid)
+            yield pid
+
+
+class _DocUnion:
+    """Vereinigung mit Code-Bereichen: der größte Teil bleibt ungeteilt, nur der Rest wird gesammelt."""
+
+    __slots__ = ("base", "rest")
+
+    def __init__(self, parts: list):
+        parts = sorted(parts, key=len, reverse=True)
+        self.base = parts[0]
+        self.rest = {pid for part in parts[1:] for pid in part if pid not in self.base}
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.rest)
+
+    def __contains__(self, pid: str) -> bool:
+        return pid in self.rest or pid in self.base
+
+    def __iter__(self):
+        return chain(self.base, self.rest)
+
+
+class _Term:
+    """Ein Query-Token, aufgelöst gegen das Vokabular (Präfix als Bereich je Feld, nicht als Token-Liste)."""
+
+    __slots__ = ("qt", "exact", "prefix", "fuzzy", "codes", "sets", "found")
+
+    def __init__(self, qt: str, exact: bool, prefix: dict[str, tuple[int, int]], fuzzy: frozenset[str], codes: bool = False):
+        self.qt = qt
+        self.exact = exact
+        # codes: Präfix-Bereiche in _codes (ein Code-Bereich je Feld) statt im Vokabular
+        self.prefix = prefix
+        self.fuzzy = fuzzy
+        self.codes = codes
+        # Anzahl Posting-Sets (Obergrenze) – Maß für die Kosten einer Vereinigung
+        ranges = len(prefix) if codes else sum(hi - lo for lo, hi in prefix.values())
+        self.sets = len(FIELD_WEIGHTS) * (exact + len(fuzzy)) + ranges
+        self.found = None
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs: dict[str, dict] = {}
+        self._doc_tokens: dict[str, dict[str, set[str]]] = {}
+        # field -> token -> {product_id}
+        self._postings: dict[str, dict[str, set[str]]] = {f: {} for f in FIELD_WEIGHTS}
+        # field -> sortierte Tokens (Präfix-Bereiche per bisect)
+        self._vocab: dict[str, list[str]] = {f: [] for f in FIELD_WEIGHTS}
+        self._vocab_set: set[str] = set()
+        # field -> sortierte (Token, product_id) für Tokens mit Ziffern, dazu die Überlappungen je Dokument
+        self._codes: dict[str, list[tuple[str, str]]] = {f: [] for f in FIELD_WEIGHTS}
+        self._code_overlaps: dict[str, list[tuple[str, bool]]] = {f: [] for f in FIELD_WEIGHTS}
+        self._trigrams: dict[str, set[str]] = {}
+        # token -> Anzahl seiner Trigramme (Nenner der Jaccard-Ähnlichkeit)
+        self._trigram_sizes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # --- Pflege ---
+    @staticmethod
+    def _fields(product: dict) -> dict[str, set[str]]:
+        codes = set()
+        for raw in (product.get("sku"), product.get("ean")):
+            raw = (raw or "").strip().lower()
+            if raw:
+                codes.add(re.sub(r"[^0-9a-z]", "", raw))
+                codes.update(tokenize(raw))
+        codes.discard("")
+        return {
+            "code": codes,
+            "title": tokenize(product.get("title") or ""),
+            "desc": tokenize(product.get("description") or ""),
+        }
+
+    def _add_vocab(self, token: str):
+        if token in self._vocab_set:
+            return
+        self._vocab_set.add(token)
+        if not token.isalpha():
+            return  # Codes (mit Ziffern) werden nie unscharf gesucht
+        token_trigrams = trigrams(token)
+        self._trigram_sizes[token] = len(token_trigrams)
+        for tg in token_trigrams:
+            self._trigrams.setdefault(tg, set()).add(token)
+
+    @staticmethod
+    def _field_codes(tokens: set[str]) -> list[str]:
+        return sorted(t for t in tokens if not t.isalpha())
+
+    def _add_codes(self, pid: str, fields: dict[str, set[str]]):
+        for field, tokens in fields.items():
+            codes = self._field_codes(tokens)
+            for token in codes:
+                insort(self._codes[field], (token, pid))
+            for overlap in _overlaps(codes):
+                insort(self._code_overlaps[field], overlap)
+
+    def _drop_codes(self, pid: str, fields: dict[str, set[str]]):
+        for field, tokens in fields.items():
+            codes = self._field_codes(tokens)
+            for token in codes:
+                _discard_sorted(self._codes[field], (token, pid))
+            for overlap in _overlaps(codes):
+                _discard_sorted(self._code_overlaps[field], overlap)
+
+    def _build_codes(self):
+        for field in FIELD_WEIGHTS:
+            entries, overlaps = [], []
+            for pid, fields in self._doc_tokens.items():
+                codes = self._field_codes(fields[field])
+                entries.extend((token, pid) for token in codes)
+                overlaps.extend(_overlaps(codes))
+            entries.sort()
+            overlaps.sort()
+            self._codes[field], self._code_overlaps[field] = entries, overlaps
+
+    def _upsert_locked(self, product: dict, bulk: bool = False):
+        pid = product.get("id")
+        if not pid:
+            return
+        self._remove_locked(pid, bulk)
+        fields = self._fields(product)
+        for field, tokens in fields.items():
+            postings = self._postings[field]
+            vocab = self._vocab[field]
+            for token in tokens:
+                docs = postings.get(token)
+                if docs is None:
+                    docs = postings[token] = set()
+                    self._add_vocab(token)
+                    if not bulk:
+                        # bulk: Feld-Vokabular wird am Ende einmal sortiert statt pro Token einsortiert
+                        i = bisect_left(vocab, token)
+                        if i == len(vocab) or vocab[i] != token:
+                            vocab.insert(i, token)
+                docs.add(pid)
+        self._docs[pid] = product
+        self._doc_tokens[pid] = fields
+        if not bulk:
+            self._add_codes(pid, fields)
+
+    def upsert(self, product: dict):
+        with self._lock:
+            self._upsert_locked(product)
+
+    def upsert_many(self, products):
+        products = list(products)
+        with self._lock:
+            bulk = len(products) > 256
+            for product in products:
+                self._upsert_locked(product, bulk)
+            if bulk:
+                for field, vocab in self._vocab.items():
+                    self._vocab[field] = sorted(self._postings[field].keys() | set(vocab))
+                # Code-Paare einmal aus allen Dokumenten statt pro Produkt einsortiert
+                self._build_codes()
+
+    def remove(self, product_id: str):
+        with self._lock:
+            self._remove_locked(product_id)
+
+    def _remove_locked(self, pid: str, bulk: bool = False):
+        fields = self._doc_tokens.pop(pid, None)
+        self._docs.pop(pid, None)
+        if not fields:
+            return
+        if not bulk:
+            self._drop_codes(pid, fields)
+        for field, tokens in fields.items():
+            postings = self._postings[field]
+            for token in tokens:
+                docs = postings.get(token)
+                if docs is not None:
+                    docs.discard(pid)
+                    if not docs:
+                        del postings[token]
+        # Vokabular bleibt (Tokens ohne Postings liefern einfach keine Treffer)
+
+    def replace_all(self, products):
+        """Kompletter Neuaufbau nebenher, dann atomarer Tausch."""
+        fresh = ProductSearchIndex()
+        fresh.upsert_many(products)
+        with self._lock:
+            self._docs, self._doc_tokens = fresh._docs, fresh._doc_tokens
+            self._postings, self._vocab = fresh._postings, fresh._vocab
+            self._vocab_set, self._trigrams = fresh._vocab_set, fresh._trigrams
+            self._codes, self._code_overlaps = fresh._codes, fresh._code_overlaps
+            self._trigram_sizes = fresh._trigram_sizes
+
+    def get(self, product_id: str) -> dict | None:
+        return self._docs.get(product_id)
+
+    def products(self) -> list[dict]:
+        with self._lock:
+            return list(self._docs.values())
+
+    # --- Suche ---
+    def _term(self, qt: str) -> _Term | None:
+        """Exakt und Präfix vollständig (total stimmt auch für "4006925"), unscharf begrenzt."""
+        exact = qt in self._vocab_set
+        codes = not qt.isalpha()
+        prefix = {}
+        if len(qt) >= MIN_PREFIX and codes:
+            # Präfix mit Ziffer passt nur auf Tokens mit Ziffer; "0" ist das kleinste Zeichen -> ohne qt selbst
+            for field, entries in self._codes.items():
+                lo = bisect_left(entries, (qt + "0",))
+                hi = bisect_left(entries, (qt + "{",), lo)
+                if lo < hi:
+                    prefix[field] = (lo, hi)
+        elif len(qt) >= MIN_PREFIX:
+            for field, vocab in self._vocab.items():
+                # Vokabular besteht nur aus [0-9a-z] -> alle Tokens mit Präfix qt liegen vor qt + "{"
+                lo = bisect_left(vocab, qt)
+                hi = bisect_left(vocab, qt + "{", lo)
+                if lo < hi and vocab[lo] == qt:
+                    lo += 1
+                if lo < hi:
+                    prefix[field] = (lo, hi)
+        fuzzy = self._fuzzy(qt, matched=exact or bool(prefix))
+        if not (exact or prefix or fuzzy):
+            return None
+        return _Term(qt, exact, prefix, fuzzy, codes)
+
+    def _fuzzy(self, qt: str, matched: bool) -> frozenset[str]:
+        if len(qt) < 4 or any(c.isdigit() for c in qt):
+            # Codes (EAN/SKU) nur exakt/Präfix – unscharf wäre hier falsch und teuer
+            return frozenset()
+
+        # Teilstring in Komposita ("frei" in "schaedlingsfrei"): Schnittmenge der inneren Trigramme
+        inner = [self._trigrams.get(qt[i : i + 3], set()) for i in range(len(qt) - 2)]
+        inner.sort(key=len)
+        fuzzy = []
+        for token in set.intersection(*inner) if inner and inner[0] else ():
+            if qt in token and not token.startswith(qt):
+                fuzzy.append(token)
+                if len(fuzzy) >= MAX_FUZZY_EXPANSIONS:
+                    break
+        if matched or fuzzy:
+            return frozenset(fuzzy)
+
+        # Tippfehler (nur wenn sonst nichts passt). Ein Edit ändert höchstens 4 Trigramme
+        # (Vertauschung), Kandidaten brauchen also mindestens len(q_tg) - 4 x Edits gemeinsame.
+        q_tg = trigrams(qt)
+        typos = max_typos(qt)
+        counts = Counter()
+        for tg in q_tg:
+            counts.update(self._trigrams.get(tg, ()))
+        min_common = max(1, min(len(q_tg) - 4 * typos, math.ceil(FUZZY_MIN_SIMILARITY * len(q_tg))))
+        ranked = []
+        for token, common in counts.items():
+            if common < min_common:
+                continue
+            similarity = common / (len(q_tg) + self._trigram_sizes[token] - common)
+            distance = edit_distance(qt, token, typos)
+            if distance <= typos or similarity >= FUZZY_MIN_SIMILARITY:
+                ranked.append((distance, -similarity, token))
+        return frozenset(token for _distance, _similarity, token in sorted(ranked)[:MAX_FUZZY_EXPANSIONS])
+
+    def _code_range(self, field: str, qt: str, lo: int, hi: int) -> _CodeRange:
+        # Dokumente mit mehreren Codes unter qt stehen mehrfach im Bereich
+        overlaps = self._code_overlaps[field]
+        duplicates = bisect_left(overlaps, (qt + "{",)) - bisect_left(overlaps, (qt,))
+        duplicates -= bisect_right(overlaps, (qt, True)) - bisect_left(overlaps, (qt, True))
+        return _CodeRange(self._codes[field], lo, hi, qt, field, self._doc_tokens, duplicates)
+
+    def _posting_sets(self, term: _Term) -> list[tuple[float, list[set[str]]]]:
+        """(Gewicht, Posting-Sets) des Begriffs, absteigend – die Sets des Index selbst, nicht kopiert."""
+        if term.found is None:
+            term.found = self._resolve(term)
+        return term.found
+
+    def _resolve(self, term: _Term) -> list[tuple[float, list[set[str]]]]:
+        by_weight: dict[float, list[set[str]]] = {}
+        for field, fw in FIELD_WEIGHTS.items():
+            postings = self._postings[field]
+            if term.exact and term.qt in postings:
+                by_weight.setdefault(fw * MATCH_WEIGHTS["exact"], []).append(postings[term.qt])
+            if field in term.prefix:
+                lo, hi = term.prefix[field]
+                if term.codes:
+                    sets = [self._code_range(field, term.qt, lo, hi)]
+                else:
+                    sets = list(filter(None, map(postings.get, self._vocab[field][lo:hi])))
+                if sets:
+                    by_weight.setdefault(fw * MATCH_WEIGHTS["prefix"], []).extend(sets)
+            sets = [postings[token] for token in term.fuzzy if token in postings]
+            if sets:
+                by_weight.setdefault(fw * MATCH_WEIGHTS["fuzzy"], []).extend(sets)
+        return sorted(by_weight.items(), reverse=True)
+
+    def _doc_weight(self, pid: str, term: _Term) -> float:
+        """Bestes Feld x Trefferart des Begriffs in einem Dokument (über dessen Tokens, ohne Postings)."""
+        best = 0.0
+        for field, tokens in self._doc_tokens[pid].items():
+            if term.exact and term.qt in tokens:
+                kind = "exact"
+            elif field in term.prefix and any(t.startswith(term.qt) for t in tokens):
+                kind = "prefix"
+            elif term.fuzzy and not term.fuzzy.isdisjoint(tokens):
+                kind = "fuzzy"
+            else:
+                continue
+            best = max(best, FIELD_WEIGHTS[field] * MATCH_WEIGHTS[kind])
+        return best
+
+    @staticmethod
+    def _union(found: list[tuple[float, list[set[str]]]]) -> set[str]:
+        sets = [docs for _w, group in found for docs in group]
+        # ein einzelnes Posting-Set nicht kopieren (wird nur gelesen, unter self._lock)
+        if len(sets) == 1:
+            return sets[0]
+        if all(type(docs) is set for docs in sets):
+            return set().union(*sets)
+        return _DocUnion(sets)
+
+    @staticmethod
+    def _intersect(a, b) -> set[str]:
+        if type(a) is set and type(b) is set:
+            return a & b
+        small, big = (a, b) if len(a) <= len(b) else (b, a)
+        return {pid for pid in small if pid in big}
+
+    def _rarity(self, term: _Term) -> tuple[int, int]:
+        # Begriffe mit wenigen Posting-Sets nach Trefferzahl (Obergrenze), die übrigen danach
+        if term.sets > MAX_MERGED_SETS:
+            return 1, term.sets
+        return 0, sum(len(docs) for _w, group in self._posting_sets(term) for docs in group)
+
+    def _candidates(self, terms: list[_Term], all_matched: bool) -> tuple[set[str], list]:
+        """
+        (Dokumente mit allen Begriffen – sonst beste Teiltreffer –, Posting-Sets des Leitbegriffs).
+        Aufgelöst wird nur der seltenste Begriff; die übrigen schränken per Schnittmenge ein bzw.
+        bei sehr vielen Posting-Sets pro Kandidat.
+        """
+        terms = sorted(terms, key=self._rarity)
+        lead = self._posting_sets(terms[0])
+        if all_matched:
+            if len(terms) > 1 and terms[0].sets <= MAX_MERGED_SETS:
+                # wenige Sets: jedes einzeln mit dem nächsten Begriff schneiden statt erst zu vereinigen
+                parts = [docs for _w, group in lead for docs in group]
+            else:
+                parts = [self._union(lead)]
+            for term in terms[1:]:
+                if not any(parts):
+                    break
+                if term.sets <= MAX_MERGED_SETS:
+                    others = [docs for _w, group in self._posting_sets(term) for docs in group]
+                    parts = [set().union(*(self._intersect(part, docs) for part in parts for docs in others))]
+                else:
+                    parts = [{pid for part in parts for pid in part if self._doc_weight(pid, term)}]
+            candidates = parts[0] if len(parts) == 1 else set()
+            if candidates:
+                return candidates, lead
+        return self._union([f for term in terms for f in self._posting_sets(term)]), lead
+
+    @staticmethod
+    def _pool(lead, candidates: set[str], limit: int):
+        """
+        Höchstens MAX_SCORED Dokumente zum Bewerten; bei sehr allgemeinen Queries zuerst die
+        aus der Bestgruppe des Leitbegriffs.
+        """
+        if len(candidates) <= MAX_SCORED:
+            return candidates
+        best = (pid for docs in lead[0][1] for pid in (docs if docs is candidates else (p for p in docs if p in candidates)))
+        pool = dict.fromkeys(islice(best, MAX_SCORED))
+        if len(pool) < limit:
+            pool.update(dict.fromkeys(islice((pid for pid in candidates if pid not in pool), MAX_SCORED - len(pool))))
+        return pool
+
+    def search(self, query: str, limit: int = 20) -> dict:
+        qts = query_tokens(query)
+        if not qts:
+            return {"items": [], "total": 0}
+
+        with self._lock:
+            terms = [t for t in map(self._term, qts) if t is not None]
+            if not terms:
+                return {"items": [], "total": 0}
+
+            candidates, lead = self._candidates(terms, len(terms) == len(qts))
+            total = len(candidates)
+
+            # Gewicht je Begriff: über die Posting-Sets (absteigend), bei sehr vielen Sets über die Tokens des Dokuments
+            weights = []
+            for term in terms:
+                found = self._posting_sets(term) if term.sets <= MAX_MERGED_SETS else None
+                weights.append((term, found and [(w, docs) for w, group in found for docs in group]))
+
+            def rank(pid: str) -> tuple[float, int, str]:
+                score = 0.0
+                for term, pairs in weights:
+                    if pairs is None:
+                        score += self._doc_weight(pid, term)
+                        continue
+                    for w, docs in pairs:
+                        if pid in docs:
+                            score += w
+                            break
+                return -score, len(self._docs[pid].get("title") or ""), pid
+
+            # Heap statt Komplettsortierung: nur die besten `limit` werden geordnet
+            best = heapq.nsmallest(limit, map(rank, self._pool(lead, candidates, limit)))
+            items = [dict(self._docs[pid], score=-neg) for neg, _len, pid in best]
+            return {"items": items, "total": total}
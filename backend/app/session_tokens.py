@@ -0,0 +1,138 @@
+"""
+Kurzlebige, signierte Session-Tokens (JWT, HS256) als Cache vor der DB-Session.
+
+Das np_session-Cookie bleibt die Quelle der Wahrheit (user_sessions in MySQL).
+Zusätzlich trägt ein Access-Cookie die wichtigsten User-Felder, damit die meisten
+Requests ohne DB-Lookup auskommen. Widerrufene Sessions werden über eine kleine
+In-Memory-Revocation-Liste geprüft, die periodisch aus user_sessions und
+user_token_revocations (alle Tokens eines Users) synchronisiert wird.
+Das Access-Token gilt nur zusammen mit dem np_session-Cookie, für das es ausgestellt wurde
+(Claim "sth" = HMAC des Session-Tokens).
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import threading
+import time
+
+from .lazy import lazy_import
+
+jwt = lazy_import("jwt")
+
+ALGORITHM = "HS256"
+
+
+def session_binding(session_token: str, secret: str) -> str:
+    # nicht der token_hash aus user_sessions – der Claim ist für jeden mit dem Cookie lesbar
+    return hmac.new(secret.encode("utf-8"), session_token.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def encode_access_token(user: dict, session_id: int, secret: str, ttl_seconds: int, *, session_token: str) -> str:
+    now = int(time.time())
+    claims = {
+        "sub": str(user["id"]),
+        "sid": session_id,
+        "sth": session_binding(session_token, secret),
+        "dep": user.get("departmentId"),
+        "own": bool(user.get("isOwner")),
+        "em": user.get("email"),
+        "fn": user.get("firstName"),
+        "ln": user.get("lastName"),
+        "dn": user.get("departmentName"),
+        "iat": now,
+        "exp": now + ttl_seconds,
+    }
+    return jwt.encode(claims, secret, algorithm=ALGORITHM)
+
+
+def decode_access_token(token: str, secret: str) -> dict | None:
+    try:
+        return jwt.decode(token, secret, algorithms=[ALGORITHM], options={"require": ["sub", "sid", "iat", "exp"]})
+    except jwt.PyJWTError:
+        return None
+
+
+def is_bound_to(claims: dict, session_token: str, secret: str) -> bool:
+    """Gehört das Access-Token zu diesem Session-Cookie? (Tokens ohne "sth" nie.)"""
+    return hmac.compare_digest(str(claims.get("sth") or ""), session_binding(session_token, secret))
+
+
+def user_from_claims(claims: dict) -> dict:
+    """Gleiche Form wie get_current_user() aus der DB liefert."""
+    return {
+        "id": int(claims["sub"]),
+        "email": claims.get("em"),
+        "firstName": claims.get("fn"),
+        "lastName": claims.get("ln"),
+        "departmentId": claims.get("dep"),
+        "departmentName": claims.get("dn"),
+        "isOwner": bool(claims.get("own")),
+        "isActive": True,
+    }
+
+
+class RevocationList:
+    """
+    Widerrufene Session-IDs (und pro User: "alles vor Zeitpunkt X ungültig").
+    Nur Einträge jünger als `window_seconds` sind relevant – ältere Tokens sind ohnehin abgelaufen.
+    """
+
+    def __init__(self, window_seconds: int, sync_interval: int):
+        self.window_seconds = window_seconds
+        self.sync_interval = sync_interval
+        self._sessions: dict[int, float] = {}
+        self._users: dict[int, float] = {}
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def needs_sync(self) -> bool:
+        return time.monotonic() - self._synced_at >= self.sync_interval
+
+    def revoke_session(self, session_id: int):
+        with self._lock:
+            self._sessions[int(session_id)] = time.time()
+
+    def revoke_user(self, user_id: int):
+        with self._lock:
+            self._users[int(user_id)] = time.time()
+
+    def is_revoked(self, claims: dict) -> bool:
+        with self._lock:
+            if int(claims["sid"]) in self._sessions:
+                return True
+            revoked_before = self._users.get(int(claims["sub"]))
+        return revoked_before is not None and claims["iat"] <= revoked_before
+
+    def sync(self, conn):
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, UNIX_TIMESTAMP(revoked_at) AS revoked_ts
+                FROM user_sessions
+                WHERE revoked_at IS NOT NULL AND revoked_at >= NOW() - INTERVAL %s SECOND
+                """,
+                (self.window_seconds,),
+            )
+            rows = cur.fetchall() or []
+            cur.execute(
+                """
+                SELECT user_id, UNIX_TIMESTAMP(revoked_at) AS revoked_ts
+                FROM user_token_revocations
+                WHERE revoked_at >= NOW() - INTERVAL %s SECOND
+                """,
+                (self.window_seconds,),
+            )
+            user_rows = cur.fetchall() or []
+
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            sessions = {sid: ts for sid, ts in self._sessions.items() if ts >= cutoff}
+            sessions.update({int(r["id"]): float(r["revoked_ts"] or 0) for r in rows})
+            self._sessions = sessions
+            users = {uid: ts for uid, ts in self._users.items() if ts >= cutoff}
+            for r in user_rows:
+                uid = int(r["user_id"])
+                users[uid] = max(users.get(uid, 0.0), float(r["revoked_ts"] or 0))
+            self._users = users
+            self._synced_at = time.monotonic()
@@ -0,0 +1,321 @@
+"""
+Typisierte, unveränderliche Settings – einmal in create_app() aufgelöst.
+
+Quelle ist die Flask-Config (config.Config / TestingConfig ...), Fallback die Umgebung.
+Handler lesen nur noch get_settings() statt bei jedem Request os.getenv() + Parsing.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Mapping
+from urllib.parse import unquote, urlparse
+
+from .markets import parse_market_credentials
+from .ratelimit import parse_rate
+
+# persistente Laufzeitdaten (Spools) – nicht /tmp, das bei Neustarts/tmpfs verschwindet
+VAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "var")
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+# tolerant (falls jemand DE-Werte setzt)
+TRUE_VALUES_DE = TRUE_VALUES + ("ja", "treu", "wahr")
+
+
+@dataclass(frozen=True)
+class MySQLTarget:
+    host: str
+    user: str
+    password: str
+    database: str
+    port: int = 3306
+
+
+@dataclass(frozen=True)
+class Settings:
+    secret_key: str
+    testing: bool
+    mysql: MySQLTarget | None
+    mysql_reader: MySQLTarget | None
+    replica_max_lag_seconds: int
+    replica_check_seconds: int
+    read_your_writes_seconds: int
+    db_statement_timeout_ms: int
+    db_read_timeout_seconds: int
+    orders_export_timeout_ms: int
+    order_intake_mode: str
+    order_intake_spool_path: str
+    order_intake_batch_size: int
+    order_intake_flush_seconds: float
+    cors_origins: tuple[str, ...]
+
+    session_cookie_name: str
+    session_ttl_days: int
+    cookie_secure: bool
+    cookie_samesite: str
+    allow_registration: bool
+
+    session_mode: str
+    session_jwt_secret: str
+    session_jwt_ttl_seconds: int
+    session_revocation_sync_seconds: int
+    permissions_cache_ttl: int
+
+    user_import_max_rows: int
+    audit_enabled: bool
+    audit_spool_path: str
+    audit_queue_max: int
+    audit_batch_size: int
+    audit_flush_seconds: float
+
+    sse_heartbeat_seconds: float
+    sse_max_seconds: float
+    sse_buffer_events: int
+    sse_max_clients: int
+    user_import_workers: int
+
+    auth_rate_limit: bool
+    auth_rate_ip: tuple[int, float]
+    auth_rate_email: tuple[int, float]
+    rate_limit_backend: str
+    rate_limit_sqlite_path: str
+    rate_limit_max_keys: int
+
+    cache_backend: str
+    cache_sqlite_path: str
+    cache_max_bytes: int
+    cache_l1_max_entries: int
+
+    thumb_cache_dir: str
+    thumb_cache_max_bytes: int
+    thumb_allowed_hosts: tuple[str, ...]
+    thumb_allowed_path_prefix: str
+    thumb_signing_secret: str
+
+    products_cache_ttl: int
+    shopify_store_domain: str
+    shopify_storefront_token: str
+    shopify_api_version: str
+    shopify_markets: tuple[tuple[str, str, str], ...]
+    shopify_timeout_seconds: float
+    shopify_http_pool_size: int
+    market_compare_concurrency: int
+    shopify_probe_timeout_seconds: float
+    shopify_slow_seconds: float
+    shopify_breaker_failures: int
+    shopify_breaker_window: int
+    shopify_breaker_open_seconds: float
+    shopify_stale_ttl: int
+    shopify_webhook_secret: str
+    shopify_webhook_delay_seconds: float
+    shopify_webhook_max_delay_seconds: float
+    shopify_reconcile_seconds: float
+    search_prefetch_workers: int
+    search_prefetch_max_bytes: int
+    search_prefetch_ttl: float
+    catalog_snapshot_path: str
+    trace_sample_rate: float
+    trace_parent_based: bool
+    trace_file: str
+    trace_file_max_bytes: int
+    trace_file_backups: int
+
+    @property
+    def access_cookie_name(self) -> str:
+        return f"{self.session_cookie_name}_at"
+
+    @property
+    def session_tokens_enabled(self) -> bool:
+        return self.session_mode == "jwt" and bool(self.session_jwt_secret)
+
+    @classmethod
+    def from_config(cls, config: Mapping | None = None, env: Mapping | None = None) -> "Settings":
+        config = config or {}
+        env = os.environ if env is None else env
+
+        def get(key: str, default: str = "", env_key: str | None = None) -> str:
+            value = config.get(key)
+            if value is None:
+                value = env.get(env_key or key)
+            return default if value is None else str(value).strip()
+
+        def flag(key: str, default: str, truthy=TRUE_VALUES) -> bool:
+            return get(key, default).lower() in truthy
+
+        cookie_secure = flag("COOKIE_SECURE", "", TRUE_VALUES_DE)
+        raw_origins = get("CORS_ORIGINS")
+        if raw_origins:
+            origins = tuple(o.strip() for o in raw_origins.split(",") if o.strip())
+        else:
+            origins = ("http://localhost:5173", "http://127.0.0.1:5173")
+
+        return cls(
+            secret_key=get("SECRET_KEY"),
+            testing=bool(config.get("TESTING")),
+            mysql=parse_mysql_target(env),
+            # optionale Read-Replica; ohne MYSQL_READER_URL laufen alle Reads auf dem Primary
+            mysql_reader=parse_mysql_url(get("MYSQL_READER_URL")),
+            replica_max_lag_seconds=int(get("MYSQL_REPLICA_MAX_LAG_SECONDS", "5")),
+            replica_check_seconds=int(get("MYSQL_REPLICA_CHECK_SECONDS", "5")),
+            read_your_writes_seconds=int(get("MYSQL_READ_YOUR_WRITES_SECONDS", "10")),
+            # MAX_EXECUTION_TIME pro Session (= pro Request, Connections leben nur einen Request); 0 = aus
+            db_statement_timeout_ms=int(get("MYSQL_STATEMENT_TIMEOUT_MS", "10000")),
+            # Socket-Timeout als letzte Grenze (greift auch bei UPDATE/DELETE und hängenden Locks)
+            db_read_timeout_seconds=int(get("MYSQL_READ_TIMEOUT_SECONDS", "30")),
+            orders_export_timeout_ms=int(get("ORDERS_EXPORT_TIMEOUT_MS", str(10 * 60 * 1000))),
+            # "sync" (201 nach Commit) oder "async" (202 nach fsync in den Spool)
+            order_intake_mode=get("ORDER_INTAKE_MODE", "sync").lower(),
+            # muss Neustarts überleben -> auf Railway auf ein Volume legen
+            order_intake_spool_path=get("ORDER_INTAKE_SPOOL_PATH", os.path.join(VAR_DIR, "np_orders.spool.jsonl")),
+            order_intake_batch_size=int(get("ORDER_INTAKE_BATCH_SIZE", "50")),
+            order_intake_flush_seconds=float(get("ORDER_INTAKE_FLUSH_SECONDS", "0.5")),
+            cors_origins=origins,
+            # Flask selbst nutzt SESSION_COOKIE_NAME für flask.session -> eigener Config-Key
+            session_cookie_name=get("AUTH_COOKIE_NAME", "np_session", env_key="SESSION_COOKIE_NAME"),
+            session_ttl_days=int(get("SESSION_TTL_DAYS", "30")),
+            cookie_secure=cookie_secure,
+            cookie_samesite=_normalize_samesite(get("COOKIE_SAMESITE"), cookie_secure),
+            allow_registration=flag("AUTH_ALLOW_REGISTRATION", "true"),
+            session_mode=get("SESSION_MODE", "db").lower(),
+            # bewusst nicht Config.SECRET_KEY (Default "change-me") – nur explizit gesetzte Secrets
+            session_jwt_secret=get("SESSION_JWT_SECRET") or (env.get("SECRET_KEY") or "").strip(),
+            session_jwt_ttl_seconds=int(get("SESSION_JWT_TTL_SECONDS", "300")),
+            session_revocation_sync_seconds=int(get("SESSION_REVOCATION_SYNC_SECONDS", "15")),
+            permissions_cache_ttl=int(get("PERMISSIONS_CACHE_TTL", "30")),
+            user_import_max_rows=int(get("USER_IMPORT_MAX_ROWS", "2000")),
+            # 0 = os.cpu_count()
+            user_import_workers=int(get("USER_IMPORT_WORKERS", "0")),
+            audit_enabled=flag("AUDIT_LOG", "true"),
+            audit_spool_path=get("AUDIT_SPOOL_PATH", os.path.join(VAR_DIR, "np_audit.spool.jsonl")),
+            audit_queue_max=int(get("AUDIT_QUEUE_MAX", "10000")),
+            audit_batch_size=int(get("AUDIT_BATCH_SIZE", "200")),
+            audit_flush_seconds=float(get("AUDIT_FLUSH_SECONDS", "1.0")),
+            sse_heartbeat_seconds=float(get("SSE_HEARTBEAT_SECONDS", "15")),
+            sse_max_seconds=float(get("SSE_MAX_SECONDS", "300")),
+            sse_buffer_events=int(get("SSE_BUFFER_EVENTS", "100")),
+            sse_max_clients=int(get("SSE_MAX_CLIENTS", "50")),
+            auth_rate_limit=flag("AUTH_RATE_LIMIT", "true"),
+            auth_rate_ip=parse_rate(get("AUTH_RATE_LIMIT_IP"), "20/60"),
+            auth_rate_email=parse_rate(get("AUTH_RATE_LIMIT_EMAIL"), "5/60"),
+            rate_limit_backend=get("RATE_LIMIT_BACKEND", "memory").lower(),
+            rate_limit_sqlite_path=get("RATE_LIMIT_SQLITE_PATH", "/tmp/np_ratelimit.sqlite3"),
+            rate_limit_max_keys=int(get("RATE_LIMIT_MAX_KEYS", "10000")),
+            cache_backend=get("CACHE_BACKEND", "tiered").lower(),
+            cache_sqlite_path=get("CACHE_SQLITE_PATH", "/tmp/np_cache.sqlite3"),
+            cache_max_bytes=int(get("CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            cache_l1_max_entries=int(get("CACHE_L1_MAX_ENTRIES", "2048")),
+            thumb_cache_dir=get("THUMB_CACHE_DIR", "/tmp/np_thumbs"),
+            thumb_cache_max_bytes=int(get("THUMB_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            thumb_allowed_hosts=tuple(
+                h.strip().lower() for h in get("THUMB_ALLOWED_HOSTS", "cdn.shopify.com").split(",") if h.strip()
+            ),
+            # Dateien dieses Stores, z. B. "/s/files/1/0123/4567/" – sonst jeder Shop auf cdn.shopify.com
+            thumb_allowed_path_prefix=get("THUMB_ALLOWED_PATH_PREFIX", "/s/files/"),
+            # signiert die Thumbnail-URLs (sig); leer = unsigniert (nur lokal sinnvoll)
+            thumb_signing_secret=get("THUMB_SIGNING_SECRET") or (env.get("SECRET_KEY") or "").strip(),
+            products_cache_ttl=int(get("PRODUCTS_CACHE_TTL", "60")),
+            shopify_store_domain=get("SHOPIFY_STORE_DOMAIN"),
+            shopify_storefront_token=get("SHOPIFY_STOREFRONT_TOKEN"),
+            shopify_api_version=get("SHOPIFY_API_VERSION", "2024-07"),
+            # Länder mit eigenem Store: "CH=domain:token,UK=domain:token"; alle anderen per @inContext
+            shopify_markets=tuple(
+                (code, domain, token) for code, (domain, token) in parse_market_credentials(get("SHOPIFY_MARKETS")).items()
+            ),
+            shopify_timeout_seconds=float(get("SHOPIFY_TIMEOUT_SECONDS", "8")),
+            # Keep-Alive-Verbindungen pro Store-Domain und Worker (gthread/gevent: ~ Threads bzw. Verbindungen)
+            shopify_http_pool_size=int(get("SHOPIFY_HTTP_POOL_SIZE", "20")),
+            # gleichzeitige Marktvergleiche pro Worker, die ohne Warteschlange laufen (Pool = Märkte x Wert)
+            market_compare_concurrency=max(1, int(get("MARKET_COMPARE_CONCURRENCY", "4"))),
+            shopify_probe_timeout_seconds=float(get("SHOPIFY_PROBE_TIMEOUT_SECONDS", "3")),
+            shopify_slow_seconds=float(get("SHOPIFY_SLOW_SECONDS", "5")),
+            shopify_breaker_failures=int(get("SHOPIFY_BREAKER_FAILURES", "5")),
+            shopify_breaker_window=int(get("SHOPIFY_BREAKER_WINDOW", "20")),
+            shopify_breaker_open_seconds=float(get("SHOPIFY_BREAKER_OPEN_SECONDS", "30")),
+            # wie lange die letzte gute Antwort als Fallback (stale) taugt
+            shopify_stale_ttl=int(get("SHOPIFY_STALE_TTL", str(24 * 3600))),
+            # App-Secret aus dem Shopify-Admin (Webhook-Signatur); leer = Webhooks abgelehnt
+            shopify_webhook_secret=get("SHOPIFY_WEBHOOK_SECRET"),
+            shopify_webhook_delay_seconds=float(get("SHOPIFY_WEBHOOK_DELAY_SECONDS", "2")),
+            shopify_webhook_max_delay_seconds=float(get("SHOPIFY_WEBHOOK_MAX_DELAY_SECONDS", "10")),
+            # kompletter Abgleich gegen verpasste Events; 0 = aus
+            shopify_reconcile_seconds=float(get("SHOPIFY_RECONCILE_SECONDS", str(6 * 3600))),
+            # gleichzeitige Prefetches der nächsten Suchseite pro Worker; 0 = aus
+            search_prefetch_workers=int(get("SEARCH_PREFETCH_WORKERS", "2")),
+            search_prefetch_max_bytes=int(get("SEARCH_PREFETCH_MAX_BYTES", str(8 * 1024 * 1024))),
+            search_prefetch_ttl=float(get("SEARCH_PREFETCH_TTL", "60")),
+            # gemeinsamer Katalog-Snapshot für den Warmstart; leer = aus
+            catalog_snapshot_path=get("CATALOG_SNAPSHOT_PATH", "/tmp/np_catalog.snapshot"),
+            # Anteil gesampelter Requests (0.0–1.0); 0 = nur Trace-Id-Header, kein Export
+            trace_sample_rate=float(get("TRACE_SAMPLE_RATE", "0")),
+            # Sampled-Flag eines eingehenden traceparent übernehmen (nur hinter eigenem Proxy sinnvoll)
+            trace_parent_based=flag("TRACE_PARENT_BASED", "false"),
+            trace_file=get("TRACE_FILE", "/tmp/np_traces.jsonl"),
+            trace_file_max_bytes=int(get("TRACE_FILE_MAX_BYTES", str(10 * 1024 * 1024))),
+            trace_file_backups=int(get("TRACE_FILE_BACKUPS", "3")),
+        )
+
+
+def _normalize_samesite(raw: str, secure: bool) -> str:
+    # Für getrennte Frontend/Backend-Domains (Railway) braucht es oft SameSite=None + Secure
+    if not raw:
+        return "None" if secure else "Lax"
+    # ungewohnter Wert: unverändert durchreichen (kann dann von Werkzeug abgelehnt werden)
+    return {"none": "None", "lax": "Lax", "strict": "Strict"}.get(raw.lower(), raw)
+
+
+def parse_mysql_target(env: Mapping) -> MySQLTarget | None:
+    host = env.get("MYSQLHOST")
+    user = env.get("MYSQLUSER")
+    password = env.get("MYSQLPASSWORD")
+    database = env.get("MYSQLDATABASE")
+    port = int(env.get("MYSQLPORT") or "3306")
+
+    if all([host, user, password, database]):
+        return MySQLTarget(host=host, user=user, password=password, database=database, port=port)
+
+    # Fallback: Railway gibt oft nur MYSQL_URL/MYSQL_PUBLIC_URL (oder DATABASE_URL) mit.
+    url = env.get("MYSQL_URL") or env.get("MYSQL_PUBLIC_URL") or env.get("DATABASE_URL") or ""
+    return parse_mysql_url(url, MySQLTarget(host=host, user=user, password=password, database=database, port=port))
+
+
+def parse_mysql_url(url: str | None, base: MySQLTarget | None = None) -> MySQLTarget | None:
+    url = (url or "").strip()
+    host, user, password, database, port = (
+        (base.host, base.user, base.password, base.database, base.port) if base else (None, None, None, None, 3306)
+    )
+    if url:
+        # SQLAlchemy-Style URLs tolerieren
+        if url.startswith("mysql+pymysql://"):
+            url = url.replace("mysql+pymysql://", "mysql://", 1)
+        parsed = urlparse(url)
+        if parsed.scheme.startswith("mysql"):
+            host = parsed.hostname or host
+            user = unquote(parsed.username) if parsed.username else user
+            password = unquote(parsed.password) if parsed.password else password
+            db_from_path = (parsed.path or "").lstrip("/")
+            database = db_from_path or database
+            try:
+                port = parsed.port or port
+            except ValueError:
+                pass
+
+    if not all([host, user, password, database]):
+        return None
+    return MySQLTarget(host=host, user=user, password=password, database=database, port=port)
+
+
+_current: Settings | None = None
+
+
+def configure(settings: Settings) -> Settings:
+    global _current
+    _current = settings
+    return settings
+
+
+def get_settings() -> Settings:
+    """Aktive Settings; außerhalb von create_app() (Skripte) einmalig aus der Umgebung."""
+    global _current
+    if _current is None:
+        _current = Settings.from_config()
+    return _current
@@ -0,0 +1,204 @@
+"""
+Thumbnail-Proxy für Shopify-Produktbilder mit Disk-Cache.
+
+Ablage content-addressed:
+- blobs/<ab>/<sha256 des Thumbnails>.webp   (Inhalt, Dateiname = ETag)
+- refs/<sha256 von src|w>                    (zeigt auf den Blob)
+
+Gleiche Ergebnisbilder werden nur einmal gespeichert. Die Größe ist begrenzt;
+verdrängt wird nach mtime (wird beim Ausliefern aufgefrischt) = LRU.
+
+Der Endpoint ist öffentlich (<img>-Tags) – daher nur URLs, die map_shopify_product ausgegeben
+hat: HMAC über (src, Breite) im Parameter sig, Quelle auf Host + Pfad-Präfix des Stores
+beschränkt, keine Redirects, Größenlimit schon beim Lesen.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import io
+import os
+import tempfile
+import threading
+from urllib.parse import quote, urlparse
+
+from .lazy import lazy_import
+
+requests = lazy_import("requests")
+
+# feste Stufen statt beliebiger Breiten: begrenzt die Anzahl Varianten pro Bild
+WIDTHS = (64, 128, 256, 512)
+DEFAULT_WIDTH = 128
+CONTENT_TYPE = "image/webp"
+
+
+class ThumbnailError(ValueError):
+    pass
+
+
+def snap_width(raw) -> int:
+    try:
+        w = int(raw)
+    except (TypeError, ValueError):
+        return DEFAULT_WIDTH
+    return next((x for x in WIDTHS if x >= w), WIDTHS[-1])
+
+
+def is_allowed_source(src: str, allowed_hosts: tuple[str, ...], path_prefix: str = "/") -> bool:
+    parsed = urlparse(src or "")
+    return (
+        parsed.scheme == "https"
+        and (parsed.hostname or "").lower() in allowed_hosts
+        and parsed.port is None
+        and parsed.path.startswith(path_prefix)
+    )
+
+
+def sign_source(src: str, width: int, secret: str) -> str:
+    return hmac.new(secret.encode("utf-8"), f"{src}|{width}".encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def verify_source(src: str, width: int, sig: str, secret: str) -> bool:
+    """Ohne Secret (lokal) unsigniert erlaubt – dann greift nur is_allowed_source()."""
+    if not secret:
+        return True
+    return hmac.compare_digest(sign_source(src, width, secret), sig or "")
+
+
+def thumbnail_path(src: str, width: int = DEFAULT_WIDTH, secret: str = "") -> str:
+    path = f"/api/images/thumb?src={quote(src, safe='')}&w={width}"
+    return f"{path}&sig={sign_source(src, width, secret)}" if secret else path
+
+
+def resize(data: bytes, width: int) -> bytes:
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("RGB", (width, width))  # JPEG: schon beim Dekodieren verkleinern
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+        img.thumbnail((width, width * 4))
+        out = io.BytesIO()
+        img.save(out, format="WEBP", quality=80, method=4)
+    return out.getvalue()
+
+
+class ThumbnailCache:
+    def __init__(self, root: str, max_bytes: int, max_source_bytes: int = 15 * 1024 * 1024, evict_every: int = 50):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_source_bytes = max_source_bytes
+        self.evict_every = evict_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "refs"), exist_ok=True)
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+
+    def _ref_path(self, src: str, width: int) -> str:
+        key = hashlib.sha256(f"{src}|{width}".encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "refs", key)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}.webp")
+
+    def lookup(self, src: str, width: int) -> tuple[str, str] | None:
+        """(digest, Blob-Pfad) wenn vorhanden, sonst None."""
+        try:
+            with open(self._ref_path(src, width), "r", encoding="ascii") as f:
+                digest = f.read().strip()
+        except FileNotFoundError:
+            return None
+        path = self._blob_path(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return digest, path
+
+    def get_or_create(self, src: str, width: int) -> tuple[str, str]:
+        hit = self.lookup(src, width)
+        if hit:
+            return hit
+
+        data = self._fetch(src)
+        thumb = resize(data, width)
+        digest = hashlib.sha256(thumb).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            self._atomic_write(path, thumb)
+        self._atomic_write(self._ref_path(src, width), digest.encode("ascii"))
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+        return digest, path
+
+    def _fetch(self, src: str) -> bytes:
+        # kein Redirect: das Ziel läge außerhalb der geprüften Quelle
+        resp = requests.get(src, timeout=10, stream=True, allow_redirects=False)
+        try:
+            if resp.is_redirect:
+                raise requests.HTTPError(f"{resp.status_code} redirect not followed", response=resp)
+            resp.raise_for_status()
+            declared = resp.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > self.max_source_bytes:
+                raise ThumbnailError("source image too large")
+            chunks, size = [], 0
+            for chunk in resp.iter_content(64 * 1024):
+                size += len(chunk)
+                if size > self.max_source_bytes:
+                    raise ThumbnailError("source image too large")
+                chunks.append(chunk)
+        finally:
+            resp.close()
+        return b"".join(chunks)
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def evict(self):
+        """Älteste Blobs löschen, bis wieder unter 90 % von max_bytes; verwaiste refs gleich mit."""
+        blobs = []
+        total = 0
+        for dirpath, _dirs, files in os.walk(os.path.join(self.root, "blobs")):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blobs.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        for _mtime, size, path in sorted(blobs):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+        refs_dir = os.path.join(self.root, "refs")
+        for name in os.listdir(refs_dir):
+            ref = os.path.join(refs_dir, name)
+            try:
+                with open(ref, "r", encoding="ascii") as f:
+                    digest = f.read().strip()
+                if not os.path.exists(self._blob_path(digest)):
+                    os.unlink(ref)
+            except (FileNotFoundError, UnicodeDecodeError):
+                continue
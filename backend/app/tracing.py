@@ -0,0 +1,284 @@
+"""
+Leichtgewichtiges Request-Tracing (ohne OpenTelemetry-SDK).
+
+- ein Server-Span pro Request, Kind-Spans für cursor.execute, shopify_graphql, bcrypt, commit
+- Trace-Id in jeder Response (X-Trace-Id + W3C traceparent), auch wenn nicht gesampelt
+- Export: eine Zeile pro Trace im OTLP/JSON-Format (resourceSpans), rotierende lokale Datei;
+  lässt sich z. B. mit dem otlpjsonfile-Receiver des OTel-Collectors einlesen
+- Sampling: Anteil pro Request (0 = aus); optional dem Sampled-Flag eines eingehenden
+  traceparent folgen
+
+Nicht gesampelte Requests zahlen pro Instrumentierungspunkt nur ein ContextVar.get().
+"""
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import random
+import time
+from functools import wraps
+
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_OK, STATUS_ERROR = 1, 2
+
+TRACE_HEADER = "X-Trace-Id"
+SERVICE_NAME = "productmanager-backend"
+
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("np_span", default=None)
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+def parse_traceparent(header: str | None) -> tuple[str, str, bool] | None:
+    """W3C traceparent "00-<trace>-<parent>-<flags>" -> (trace_id, parent_id, sampled)."""
+    parts = (header or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32:
+        return None
+    return parts[1], parts[2], sampled
+
+
+def _attr(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Trace:
+    __slots__ = ("trace_id", "sampled", "spans")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: list[Span] = []
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status", "message", "_token")
+
+    def __init__(self, trace: Trace, name: str, kind: int = KIND_INTERNAL, parent_id: str | None = None, attributes: dict | None = None):
+        self.trace = trace
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.status = STATUS_OK
+        self.message = ""
+        self._token = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def error(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.message = f"{type(exc).__name__}: {exc}"
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.error(exc)
+        self.end()
+        _current.reset(self._token)
+        return False
+
+    def end(self):
+        if not self.end_ns:
+            self.end_ns = time.time_ns()
+            self.trace.spans.append(self)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attr(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": self.status, "message": self.message} if self.status == STATUS_ERROR else {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Für nicht gesampelte Requests: gleiche Schnittstelle, tut nichts."""
+
+    __slots__ = ()
+
+    def set(self, key, value):
+        pass
+
+    def error(self, exc):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP = _NoopSpan()
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Kind-Span des aktuellen (gesampelten) Spans, sonst NOOP."""
+    parent = _current.get()
+    if parent is None:
+        return NOOP
+    return Span(parent.trace, name, kind, parent.span_id, attributes)
+
+
+def traced(name: str, kind: int = KIND_INTERNAL):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(name, kind):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class FileExporter:
+    """Eine JSON-Zeile (OTLP ExportTraceServiceRequest) pro Trace, rotierend."""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 3):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def export(self, trace: Trace):
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_attr("service.name", SERVICE_NAME), _attr("process.pid", os.getpid())]},
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": [s.to_otlp() for s in trace.spans]}],
+                }
+            ]
+        }
+        record = logging.LogRecord(__name__, logging.INFO, __file__, 0, json.dumps(payload, separators=(",", ":")), None, None)
+        self._handler.handle(record)
+
+    def close(self):
+        self._handler.close()
+
+
+class Tracer:
+    def __init__(self, exporter=None, sample_rate: float = 0.0, parent_based: bool = False):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.parent_based = parent_based
+
+    def start_request(self, traceparent: str | None = None, name: str = "request", attributes: dict | None = None):
+        """
+        (trace_id, root_span | None). Der Root-Span ist ab hier der aktuelle Span;
+        Name/Attribute setzt der Aufrufer erst, wenn wirklich gesampelt wird.
+        """
+        parent = parse_traceparent(traceparent)
+        trace_id, parent_id = (parent[0], parent[1]) if parent else (_new_id(16), None)
+        if parent and self.parent_based:
+            sampled = parent[2]
+        else:
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled or self.exporter is None:
+            return trace_id, None
+        root = Span(Trace(trace_id, True), name, KIND_SERVER, parent_id, attributes)
+        root._token = _current.set(root)
+        return trace_id, root
+
+    def finish_request(self, root: Span | None, status_code: int | None = None, exc: BaseException | None = None):
+        if root is None:
+            return
+        if status_code is not None:
+            root.set("http.status_code", status_code)
+            if status_code >= 500:
+                root.status = STATUS_ERROR
+        if exc is not None:
+            root.error(exc)
+        root.end()
+        try:
+            _current.reset(root._token)
+        except ValueError:
+            _current.set(None)  # anderer Context (z. B. Streaming-Response)
+        self.exporter.export(root.trace)
+
+
+def traceparent_header(trace_id: str, span_id: str | None, sampled: bool) -> str:
+    return f"00-{trace_id}-{span_id or _new_id(8)}-{'01' if sampled else '00'}"
+
+
+# ----------------------------
+# PyMySQL
+# ----------------------------
+_cursor_classes: dict[type, type] = {}
+
+
+def _statement(query) -> str:
+    text = query.decode("utf-8", "replace") if isinstance(query, bytes) else str(query)
+    return " ".join(text.split())[:500]
+
+
+def traced_cursor(base: type) -> type:
+    """Cursor-Klasse, die execute/executemany als db-Spans aufzeichnet (Statement ohne Parameter)."""
+    cls = _cursor_classes.get(base)
+    if cls is not None:
+        return cls
+
+    class TracedCursor(base):
+        def execute(self, query, args=None):
+            if _current.get() is None:
+                return super().execute(query, args)
+            with span("db.execute", KIND_CLIENT, **{"db.system": "mysql", "db.statement": _statement(query)}) as s:
+                result = super().execute(query, args)
+                s.set("db.rowcount", self.rowcount)
+                return result
+
+        def executemany(self, query, args):
+            if _current.get() is None:
+                return super().executemany(query, args)
+            with span("db.executemany", KIND_CLIENT, **{"db.system": "mysql", "db.statement": _statement(query)}) as s:
+                result = super().executemany(query, args)
+                s.set("db.rowcount", self.rowcount)
+                return result
+
+    TracedCursor.__name__ = f"Traced{base.__name__}"
+    _cursor_classes[base] = TracedCursor
+    return TracedCursor
+
+
+def instrument_connection(conn):
+    """commit/rollback der Connection als Spans (Instanz-Attribute, die Klasse bleibt unberührt)."""
+    conn.commit = traced("db.commit", KIND_CLIENT)(conn.commit)
+    conn.rollback = traced("db.rollback", KIND_CLIENT)(conn.rollback)
+    return conn
@@ -0,0 +1,185 @@
+"""
+Massen-Import von Usern (CSV oder JSON) für das Onboarding ganzer Abteilungen.
+
+Ablauf: alles parsen und prüfen, bevor irgendetwas geschrieben wird; dann
+Passwörter (ggf. generierte Temp-Passwörter) parallel in Threads hashen – bcrypt ist
+absichtlich teuer (seriell wären 500 User mehrere Minuten) und gibt dabei den GIL frei.
+Kein Prozess-Pool: fork aus einem Worker, in dem schon Threads laufen (Audit-Writer,
+Prefetch, gthread), kann an gehaltenen Locks hängen bleiben.
+Das Einfügen selbst passiert in routes.py mit Mehrzeilen-INSERTs in einer Transaktion.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import secrets
+
+from .concurrency import thread_map
+
+TRUE_VALUES = ("1", "true", "yes", "on", "ja")
+FALSE_VALUES = ("0", "false", "no", "off", "nein")
+
+# CSV-Kopfzeilen (case-insensitive) -> Feld; deutsche Excel-Exporte gleich mit
+HEADER_ALIASES = {
+    "email": "email",
+    "e-mail": "email",
+    "mail": "email",
+    "firstname": "firstName",
+    "first_name": "firstName",
+    "vorname": "firstName",
+    "lastname": "lastName",
+    "last_name": "lastName",
+    "nachname": "lastName",
+    "departmentid": "departmentId",
+    "department_id": "departmentId",
+    "department": "department",
+    "abteilung": "department",
+    "isowner": "isOwner",
+    "is_owner": "isOwner",
+    "isactive": "isActive",
+    "is_active": "isActive",
+    "aktiv": "isActive",
+    "password": "password",
+    "passwort": "password",
+}
+
+# darunter lohnt der Pool-Start nicht
+MIN_POOL_BATCH = 8
+
+
+class UserImportError(ValueError):
+    """Datei nicht lesbar (falsches Format, keine Zeilen, zu viele Zeilen)."""
+
+
+def parse_payload(raw: bytes, content_type: str) -> list[dict]:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    text = raw.decode("utf-8-sig", errors="replace")
+    if content_type == "application/json" or text.lstrip().startswith(("[", "{")):
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise UserImportError(f"invalid json: {e}")
+        if isinstance(data, dict):
+            data = data.get("users")
+        if not isinstance(data, list) or not all(isinstance(r, dict) for r in data):
+            raise UserImportError('expected a list of users or {"users": [...]}')
+        return data
+    return parse_csv(text)
+
+
+def parse_csv(text: str) -> list[dict]:
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(io.StringIO(text), dialect)
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise UserImportError("empty file")
+    fields = [HEADER_ALIASES.get(h.strip().lower().replace(" ", "")) for h in header]
+    if "email" not in fields:
+        raise UserImportError("missing email column")
+
+    rows = []
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        rows.append({f: v for f, v in zip(fields, values) if f})
+    return rows
+
+
+def _flag(value, default: int) -> int:
+    raw = str(value if value is not None else "").strip().lower()
+    if raw in TRUE_VALUES:
+        return 1
+    if raw in FALSE_VALUES:
+        return 0
+    return default
+
+
+def validate_rows(
+    rows: list[dict], departments: dict[int, str], existing_emails: set[str]
+) -> tuple[list[dict], dict[int, str | None]]:
+    """
+    (Ergebnisse, Passwörter): pro Zeile {"row", "email", ...} mit den Spaltenwerten für den INSERT
+    oder {"row", "email", "error"}; Passwörter getrennt (row -> Klartext oder None), damit sie nie
+    in einer Response landen.
+    `departments`: id -> Name; Abteilungen dürfen per ID oder Name angegeben werden.
+    """
+    by_name = {name.strip().lower(): dep_id for dep_id, name in departments.items()}
+    seen: set[str] = set()
+    results = []
+    passwords: dict[int, str | None] = {}
+    for idx, raw in enumerate(rows, start=1):
+        email = str(raw.get("email") or "").strip().lower()
+        result = {"row": idx, "email": email}
+        results.append(result)
+
+        if not email or "@" not in email or len(email) > 255:
+            result["error"] = "email_invalid"
+            continue
+        if email in seen:
+            result["error"] = "email_duplicate"
+            continue
+        seen.add(email)
+        if email in existing_emails:
+            result["error"] = "email_exists"
+            continue
+
+        department_id = None
+        dep_raw = str(raw.get("departmentId") or "").strip()
+        dep_name = str(raw.get("department") or "").strip().lower()
+        if dep_raw and dep_raw != "0":
+            try:
+                department_id = int(dep_raw)
+            except ValueError:
+                result["error"] = "department_unknown"
+                continue
+            if department_id not in departments:
+                result["error"] = "department_unknown"
+                continue
+        elif dep_name:
+            department_id = by_name.get(dep_name)
+            if department_id is None:
+                result["error"] = "department_unknown"
+                continue
+
+        password = str(raw.get("password") or "").strip() or None
+        if password is not None and not (6 <= len(password) <= 128):
+            result["error"] = "password_policy"
+            continue
+
+        result.update(
+            {
+                "firstName": str(raw.get("firstName") or "").strip() or None,
+                "lastName": str(raw.get("lastName") or "").strip() or None,
+                "departmentId": department_id,
+                "isOwner": _flag(raw.get("isOwner"), 0),
+                "isActive": _flag(raw.get("isActive"), 1),
+            }
+        )
+        passwords[idx] = password
+    return results, passwords
+
+
+def _hash_one(password: str | None) -> tuple[str | None, str]:
+    """(generiertes Temp-Passwort oder None, bcrypt-Hash) – läuft in einem Pool-Thread."""
+    import bcrypt
+
+    generated = None
+    if password is None:
+        generated = password = secrets.token_urlsafe(10)
+    return generated, bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+
+def hash_passwords(passwords: list[str | None], workers: int = 0) -> list[tuple[str | None, str]]:
+    """Reihenfolge bleibt erhalten."""
+    if not passwords:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    if workers <= 1 or len(passwords) < MIN_POOL_BATCH:
+        return [_hash_one(p) for p in passwords]
+    return thread_map(_hash_one, passwords, workers)
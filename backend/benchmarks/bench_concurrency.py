@@ -0,0 +1,216 @@
+"""
+Durchsatz-Benchmark: gunicorn sync vs. threaded (gthread) vs. gevent bei gleicher Worker-Zahl
+(= gleicher Speicher; RSS aller Prozesse wird mitgemessen).
+
+Gemessen wird /api/products/search mit simulierter Shopify-Latenz (kein Netz nötig): die
+HTTP-Session der App wird durch eine ersetzt, die `--upstream-ms` schläft und eine feste
+Seite liefert. Routing, Breaker, Cache und Mapping laufen wie in Produktion.
+
+Aufruf (aus backend/):  python benchmarks/bench_concurrency.py [--workers 2] [--clients 64] [--seconds 5]
+gevent wird übersprungen, wenn es nicht installiert ist.
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import importlib.util
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def _page() -> dict:
+    edges = [
+        {
+            "node": {
+                "id": f"gid://shopify/Product/{i}",
+                "title": f"Neudorff Produkt {i}",
+                "description": "Bench",
+                "featuredImage": None,
+                "variants": {"edges": [{"node": {"sku": f"ND-{i}", "barcode": f"400692500{i:04d}", "price": {"amount": "9.99"}}}]},
+            }
+        }
+        for i in range(20)
+    ]
+    return {"data": {"products": {"pageInfo": {"hasNextPage": False, "endCursor": None}, "edges": edges}}}
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+class _FakeSession:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.payload = _page()
+
+    def post(self, url, **kwargs):
+        time.sleep(self.latency)  # unter gevent gepatcht -> kooperativ wie ein echter Socket
+        return _FakeResponse(self.payload)
+
+
+def __getattr__(name):
+    # gunicorn lädt "bench_concurrency:app"
+    if name != "app":
+        raise AttributeError(name)
+    import dataclasses
+
+    from app import create_app, routes
+    from app.settings import configure
+
+    app = create_app("testing")
+    configure(dataclasses.replace(app.extensions["settings"], shopify_store_domain="bench.invalid", shopify_storefront_token="bench"))
+    session = _FakeSession(float(os.environ.get("BENCH_UPSTREAM_MS", "50")) / 1000)
+    routes.get_http_session = lambda: session
+    globals()["app"] = app
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_kb(pid: int) -> int:
+    total = 0
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration):
+            pass
+    return total
+
+
+def _wait_ready(port: int, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("gunicorn did not come up")
+
+
+def _load(port: int, clients: int, seconds: float) -> tuple[int, int, list[float]]:
+    stop = time.monotonic() + seconds
+    lock = threading.Lock()
+    ok, errors, latencies = [0], [0], []
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = []
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            try:
+                conn.request("GET", f"/api/products/search?q={uuid.uuid4().hex[:8]}")
+                resp = conn.getresponse()
+                resp.read()
+                success = resp.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                success = False
+            local.append(time.perf_counter() - started)
+            with lock:
+                if success:
+                    ok[0] += 1
+                else:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return ok[0], errors[0], latencies
+
+
+def run_profile(profile: str, args) -> dict:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "GUNICORN_PROFILE": profile,
+        "WEB_CONCURRENCY": str(args.workers),
+        "WEB_THREADS": str(args.threads),
+        "WEB_CONNECTIONS": str(args.threads),
+        "PORT": str(port),
+        "BENCH_UPSTREAM_MS": str(args.upstream_ms),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--pythonpath", "benchmarks", "--log-level", "warning", "bench_concurrency:app"],
+        cwd=BACKEND,
+        env=env,
+    )
+    try:
+        _wait_ready(port)
+        _load(port, min(args.clients, 8), 1.0)  # Warm-up
+        ok, errors, latencies = _load(port, args.clients, args.seconds)
+        rss = _rss_kb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(10)
+    latencies.sort()
+    return {
+        "profile": profile,
+        "rps": ok / args.seconds,
+        "errors": errors,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+        "rss_mb": rss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=16, help="Threads (gthread) bzw. Verbindungen (gevent) pro Worker")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--upstream-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    profiles = ["sync", "threaded"]
+    if importlib.util.find_spec("gevent") is not None:
+        profiles.append("gevent")
+    else:
+        print("gevent not installed - skipping cooperative profile")
+
+    print(f"workers={args.workers} threads/connections={args.threads} clients={args.clients} upstream={args.upstream_ms:.0f}ms")
+    print(f"{'profile':<10} {'req/s':>8} {'p50':>9} {'p95':>9} {'errors':>7} {'rss':>8}")
+    for profile in profiles:
+        r = run_profile(profile, args)
+        print(f"{r['profile']:<10} {r['rps']:>8.1f} {r['p50_ms']:>7.1f}ms {r['p95_ms']:>7.1f}ms {r['errors']:>7} {r['rss_mb']:>6.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Feed-Prüfung: synthetischer Katalog (gemappt wie map_shopify_product, mit ~1 % kaputten EANs
+und 0-Preisen) -> validate_feed(), verglichen mit einer naiven Prüfung Zeile für Zeile.
+
+Aufruf (aus backend/):  python benchmarks/bench_feed_validation.py [--products 100000] [--runs 5]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+
+from app.feed_validation import PROFILES, validate_feed  # noqa: E402
+
+
+def with_check_digit(body: str) -> str:
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(body)))
+    return body + str((10 - total % 10) % 10)
+
+
+def make_catalog(n: int) -> list[dict]:
+    rng = random.Random(7)
+    products = []
+    for i in range(n):
+        ean = with_check_digit(f"400692{i:06d}")
+        if rng.random() < 0.01:
+            ean = ean[:-1] + str((int(ean[-1]) + 1) % 10)
+        products.append(
+            {
+                "id": f"gid://shopify/Product/{i}",
+                "title": f"Neudorff Produkt {i}",
+                "sku": f"ND-{i}",
+                "ean": "" if rng.random() < 0.005 else ean,
+                "price": 0.0 if rng.random() < 0.005 else round(rng.uniform(2, 80), 2),
+                "description": "Beschreibung",
+                "image": "https://cdn.shopify.com/a.jpg",
+                "thumbnail": "",
+            }
+        )
+    return products
+
+
+def validate_rowwise(products: list[dict], profile) -> int:
+    """Referenz: dieselben Prüfungen Produkt für Produkt."""
+    eans = Counter(p["ean"] for p in products)
+    skus = Counter(p["sku"] for p in products)
+    issues = 0
+    for p in products:
+        for name in profile.required:
+            issues += not p.get(name)
+        ean = p["ean"]
+        if ean:
+            if not (ean.isdigit() and len(ean) in profile.gtin_lengths):
+                issues += 1
+            else:
+                total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(ean[:-1])))
+                issues += (10 - total % 10) % 10 != int(ean[-1])
+            issues += eans[ean] > 1
+        issues += bool(p["sku"]) and skus[p["sku"]] > 1
+        lo, hi = profile.price_bounds
+        issues += bool(p["price"]) and not lo <= p["price"] <= hi
+    return issues
+
+
+def timed(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    products = make_catalog(args.products)
+    profile = PROFILES["obi"]
+    report = validate_feed(products, profile)
+    print(f"{args.products} products, {report['invalid']} invalid: {report['counts']}")
+    print(f"column-wise   {timed(lambda: validate_feed(products, profile), args.runs):8.1f}ms")
+    print(f"row-by-row    {timed(lambda: validate_rowwise(products, profile), args.runs):8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
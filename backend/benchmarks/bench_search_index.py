@@ -0,0 +1,92 @@
+"""
+Suchindex-Benchmark: synthetischer Katalog (Titel "Neudorff ...", EAN 4006925xxxxxx) ->
+Aufbau von ProductSearchIndex, dann Median pro Query für typische Fälle.
+
+Aufruf (aus backend/):  python benchmarks/bench_search_index.py [--products 100000] [--runs 20]
+
+Gemessen (100.000 Produkte, Median aus 50 Läufen, ein Kern; vorher = Präfix-Obergrenze 64,
+Vereinigung aller Posting-Sets, Komplettsortierung):
+
+                            vorher              nachher
+    Aufbau                  16,2 s              7,8 s
+    'neudorff' (alle)       46,9 ms             1,1 ms
+    '4006925' (EAN-Präfix)  0,4 ms, total=64    1,4 ms, total=100000
+    'ferramol schnecken'    7,6 ms              5,1 ms
+    'schnec'                7,2 ms              3,4 ms
+    'tomatn' (Tippfehler)   7,6 ms              3,5 ms
+    'ND-004711'             3,7 ms              0,04 ms
+
+Der EAN-Präfix ist ein Bereich in den sortierten Code-Paaren (vorher Vereinigung über 100.000
+Code-Tokens, 97 ms). Bei zwei Wörtern bleibt die exakte Schnittmenge für total (~2 ms) plus das
+Bewerten von MAX_SCORED Kandidaten; je nach Lauf 3–5,5 ms.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+
+from app.search_index import ProductSearchIndex  # noqa: E402
+
+WORDS = (
+    "neem schnecken ferramol unkraut finalsan blattlaus rasen dünger bio garten rosen tomaten spray "
+    "konzentrat granulat schädlingsfrei spruzit loxiran radiklin azet kompost erde beeren obst gemüse "
+    "zierpflanzen buchsbaum ameisen mücken wühlmaus moos algen hecken kübel balkon hochbeet"
+).split()
+
+QUERIES = {
+    "token in every product": "neudorff",
+    "EAN prefix": "4006925",
+    "two words": "ferramol schnecken",
+    "prefix": "schnec",
+    "typo": "tomatn",
+    "sku": "ND-004711",
+}
+
+
+def synthetic_catalog(n: int) -> list[dict]:
+    rng = random.Random(3)
+    # ein paar tausend Fantasienamen, damit das Vokabular realistisch groß wird
+    names = sorted({"".join(rng.choice("aeiounrstlmdgkbhc") for _ in range(rng.randint(5, 10))) for _ in range(5000)})
+    return [
+        {
+            "id": f"gid://shopify/Product/{i}",
+            "title": f"Neudorff {rng.choice(names).title()} " + " ".join(rng.sample(WORDS, 2)).title(),
+            "sku": f"ND-{i:06d}",
+            "ean": f"4006925{i:06d}",
+            "price": round(rng.uniform(3, 60), 2),
+            "description": " ".join(rng.sample(WORDS, 8)),
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    products = synthetic_catalog(args.products)
+    started = time.perf_counter()
+    index = ProductSearchIndex()
+    index.upsert_many(products)
+    print(f"{args.products} products, build {time.perf_counter() - started:.1f}s")
+
+    for label, query in QUERIES.items():
+        samples = []
+        for _ in range(args.runs):
+            t0 = time.perf_counter()
+            result = index.search(query, 20)
+            samples.append((time.perf_counter() - t0) * 1000)
+        print(f"{label:24s} {query!r:22s} {statistics.median(samples):7.2f}ms  total={result['total']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Katalog-Snapshot-Benchmark: synthetischer Katalog -> write_snapshot, dann in einem frischen
+Prozess: create_app() mit Snapshot und Zeit bis zur ersten lokalen Suche (= Warmstart).
+
+Aufruf (aus backend/):  python benchmarks/bench_snapshot.py [--products 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+
+from app.catalog_snapshot import write_snapshot  # noqa: E402
+
+WORDS = "neem schnecken ferramol unkraut finalsan blattlaus rasen dünger bio garten rosen tomaten spray konzentrat granulat schädlingsfrei".split()
+
+PROBE = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+from app import create_app
+app = create_app("testing")
+from app import routes
+routes.load_catalog_snapshot(os.environ["CATALOG_SNAPSHOT_PATH"])
+t1 = time.perf_counter()
+client = app.test_client()
+resp = client.get("/api/products/local-search?q=ferramol%20rosen").get_json()
+t2 = time.perf_counter()
+print(json.dumps({
+    "create_app_ms": (t1 - t0) * 1000,
+    "first_search_ms": (t2 - t1) * 1000,
+    "ready_total_ms": (t2 - t0) * 1000,
+    "source": resp.get("source"),
+    "total": resp["total"],
+}))
+"""
+
+
+def synthetic_catalog(n: int) -> list[dict]:
+    rng = random.Random(1)
+    return [
+        {
+            "id": f"gid://shopify/Product/{i}",
+            "title": " ".join(rng.sample(WORDS, 3)).title(),
+            "sku": f"ND-{i:06d}",
+            "ean": f"4006925{i:06d}",
+            "price": round(rng.uniform(3, 60), 2),
+            "description": "Anwendung im Garten, " * 8,
+            "image": f"https://cdn.shopify.com/s/files/{i}.jpg",
+            "thumbnail": f"/api/images/thumb?src={i}",
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.snapshot")
+        products = synthetic_catalog(args.products)
+        t0 = time.perf_counter()
+        write_snapshot(path, products)
+        write_ms = (time.perf_counter() - t0) * 1000
+
+        env = {**os.environ, "CATALOG_SNAPSHOT_PATH": path}
+        out = subprocess.run([sys.executable, "-c", PROBE], cwd=BACKEND, env=env, capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        result.update(products=args.products, write_ms=write_ms, size_mb=os.path.getsize(path) / 1e6)
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Import-/Startup-Benchmark: misst in frischen Prozessen
+- Import von `app`
+- create_app()
+- ersten Request (/api/health) und ersten Request, der requests/bcrypt/pymysql anfasst
+
+Aufruf (aus backend/):  python benchmarks/bench_startup.py [--runs 15]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app("testing")
+t2 = time.perf_counter()
+client = app.test_client()
+client.get("/api/health")
+t3 = time.perf_counter()
+import app.routes as routes
+routes.bcrypt.gensalt(rounds=4)
+routes.requests.Session
+routes.pymysql.cursors.DictCursor
+t4 = time.perf_counter()
+print(json.dumps({
+    "import_app_ms": (t1 - t0) * 1000,
+    "create_app_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t3 - t2) * 1000,
+    "heavy_modules_ms": (t4 - t3) * 1000,
+    "ready_total_ms": (t3 - t0) * 1000,
+}))
+"""
+
+
+def run_once() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=15)
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    print(f"{'metric':<20} {'median':>10} {'p90':>10}")
+    for key in samples[0]:
+        values = sorted(s[key] for s in samples)
+        p90 = values[min(len(values) - 1, int(len(values) * 0.9))]
+        print(f"{key:<20} {statistics.median(values):>9.1f}ms {p90:>9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
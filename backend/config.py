@@ -33,3 +33,17 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     DEBUG = True
+    # Tests teilen sich keine Rate-Limit-Datei mit lokal laufenden Workern
+    RATE_LIMIT_BACKEND = "memory"
+    CACHE_BACKEND = "memory"
+    AUDIT_LOG = "false"
+    # keine Hintergrund-Calls gegen Shopify aus Tests heraus
+    SEARCH_PREFETCH_WORKERS = "0"
+    CATALOG_SNAPSHOT_PATH = ""
+
+
+config_by_name = {
+    "development": DevelopmentConfig,
+    "production": ProductionConfig,
+    "testing": TestingConfig,
+}
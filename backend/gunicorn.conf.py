@@ -0,0 +1,72 @@
+"""
+gunicorn-Profile (aus backend/):  gunicorn -c gunicorn.conf.py
+
+GUNICORN_PROFILE
+    sync      ein Request pro Worker (bisheriges Verhalten)
+    threaded  gthread: WEB_THREADS Threads pro Worker
+    gevent    WEB_CONNECTIONS Greenlets pro Worker (pip install gevent)
+
+Die meiste Zeit wartet ein Request auf Shopify oder MySQL; mit threaded/gevent überlappen
+diese Wartezeiten innerhalb eines Workers, statt dafür weitere Worker (= RAM) zu brauchen.
+
+Immer mit --preload: App, Katalog-Snapshot und die verzögerten Module (lazy.py) werden
+einmal im Master geladen, die Worker teilen die Seiten per Copy-on-Write. Alles, was nicht
+über fork hinweg geteilt werden darf (SQLite-Connections, HTTP-Session, Thread-Pools,
+Hintergrund-Threads), legen die Worker beim ersten Zugriff selbst neu an (pid-Prüfung).
+
+Benchmark: python benchmarks/bench_concurrency.py
+"""
+import os
+
+profile = os.getenv("GUNICORN_PROFILE", "sync").strip().lower()
+
+if profile == "gevent":
+    # vor allen anderen Imports: die App legt beim Laden Locks an, die schon gepatcht sein müssen
+    from gevent import monkey
+
+    monkey.patch_all()
+
+# create_app() startet Hintergrund-Threads (Order-Intake-Writer) nicht im Master, sondern post_worker_init
+os.environ["NP_START_WORKERS_POST_FORK"] = "1"
+
+wsgi_app = "wsgi:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+preload_app = True
+timeout = int(os.getenv("WEB_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.getenv("WEB_ACCESS_LOG") or None
+
+if profile == "gevent":
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("WEB_CONNECTIONS", "100"))
+elif profile == "threaded":
+    worker_class = "gthread"
+    threads = int(os.getenv("WEB_THREADS", "16"))
+elif profile == "sync":
+    worker_class = "sync"
+else:
+    raise RuntimeError(f"unknown GUNICORN_PROFILE: {profile!r} (sync, threaded, gevent)")
+
+# für concurrency.max_streams(): SSE nur, wenn ein Stream nicht den ganzen Worker belegt
+os.environ["NP_WORKER_PROFILE"] = profile
+if profile == "threaded":
+    os.environ["NP_WORKER_THREADS"] = str(threads)
+
+
+def when_ready(server):
+    # Master, nach dem Laden der App, vor dem ersten fork
+    from app.lazy import warm_lazy_modules
+
+    server.log.info("profile=%s, preloaded modules: %s", profile, ", ".join(warm_lazy_modules()) or "-")
+
+
+def post_worker_init(worker):
+    # ohne --preload (z. B. per Kommandozeile überschrieben) lädt jeder Worker selbst
+    from app.lazy import warm_lazy_modules
+    from app.routes import start_background_workers
+
+    warm_lazy_modules()
+    # im Worker nach dem Laden der App: Threads des Masters überleben den fork nicht
+    start_background_workers()
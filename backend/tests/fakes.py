@@ -0,0 +1,120 @@
+"""
+PyMySQL-Doubles für die Tests: FakeDB.connect() -> FakeConn -> FakeCursor.
+
+Ein Test beschreibt nur sein SQL-Routing in einer FakeDB-Unterklasse: execute()/executemany()
+setzen cursor.rows bzw. cursor.lastrowid und merken Schreibzugriffe per cursor.conn.stage(...)
+vor; apply() übernimmt eine vorgemerkte Änderung beim commit(), rollback() verwirft sie.
+Jede Connection protokolliert (SQL mit normalisiertem Leerraum, args) in statements.
+"""
+from __future__ import annotations
+
+from itertools import islice
+
+
+class FakeCursor:
+    """Auch ohne Connection nutzbar (z. B. als Basisklasse für traced_cursor)."""
+
+    def __init__(self, conn: FakeConn | None = None):
+        self.conn = conn
+        self.rows = []
+        self.lastrowid = None
+        self.rowcount = 0
+        self.fetched = 0
+        self.closed = False
+        self._stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, args=None):
+        self.rows, self.rowcount, self._stream = [], 1, None
+        if self.conn is not None:
+            self.conn.statements.append((" ".join(sql.split()), args))
+            self.conn.db.execute(self, sql, args)
+        return self.rowcount
+
+    def executemany(self, sql, rows):
+        self.rowcount = len(rows)
+        if self.conn is not None:
+            self.conn.statements.append((" ".join(sql.split()), rows))
+            self.conn.db.executemany(self, sql, rows)
+        return self.rowcount
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchmany(self, size):
+        # wie SSCursor: rows darf ein Generator sein, gelesen wird nur, was abgeholt wird
+        if self._stream is None:
+            self._stream = iter(self.rows)
+        batch = list(islice(self._stream, size))
+        self.fetched += len(batch)
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConn:
+    def __init__(self, db: FakeDB | None = None, role: str = "writer"):
+        self.db = db if db is not None else FakeDB()
+        self.np_role = role
+        self.statements = []
+        self.cursors = []
+        self.pending = []
+        self.closed = False
+
+    def cursor(self, cursorclass=None):
+        cursor = self.db.cursor(self)
+        self.cursors.append(cursor)
+        return cursor
+
+    def stage(self, *changes):
+        self.pending.extend(changes)
+
+    def commit(self):
+        pending, self.pending = self.pending, []
+        for change in pending:
+            self.db.apply(change)
+
+    def rollback(self):
+        self.pending = []
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def queries(self, fragment: str = "") -> list[str]:
+        return [sql for sql, _args in self.statements if fragment in sql]
+
+
+class FakeDB:
+    """Ohne Routing: jede Query liefert keine Zeilen, commit() übernimmt nichts."""
+
+    def __init__(self):
+        self.down = False
+
+    def connect(self, role: str = "writer") -> FakeConn:
+        if self.down:
+            raise OSError("db down")
+        return FakeConn(self, role)
+
+    def cursor(self, conn: FakeConn) -> FakeCursor:
+        return FakeCursor(conn)
+
+    def execute(self, cursor: FakeCursor, sql: str, args):
+        pass
+
+    def executemany(self, cursor: FakeCursor, sql: str, rows):
+        pass
+
+    def apply(self, change):
+        pass
@@ -0,0 +1,145 @@
+import fcntl
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.audit import AuditLog, make_event
+from tests.fakes import FakeDB
+
+
+class AuditDB(FakeDB):
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+
+    def executemany(self, cursor, sql, rows):
+        if any(row[2] == "boom" for row in rows):
+            raise ValueError("Data too long")
+        cursor.conn.stage(*rows)
+
+    def apply(self, row):
+        self.rows.append(row)
+
+
+class AuditLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spool = os.path.join(self.tmp.name, "audit.jsonl")
+        self.db = AuditDB()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_log(self, **kwargs):
+        audit = AuditLog(self.db.connect, self.spool, **kwargs)
+        audit._ensure_thread = lambda: None  # Tests schreiben synchron per drain()
+        return audit
+
+    def test_batches_are_written(self):
+        audit = self.make_log(batch_size=2)
+        for i in range(5):
+            audit.emit(make_event("user.active", 1, "user", i, "127.0.0.1", {"isActive": 0}))
+        audit.drain()
+        self.assertEqual(len(self.db.rows), 5)
+        self.assertEqual(self.db.rows[0][2:6], ("user.active", "user", "0", "127.0.0.1"))
+        self.assertEqual(self.db.rows[0][6], '{"isActive": 0}')
+
+    def test_spool_when_db_down_and_replay(self):
+        audit = self.make_log()
+        self.db.down = True
+        audit.emit(make_event("auth.login", 1))
+        audit.drain()
+        self.assertEqual(self.db.rows, [])
+        self.assertTrue(os.path.exists(self.spool))
+
+        self.db.down = False
+        audit.emit(make_event("auth.logout", 1))
+        audit.drain()
+        self.assertEqual([r[2] for r in self.db.rows], ["auth.login", "auth.logout"])
+        self.assertFalse(os.path.exists(self.spool))
+        self.assertEqual(audit.stats["replayed"], 1)
+
+    def test_full_queue_spills_to_disk(self):
+        audit = self.make_log(max_queue=2)
+        for i in range(3):
+            audit.emit(make_event("auth.login", i))
+        self.assertEqual(audit.stats["spooled"], 1)
+        audit.drain()
+        self.assertEqual(len(self.db.rows), 3)
+
+    def test_rejected_event_does_not_block_the_log(self):
+        audit = self.make_log()
+        self.db.down = True
+        audit.emit(make_event("boom", 1))
+        audit.emit(make_event("auth.login", 1))
+        audit.drain()
+        self.db.down = False
+        audit.emit(make_event("auth.logout", 1))
+        audit.drain()
+        self.assertEqual([r[2] for r in self.db.rows], ["auth.login", "auth.logout"])
+        self.assertEqual(audit.stats["rejected"], 1)
+        self.assertFalse(os.path.exists(self.spool))
+        with open(f"{self.spool}.rejected", encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["event"]["action"] for line in f], ["boom"])
+
+        audit.emit(make_event("auth.login", 2))
+        audit.drain()
+        self.assertEqual(len(self.db.rows), 3)
+
+    def test_event_fields_fit_their_columns(self):
+        event = make_event("x" * 100, 1, "user" * 20, "9" * 100, "203.0.113.7, " * 20)
+        self.assertEqual([len(event[k]) for k in ("action", "target_type", "target_id", "ip")], [64, 32, 64, 45])
+
+    def write_replay(self, pid: int, actions: list[str]) -> str:
+        path = f"{self.spool}.{pid}.replay"
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(make_event(a, 1)) + "\n" for a in actions)
+        return path
+
+    def test_orphaned_replay_files_are_adopted(self):
+        orphan = self.write_replay(999999, ["auth.login", "auth.logout"])
+        audit = self.make_log()
+        audit.drain()
+        self.assertEqual([r[2] for r in self.db.rows], ["auth.login", "auth.logout"])
+        self.assertFalse(os.path.exists(orphan))
+        self.assertEqual(audit.stats["replayed"], 2)
+
+        # danach kein Verzeichnis-Scan und keine Connection mehr ohne Arbeit
+        self.db.down = True
+        audit.drain()
+        self.assertEqual(audit.stats["flush_errors"], 0)
+
+    def test_replay_file_held_by_live_worker_is_skipped(self):
+        busy = self.write_replay(999998, ["auth.login"])
+        with open(busy) as held:
+            fcntl.flock(held, fcntl.LOCK_EX)
+            audit = self.make_log()
+            audit.emit(make_event("auth.logout", 1))
+            audit.drain()
+        self.assertEqual([r[2] for r in self.db.rows], ["auth.logout"])
+        self.assertTrue(os.path.exists(busy))
+
+    def test_spool_waits_for_rename_in_other_process(self):
+        audit = self.make_log()
+        self.db.down = True
+        with open(f"{self.spool}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # anderer Worker benennt gerade um
+            writer = threading.Thread(target=audit._spool, args=([make_event("auth.login", 1)],))
+            writer.start()
+            writer.join(0.2)
+            self.assertTrue(writer.is_alive())
+            self.assertFalse(os.path.exists(self.spool))
+        writer.join(5)
+        self.assertEqual(audit.stats["spooled"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
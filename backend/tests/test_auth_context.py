@@ -0,0 +1,109 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from tests.fakes import FakeDB
+
+
+def auth_row(**overrides):
+    row = {
+        "session_id": 7,
+        "user_id": 3,
+        "email": "anna@example.com",
+        "first_name": "Anna",
+        "last_name": "A",
+        "department_id": 2,
+        "is_owner": 0,
+        "is_active": 1,
+        "department_name": "Vertrieb",
+        "needs_touch": 0,
+        "permission_keys": "admin_panel,orders",
+    }
+    row.update(overrides)
+    return row
+
+
+class AuthDB(FakeDB):
+    """Beantwortet nur AUTH_CONTEXT_QUERY (mit `auth` oder ohne Treffer)."""
+
+    def __init__(self, auth):
+        super().__init__()
+        self.auth = auth
+
+    def execute(self, cursor, sql, args):
+        if sql is routes.AUTH_CONTEXT_QUERY and self.auth:
+            cursor.rows = [self.auth]
+
+
+def auth_conn(auth):
+    return AuthDB(auth).connect("reader")
+
+
+class RequiresDecoratorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        self.client.set_cookie("np_session", "token")
+
+    def get(self, auth, path="/api/admin/permissions"):
+        self.conn = auth_conn(auth)
+        with mock.patch.object(routes, "get_conn", return_value=self.conn):
+            return self.client.get(path)
+
+    def test_one_auth_query_for_admin_route(self):
+        resp = self.get(auth_row())
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(self.conn.queries("user_sessions")), 1)
+        self.assertTrue(self.conn.closed)
+
+    def test_unauthorized_and_forbidden(self):
+        self.assertEqual(self.get(None).status_code, 401)
+        self.assertEqual(self.get(auth_row(permission_keys="orders")).status_code, 403)
+        self.assertEqual(len(self.conn.queries("user_sessions")), 1)
+        self.assertTrue(self.conn.closed)
+
+    def test_owner_without_department_passes(self):
+        resp = self.get(auth_row(is_owner=1, department_id=None, permission_keys=None))
+        self.assertEqual(resp.status_code, 200)
+
+    def test_inactive_user_is_unauthorized(self):
+        self.assertEqual(self.get(auth_row(is_active=0)).status_code, 401)
+
+    def test_auth_me_returns_permissions_from_same_query(self):
+        resp = self.get(auth_row(), "/api/auth/me")
+        self.assertEqual(resp.get_json()["permissions"], ["admin_panel", "orders"])
+        self.assertEqual(len(self.conn.queries("user_sessions")), 1)
+
+    def test_connection_is_opened_lazily(self):
+        # ohne Session-Cookie kein DB-Zugriff – auch nicht für Routen, die g.db nutzen
+        self.client.delete_cookie("np_session")
+        with mock.patch.object(routes, "get_conn") as get_conn:
+            resp = self.client.post("/api/product-data/query", json={"columns": ["EAN"], "eans": ["4006925001234"]})
+        self.assertEqual(resp.status_code, 401)
+        get_conn.assert_not_called()
+
+        # Handler ohne g.db (Auth aus Access-Token + Permission-Cache)
+        with mock.patch.object(routes, "get_conn") as get_conn, mock.patch.object(
+            routes, "get_auth_context", return_value=({"id": 1, "isOwner": True}, 1, [])
+        ):
+            self.assertEqual(self.client.get("/api/automations").status_code, 200)
+        get_conn.assert_not_called()
+
+    def test_rebuild_requires_admin(self):
+        with mock.patch.object(routes, "reconcile_catalog") as reconcile:
+            conn = auth_conn(auth_row(permission_keys="orders"))
+            with mock.patch.object(routes, "get_conn", return_value=conn):
+                self.assertEqual(self.client.post("/api/products/local-search/rebuild").status_code, 403)
+        reconcile.assert_not_called()
+        self.assertTrue(conn.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
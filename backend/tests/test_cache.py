@@ -0,0 +1,102 @@
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.cache import LRUCache, SQLiteCache, TieredCache
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_ttl_and_size_bound(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+
+        cache.set("d", 4, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("d"))
+
+
+class TieredCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = str(Path(tmp.name) / "cache.sqlite3")
+
+    def worker(self, **kwargs):
+        return TieredCache(SQLiteCache(self.path), version_ttl=0, **kwargs)
+
+    def test_value_visible_to_other_worker(self):
+        one, two = self.worker(), self.worker()
+        one.set("k", {"items": [1, 2]}, ttl=60)
+        self.assertEqual(two.get("k"), {"items": [1, 2]})
+        self.assertEqual(two.stats["l2_hits"], 1)
+        self.assertEqual(two.get("k"), {"items": [1, 2]})
+        self.assertEqual(two.stats["l1_hits"], 1)
+
+    def test_l1_and_l2_hits_have_the_same_types(self):
+        value = {"price": Decimal("12.90"), "at": datetime(2026, 3, 29, 2, 30), "ids": (1, 2)}
+        expected = {"price": "12.90", "at": "2026-03-29 02:30:00", "ids": [1, 2]}
+        for one in (self.worker(), TieredCache(None)):
+            one.set("k", value, ttl=60)
+            self.assertEqual(one.get("k"), expected)  # L1
+        self.assertEqual(self.worker().get("k"), expected)  # L2
+
+    def test_stats_are_counted_across_threads(self):
+        cache = TieredCache(None)
+        cache.set("k", 1, ttl=60)
+        threads = [threading.Thread(target=lambda: [cache.get("k") for _ in range(2000)]) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(cache.stats["l1_hits"], 8 * 2000)
+
+    def test_namespace_bump_invalidates_everywhere(self):
+        one, two = self.worker(), self.worker()
+        one.set(one.key("perms", 3), ["admin_panel"], ttl=60)
+        self.assertEqual(two.get(two.key("perms", 3)), ["admin_panel"])
+        one.bump("perms")
+        self.assertIsNone(two.get(two.key("perms", 3)))
+
+    def test_shared_tier_is_size_bounded(self):
+        shared = SQLiteCache(self.path, max_bytes=2000, evict_every=1)
+        for i in range(50):
+            shared.set(f"k{i}", "x" * 100, ttl=60)
+        total = shared._conn().execute("SELECT SUM(size) FROM cache_entries").fetchone()[0]
+        self.assertLessEqual(total, 2000)
+        self.assertIsNotNone(shared.get("k49"))
+
+    def test_event_log_is_shared_and_ordered(self):
+        one, two = self.worker(), self.worker()
+        first = one.publish("products", "changes", [["delete", "p1", None]])
+        two.publish("products", "reload", {"after": first})
+        one.publish("other", "changes", [])
+        self.assertEqual([(k, p) for _s, k, p in two.events_since("products", 0)], [("changes", [["delete", "p1", None]]), ("reload", {"after": first})])
+        self.assertEqual(one.last_event("products", "changes")[0], first)
+        one.trim_events("products", first + 1)
+        self.assertEqual([k for _s, k, _p in two.events_since("products", 0)], ["reload"])
+        self.assertIsNone(TieredCache(None).publish("products", "changes", []))
+
+    def test_memory_only_mode(self):
+        cache = TieredCache(None)
+        cache.set(cache.key("products", "list"), [1], ttl=60)
+        self.assertEqual(cache.get(cache.key("products", "list")), [1])
+        cache.bump("products")
+        self.assertIsNone(cache.get(cache.key("products", "list")))
+
+
+if __name__ == "__main__":
+    unittest.main()
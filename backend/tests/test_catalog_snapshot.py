@@ -0,0 +1,90 @@
+import dataclasses
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.catalog_snapshot import CatalogSnapshot, write_snapshot
+from app.search_index import ProductSearchIndex
+from app.settings import configure
+
+PRODUCTS = [
+    {"id": "gid://shopify/Product/2", "title": "Ferramol Schneckenkorn", "sku": "ND-2002", "ean": "4006925005678", "price": 12.99,
+     "description": "Schneckenfrei im Beet", "image": "", "thumbnail": ""},
+    {"id": "gid://shopify/Product/1", "title": "Schädlingsfrei Neem", "sku": "ND-1001", "ean": "4006925001234", "price": 9.5,
+     "description": "Gegen Blattläuse", "image": "https://cdn.shopify.com/neem.jpg", "thumbnail": "/api/images/thumb?src=x"},
+]
+
+
+class CatalogSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "catalog.snapshot")
+        write_snapshot(self.path, PRODUCTS)
+        self.snapshot = CatalogSnapshot.open(self.path)
+        self.addCleanup(self.snapshot.close)
+
+    def test_roundtrip_and_lookup(self):
+        self.assertEqual(len(self.snapshot), 2)
+        self.assertEqual(self.snapshot.get("gid://shopify/Product/1"), PRODUCTS[1])
+        self.assertEqual([p["id"] for p in self.snapshot], ["gid://shopify/Product/1", "gid://shopify/Product/2"])
+        self.assertIsNone(self.snapshot.get("gid://shopify/Product/3"))
+
+    def test_search_without_index(self):
+        for q in ("schaedlingsfrei", "Schädlingsfrei neem", "ND-1001", "nd1001", "4006925001234"):
+            self.assertEqual(self.snapshot.search(q)["items"][0]["id"], "gid://shopify/Product/1", q)
+        self.assertEqual(self.snapshot.search("schnecken")["total"], 1)
+        self.assertEqual(self.snapshot.search("neem ferramol")["total"], 0)
+
+    def test_invalid_files_are_ignored(self):
+        bad = os.path.join(self.tmp.name, "bad.snapshot")
+        with open(bad, "wb") as f:
+            f.write(b"XXXX" + b"\0" * 64)
+        self.assertIsNone(CatalogSnapshot.open(bad))
+        self.assertIsNone(CatalogSnapshot.open(os.path.join(self.tmp.name, "missing")))
+        with open(self.path, "r+b") as f:
+            f.seek(4)
+            f.write(b"\x63\x00")  # andere Format-Version
+        self.assertIsNone(CatalogSnapshot.open(self.path))
+
+
+class SnapshotWarmStartTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        path = os.path.join(self.tmp.name, "catalog.snapshot")
+        write_snapshot(path, PRODUCTS)
+        self.app = create_app("testing")
+        configure(dataclasses.replace(self.app.extensions["settings"], catalog_snapshot_path=path))
+        self.addCleanup(routes.load_catalog_snapshot, "")
+        routes.load_catalog_snapshot(path)
+        self.client = self.app.test_client()
+
+    def test_local_search_serves_snapshot_then_index(self):
+        index = ProductSearchIndex()
+        with mock.patch.object(routes, "get_search_index", return_value=index), mock.patch.object(routes.threading, "Thread") as thread:
+            routes._index_warmup["pid"] = None
+            first = self.client.get("/api/products/local-search?q=ferramol").get_json()
+            self.assertEqual(first["source"], "snapshot")
+            self.assertEqual(first["items"][0]["sku"], "ND-2002")
+
+            # Warm-up (hier synchron) -> danach antwortet der volle Index
+            snapshot, done = thread.call_args.kwargs["args"]
+            routes._warm_search_index(snapshot, done)
+            second = self.client.get("/api/products/local-search?q=ferramol").get_json()
+        self.assertNotIn("source", second)
+        self.assertEqual(second["indexed"], 2)
+        self.assertEqual(second["items"][0]["sku"], "ND-2002")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import requests
+
+from app import create_app
+from app import routes
+from app.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+SHOPIFY_SEARCH = {
+    "products": {
+        "pageInfo": {"hasNextPage": False, "endCursor": None},
+        "edges": [{"node": {"id": "gid://shopify/Product/1", "title": "Ferramol", "variants": {"edges": []}}}],
+    }
+}
+
+
+class CircuitBreakerTestCase(unittest.TestCase):
+    def test_opens_on_errors_and_slow_calls(self):
+        breaker = CircuitBreaker("t", failure_threshold=3, window=10, slow_seconds=1.0, open_seconds=60)
+        breaker.record(False, 0.1)
+        breaker.record(True, 2.0)  # langsam zählt wie ein Fehler
+        breaker.record(True, 0.1)
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record(False, 0.1)
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError) as ctx:
+            breaker.before_call()
+        self.assertGreater(ctx.exception.retry_after, 0)
+
+    def test_half_open_single_probe(self):
+        breaker = CircuitBreaker("t", failure_threshold=1, open_seconds=0.01, timeout=10, probe_timeout=2)
+        breaker.record(False, 0.1)
+        time.sleep(0.02)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertEqual(breaker.before_call(), 2)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()  # nur ein Probe gleichzeitig
+        breaker.record(True, 0.1)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.before_call(), 10)
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker("t", failure_threshold=1, open_seconds=0.01)
+        breaker.record(False, 0.1)
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.record(False, 0.1)
+        self.assertEqual(breaker.state, OPEN)
+
+
+class StaleFallbackTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        routes.get_cache().bump("shopify_lkg")
+
+    def test_search_serves_last_known_good_when_shopify_down(self):
+        with mock.patch.object(routes, "shopify_graphql", return_value=SHOPIFY_SEARCH):
+            fresh = self.client.get("/api/products/search?q=ferramol").get_json()
+        self.assertNotIn("stale", fresh)
+
+        with mock.patch.object(routes, "shopify_graphql", side_effect=CircuitOpenError("shopify", 12)):
+            stale = self.client.get("/api/products/search?q=ferramol").get_json()
+        self.assertTrue(stale["stale"])
+        self.assertEqual(stale["items"], fresh["items"])
+
+    def test_unavailable_without_fallback(self):
+        with mock.patch.object(routes, "shopify_graphql", side_effect=requests.ConnectionError("down")):
+            resp = self.client.get("/api/products/search?q=unbekannt")
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp.get_json()["error"], "upstream_unavailable")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.cache import SQLiteCache
+from app.concurrency import is_cooperative, run_blocking
+
+
+class ForkSafetyTestCase(unittest.TestCase):
+    def setUp(self):
+        create_app("testing")
+
+    def test_http_session_and_pool_are_per_process(self):
+        session, pool = routes.get_http_session(), routes.get_market_pool()
+        self.assertIs(routes.get_http_session(), session)
+        self.assertIs(routes.get_market_pool(), pool)
+        with mock.patch("os.getpid", return_value=os.getpid() + 1):  # wie nach einem fork
+            self.assertIsNot(routes.get_http_session(), session)
+            self.assertIsNot(routes.get_market_pool(), pool)
+
+    def test_sqlite_connection_is_reopened_after_fork(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = SQLiteCache(os.path.join(tmp, "cache.sqlite"))
+            conn = cache._conn()
+            self.assertIs(cache._conn(), conn)
+            with mock.patch("os.getpid", return_value=os.getpid() + 1):
+                self.assertIsNot(cache._conn(), conn)
+
+    def test_run_blocking_without_gevent_calls_directly(self):
+        self.assertFalse(is_cooperative())
+        self.assertEqual(run_blocking(pow, 2, 10), 1024)
+
+
+class LazyModulesTestCase(unittest.TestCase):
+    def test_warm_lazy_modules_loads_everything(self):
+        probe = textwrap.dedent(
+            """
+            import sys
+            from app import routes
+            from app.lazy import warm_lazy_modules
+            names = warm_lazy_modules()
+            assert "pymysql" in names, names
+            assert all(type(sys.modules[n]).__name__ == "module" for n in names)
+            assert warm_lazy_modules() == []
+            """
+        )
+        subprocess.run([sys.executable, "-c", probe], cwd=ROOT, check=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
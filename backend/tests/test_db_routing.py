@@ -0,0 +1,82 @@
+import dataclasses
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pymysql
+
+from app import create_app
+from app import routes
+from app.settings import MySQLTarget, configure
+from tests.fakes import FakeDB
+
+PRIMARY = MySQLTarget("primary", "u", "p", "db")
+REPLICA = MySQLTarget("replica", "u", "p", "db")
+
+
+class StatusDB(FakeDB):
+    """Jede Query liefert die Replica-Statuszeile."""
+
+    def __init__(self, status_row):
+        super().__init__()
+        self.status_row = status_row
+
+    def execute(self, cursor, sql, args):
+        cursor.rows = [self.status_row]
+
+
+class ReadWriteRoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        configure(dataclasses.replace(self.app.extensions["settings"], mysql=PRIMARY, mysql_reader=REPLICA))
+        routes._replica_state.update({"checked_at": float("-inf"), "usable": True})
+        self.status_row = {"Seconds_Behind_Source": 0}
+
+        def fake_connect(target, role):
+            if target is REPLICA and self.status_row == "down":
+                raise pymysql.err.OperationalError(2003, "down")
+            conn = StatusDB(self.status_row).connect(role)
+            conn.target = target
+            return conn
+
+        patcher = mock.patch.object(routes, "_connect", side_effect=fake_connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def target_for(self, role, headers=None):
+        with self.app.test_request_context("/api/orders", headers=headers or {}):
+            return routes.get_conn(role).target
+
+    def test_reader_and_writer_targets(self):
+        self.assertIs(self.target_for("reader"), REPLICA)
+        self.assertIs(self.target_for("writer"), PRIMARY)
+
+    def test_read_your_writes_sticks_to_primary(self):
+        cookie = f"{routes.rw_cookie_name()}=1"
+        self.assertIs(self.target_for("reader", {"Cookie": cookie}), PRIMARY)
+
+    def test_fallback_when_replica_down_or_lagging(self):
+        self.status_row = "down"
+        self.assertIs(self.target_for("reader"), PRIMARY)
+
+        routes._replica_state.update({"checked_at": float("-inf"), "usable": True})
+        self.status_row = {"Seconds_Behind_Source": 120}
+        self.assertIs(self.target_for("reader"), PRIMARY)
+        # innerhalb von replica_check_seconds kein erneuter Versuch
+        self.status_row = {"Seconds_Behind_Source": 0}
+        self.assertIs(self.target_for("reader"), PRIMARY)
+
+    def test_successful_write_sets_sticky_cookie(self):
+        with self.app.test_request_context("/api/orders", method="POST"):
+            ok = routes.stick_to_primary_after_write(self.app.response_class("{}", status=201))
+            failed = routes.stick_to_primary_after_write(self.app.response_class("{}", status=400))
+        self.assertIn(routes.rw_cookie_name(), ok.headers["Set-Cookie"])
+        self.assertNotIn("Set-Cookie", failed.headers)
+
+if __name__ == "__main__":
+    unittest.main()
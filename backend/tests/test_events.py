@@ -0,0 +1,164 @@
+import dataclasses
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.cache import SQLiteCache, TieredCache
+from app.events import JobBoard, stream
+from app.settings import configure
+from tests.fakes import FakeConn
+
+
+class JobBoardTestCase(unittest.TestCase):
+    def test_snapshot_then_events_then_heartbeat(self):
+        board = JobBoard(progress_interval=0)
+        board.started("shopify-sync", total=10)
+        gen = stream(board, heartbeat=0.01)
+        self.assertTrue(next(gen).startswith("retry:"))
+        snapshot = next(gen)
+        self.assertIn("event: snapshot", snapshot)
+        self.assertIn('"state":"running"', snapshot)
+
+        board.progress("shopify-sync", 5)
+        self.assertIn("event: progress", next(gen))
+        self.assertEqual(next(gen), ": ping\n\n")
+
+        board.finished("shopify-sync")
+        self.assertIn('"state":"ok"', next(gen))
+        gen.close()
+        self.assertEqual(board.subscriber_count(), 0)
+
+    def test_slow_client_gets_fresh_snapshot(self):
+        board = JobBoard(max_buffer=3, progress_interval=0)
+        gen = stream(board, heartbeat=0.01)
+        next(gen), next(gen)
+        for i in range(10):
+            board.progress("obi-export", i, 10)
+        chunk = next(gen)
+        self.assertIn("event: snapshot", chunk)
+        self.assertIn('"done":9', chunk)
+        gen.close()
+
+    def test_runs_today_and_progress_throttle(self):
+        board = JobBoard(progress_interval=60)
+        sub = board.subscribe()
+        board.started("obi-export")
+        board.progress("obi-export", 1)
+        board.started("obi-export")
+        events, _lagged = sub.get(0)
+        self.assertEqual([e["type"] for e in events], ["state", "state"])
+        self.assertEqual(board.snapshot()["jobs"][0]["runsToday"], 2)
+
+
+class JobsAcrossWorkersTestCase(unittest.TestCase):
+    """Zwei Worker = zwei Boards über derselben L2-Datei; der fremde Worker hat einen anderen pid."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        create_app("testing")
+        self.cache = TieredCache(SQLiteCache(os.path.join(tmp.name, "cache.sqlite3")))
+        patches = [
+            mock.patch.object(routes, "get_cache", return_value=self.cache),
+            mock.patch.object(routes, "_job_board", None),
+            mock.patch.dict(routes._job_sync, {"pid": None, "seq": 0, "checked": 0.0}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def other_worker(self) -> JobBoard:
+        def share(kind, job):
+            with mock.patch("os.getpid", return_value=os.getpid() + 1):
+                routes._share_job_event(kind, job)
+
+        return JobBoard(progress_interval=0, on_change=share)
+
+    def test_jobs_of_other_workers_reach_the_stream(self):
+        other = self.other_worker()
+        other.started("shopify-sync", total=2)
+        board = routes.get_job_board()
+        gen = stream(board, heartbeat=5, poll=routes.sync_job_board, poll_interval=0.01)
+        next(gen)
+        self.assertIn('"state":"running"', next(gen))  # Snapshot enthält den fremden Job
+
+        other.finished("shopify-sync", message="2 Produkte indexiert")
+        routes._job_sync["checked"] = 0.0
+        chunk = next(gen)
+        self.assertIn("event: state", chunk)
+        self.assertIn('"state":"ok"', chunk)
+        gen.close()
+
+    def test_own_jobs_are_not_applied_twice(self):
+        board = routes.get_job_board()
+        board.started("obi-export")
+        board.finished("obi-export", ok=False, message="3 von 10 Produkten fehlerhaft")
+        self.assertEqual(len(self.cache.events_since("jobs", 0)), 2)
+        sub = board.subscribe()
+        routes.sync_job_board()
+        self.assertEqual(sub.get(0)[0], [])
+        self.assertEqual(board.snapshot()["jobs"][0]["runsToday"], 1)
+
+
+class AutomationsStreamEndpointTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        routes._job_board = None
+        self.conn = FakeConn()
+
+    def test_requires_login(self):
+        with mock.patch.object(routes, "get_conn", return_value=self.conn), mock.patch.object(
+            routes, "get_auth_context", return_value=(None, None, [])
+        ):
+            resp = self.client.get("/api/automations/stream")
+        self.assertEqual(resp.status_code, 401)
+
+    def test_stream_releases_db_connection(self):
+        configure(dataclasses.replace(self.app.extensions["settings"], sse_heartbeat_seconds=0.01, sse_max_seconds=0.05))
+
+        def session_lookup(conn):
+            conn.ping()  # DB-Pfad der Anmeldung -> Connection wird geöffnet
+            return {"id": 1}, 1, []
+
+        with mock.patch.object(routes, "get_conn", return_value=self.conn), mock.patch.object(
+            routes, "get_auth_context", side_effect=session_lookup
+        ):
+            resp = self.client.get("/api/automations/stream", buffered=False)
+            self.assertEqual(resp.status_code, 200)
+            self.assertTrue(self.conn.closed)
+            self.assertEqual(resp.mimetype, "text/event-stream")
+            body = b"".join(resp.response).decode()
+        self.assertIn("event: snapshot", body)
+        self.assertIn(": ping", body)
+
+    def test_sync_workers_get_polling_hint(self):
+        with mock.patch.dict(os.environ, {"NP_WORKER_PROFILE": "sync"}), mock.patch.object(
+            routes, "get_auth_context", return_value=({"id": 1}, 1, [])
+        ):
+            resp = self.client.get("/api/automations/stream")
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.get_json()["pollUrl"], "/api/automations")
+
+    def test_threaded_workers_keep_a_thread_free(self):
+        board = routes.get_job_board()
+        subs = [board.subscribe() for _ in range(3)]
+        with mock.patch.dict(os.environ, {"NP_WORKER_PROFILE": "threaded", "NP_WORKER_THREADS": "4"}), mock.patch.object(
+            routes, "get_auth_context", return_value=({"id": 1}, 1, [])
+        ):
+            self.assertEqual(self.client.get("/api/automations/stream").status_code, 503)
+        for sub in subs:
+            board.unsubscribe(sub)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.feed_validation import PROFILES, duplicate_rows, gtin_errors, validate_feed
+
+
+def with_check_digit(body: str) -> str:
+    """Referenz: Prüfziffer Zeichen für Zeichen (GS1, Gewichte 3/1 von rechts)."""
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(body)))
+    return body + str((10 - total % 10) % 10)
+
+
+def product(i: int, **overrides) -> dict:
+    item = {
+        "id": f"gid://shopify/Product/{i}",
+        "title": f"Produkt {i}",
+        "sku": f"ND-{i}",
+        "ean": with_check_digit(f"400692500{i:03d}"),
+        "price": 12.99,
+        "description": "Beschreibung",
+        "image": "https://cdn.shopify.com/a.jpg",
+    }
+    item.update(overrides)
+    return item
+
+
+class GtinTestCase(unittest.TestCase):
+    def test_known_gtins(self):
+        values = ["4006925001234", "96385074", "10614141000415", "4006925001235", "40069250012", "40069250O1234", ""]
+        self.assertEqual(
+            gtin_errors(values, (8, 13, 14)),
+            {3: "gtin_checksum", 4: "gtin_format", 5: "gtin_format"},
+        )
+
+    def test_matches_reference_for_all_lengths(self):
+        values = [with_check_digit(str(10**(length - 2) + i * 7919)) for length in (8, 12, 13, 14) for i in range(200)]
+        self.assertEqual(gtin_errors(values), {})
+        broken = [v[:-1] + str((int(v[-1]) + 1) % 10) for v in values]
+        self.assertEqual(set(gtin_errors(broken).values()), {"gtin_checksum"})
+        self.assertEqual(len(gtin_errors(broken)), len(values))
+
+    def test_non_ascii_digits_are_rejected(self):
+        self.assertEqual(gtin_errors(["٤٠٠٦٩٢٥٠٠١٢٣٤"]), {0: "gtin_format"})
+
+
+class FeedReportTestCase(unittest.TestCase):
+    def test_clean_feed(self):
+        report = validate_feed([product(i) for i in range(5)], PROFILES["obi"])
+        self.assertTrue(report["ok"])
+        self.assertEqual((report["total"], report["valid"], report["issues"]), (5, 5, []))
+
+    def test_findings_per_profile(self):
+        items = [
+            product(0),
+            product(1, ean="", price=0),  # map_shopify_product-Defaults
+            product(2, sku="ND-0"),
+            product(3, ean=product(3)["ean"][:-1] + "0", image=""),
+            product(4, price=250000),
+        ]
+        report = validate_feed(items, PROFILES["obi"])
+        self.assertFalse(report["ok"])
+        self.assertEqual(report["invalid"], 5)
+        self.assertEqual(
+            report["counts"],
+            {
+                "ean.missing": 1,
+                "price.missing": 1,
+                "sku.duplicate": 2,
+                "image.missing": 1,
+                "ean.gtin_checksum": 1,
+                "price.price_out_of_range": 1,
+            },
+        )
+        self.assertEqual(report["issues"][0], {"row": 0, "id": "gid://shopify/Product/0", "sku": "ND-0", "field": "sku", "code": "duplicate", "value": "ND-0"})
+
+        # Bauhaus-Feed hat keine Preisspalte
+        bauhaus = validate_feed(items, PROFILES["bauhaus"])
+        self.assertNotIn("price.missing", bauhaus["counts"])
+        self.assertNotIn("price.price_out_of_range", bauhaus["counts"])
+
+    def test_issue_list_is_capped(self):
+        report = validate_feed([product(i, price=0) for i in range(20)], PROFILES["obi"], max_issues=5)
+        self.assertEqual((len(report["issues"]), report["truncated"], report["counts"]["price.missing"]), (5, True, 20))
+
+    def test_duplicates_ignore_empty_values(self):
+        self.assertEqual(duplicate_rows(["a", "", "b", "a", ""]), [0, 3])
+
+
+class FeedValidationEndpointTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        conn = mock.Mock()
+        patches = [
+            mock.patch.object(routes, "get_conn", return_value=conn),
+            mock.patch.object(routes, "get_auth_context", return_value=({"id": 1}, 1, [])),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_validates_posted_items(self):
+        resp = self.client.post("/api/feeds/OBI/validate", json={"items": [product(1), product(2, ean="123")]})
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual((body["profile"], body["invalid"], body["counts"]), ("obi", 1, {"ean.gtin_format": 1}))
+
+    def test_unknown_retailer(self):
+        resp = self.client.post("/api/feeds/hornbach/validate", json={"items": []})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_defaults_to_local_catalog(self):
+        index = routes.ProductSearchIndex()
+        index.upsert_many([product(1), product(2, price=0)])
+        board = routes.JobBoard()
+        with mock.patch.object(routes, "get_search_index", return_value=index), mock.patch.object(routes, "_job_board", board):
+            resp = self.client.post("/api/feeds/obi/validate")
+        self.assertEqual(resp.get_json()["counts"], {"price.missing": 1})
+        # Katalog-Prüfung = Lauf des OBI-Exports auf der AutomationsPage
+        job = board.snapshot()["jobs"][0]
+        self.assertEqual((job["id"], job["state"], job["message"]), ("obi-export", "failed", "1 von 2 Produkten fehlerhaft"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+
+SHOPIFY_PRODUCTS = {
+    "products": {
+        "edges": [
+            {
+                "node": {
+                    "id": "gid://shopify/Product/1",
+                    "title": "Schädlingsfrei Neem",
+                    "description": "",
+                    "featuredImage": {"url": "https://cdn.shopify.com/a.jpg"},
+                    "variants": {"edges": [{"node": {"sku": "S1", "barcode": "4006925001234", "price": {"amount": "9.99"}}}]},
+                }
+            }
+        ]
+    }
+}
+
+
+class ProductsConditionalGetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        routes.get_cache().bump("products")
+
+    def test_etag_and_304_without_shopify_call(self):
+        with mock.patch.object(routes, "shopify_graphql", return_value=SHOPIFY_PRODUCTS) as gql:
+            first = self.client.get("/api/products")
+            self.assertEqual(first.status_code, 200)
+            etag = first.headers["ETag"]
+            self.assertTrue(etag)
+            self.assertIn("max-age", first.headers["Cache-Control"])
+
+            second = self.client.get("/api/products", headers={"If-None-Match": etag})
+            self.assertEqual(second.status_code, 304)
+            self.assertEqual(second.headers["ETag"], etag)
+            self.assertEqual(gql.call_count, 1)
+
+    def test_mismatching_etag_returns_body(self):
+        with mock.patch.object(routes, "shopify_graphql", return_value=SHOPIFY_PRODUCTS):
+            resp = self.client.get("/api/products", headers={"If-None-Match": '"stale"'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()["items"][0]["sku"], "S1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import dataclasses
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.circuit import CircuitOpenError
+from app.markets import MarketError, parse_market_credentials, with_context
+from app.settings import configure
+
+
+class WithContextTestCase(unittest.TestCase):
+    def test_adds_variables_and_directive(self):
+        query = "query Products($first: Int!) {\n  products(first: $first) { edges { node { id } } }\n}"
+        out = with_context(query)
+        self.assertTrue(
+            out.startswith(
+                "query Products($first: Int!, $country: CountryCode, $language: LanguageCode) "
+                "@inContext(country: $country, language: $language) {"
+            )
+        )
+        self.assertTrue(out.endswith(query[query.index("{"):]))
+
+    def test_query_without_variables(self):
+        self.assertIn("query Shop($country: CountryCode, $language: LanguageCode) @inContext", with_context("query Shop { shop { name } }"))
+
+    def test_credentials(self):
+        self.assertEqual(parse_market_credentials("ch=ch.myshopify.com:tok, UK=uk.myshopify.com:t2"), {
+            "CH": ("ch.myshopify.com", "tok"),
+            "UK": ("uk.myshopify.com", "t2"),
+        })
+        with self.assertRaises(MarketError):
+            parse_market_credentials("XX=foo:bar")
+
+
+class FakeResponse:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"data": {"product": None}}
+
+
+class MarketRoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        configure(dataclasses.replace(
+            self.app.extensions["settings"],
+            shopify_store_domain="neudorff.myshopify.com",
+            shopify_storefront_token="default-token",
+            shopify_markets=(("CH", "neudorff-ch.myshopify.com", "ch-token"),),
+        ))
+        self.client = self.app.test_client()
+        routes.get_cache().bump("market_offer")
+
+    def test_context_and_credentials_per_market(self):
+        markets = routes.get_markets()
+        with mock.patch("requests.Session.post", return_value=FakeResponse()) as post:
+            routes.shopify_graphql(routes.MARKET_OFFER_BY_ID_QUERY, {"id": "gid://shopify/Product/1"}, markets["AT"])
+            routes.shopify_graphql(routes.MARKET_OFFER_BY_ID_QUERY, {"id": "gid://shopify/Product/1"}, markets["CH"])
+
+        (at_url,), at_kwargs = post.call_args_list[0]
+        self.assertIn("neudorff.myshopify.com", at_url)
+        self.assertEqual(at_kwargs["json"]["variables"], {"id": "gid://shopify/Product/1", "country": "AT", "language": "DE"})
+        self.assertIn("@inContext(country: $country, language: $language)", at_kwargs["json"]["query"])
+        (ch_url,), ch_kwargs = post.call_args_list[1]
+        self.assertIn("neudorff-ch.myshopify.com", ch_url)
+        self.assertEqual(ch_kwargs["headers"]["X-Shopify-Storefront-Access-Token"], "ch-token")
+
+    def test_compare_fans_out_concurrently(self):
+        def fake_graphql(query, variables, market=None):
+            time.sleep(0.2)
+            if market.code == "NO":
+                raise CircuitOpenError("shopify", 7)
+            price = {"CH": "14.90", "UK": "11.00"}.get(market.code, "12.99")
+            currency = {"CH": "CHF", "UK": "GBP", "NO": "NOK", "SE": "SEK"}.get(market.code, "EUR")
+            return {"product": {
+                "id": variables["id"], "title": "Ferramol", "availableForSale": market.code != "FI",
+                "variants": {"edges": [{"node": {"sku": "ND-2002", "availableForSale": market.code != "FI",
+                                                 "price": {"amount": price, "currencyCode": currency}}}]},
+            }}
+
+        started = time.monotonic()
+        with mock.patch.object(routes, "shopify_graphql", side_effect=fake_graphql):
+            body = self.client.get("/api/products/compare?id=gid://shopify/Product/2").get_json()
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 8 * 0.2 / 2)  # parallel statt 8 x 200 ms
+        markets = body["markets"]
+        self.assertEqual(set(markets), {"DE", "AT", "CH", "ES", "NO", "SE", "FI", "UK"})
+        self.assertEqual((markets["CH"]["price"], markets["CH"]["currency"]), (14.9, "CHF"))
+        self.assertFalse(markets["FI"]["available"])
+        self.assertEqual(markets["NO"], {"error": "upstream_unavailable", "retryAfter": 7})
+
+    def test_concurrent_compares_do_not_queue(self):
+        def fake_graphql(query, variables, market=None):
+            time.sleep(0.2)
+            return {"product": None}
+
+        patcher = mock.patch.object(routes, "_market_pool", (None, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        bodies = []
+
+        def compare(i):
+            resp = self.app.test_client().get(f"/api/products/compare?id=gid://shopify/Product/{i}")
+            bodies.append(resp.get_json())
+
+        started = time.monotonic()
+        with mock.patch.object(routes, "shopify_graphql", side_effect=fake_graphql):
+            threads = [threading.Thread(target=compare, args=(i,)) for i in range(3)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(routes.get_market_pool()._max_workers, 8 * 4)
+        self.assertLess(elapsed, 2 * 0.2)  # drei Vergleiche parallel, nicht nacheinander
+        self.assertEqual([set(b["markets"]) for b in bodies], [set(routes.get_markets())] * 3)
+
+    def test_compare_validates_input(self):
+        self.assertEqual(self.client.get("/api/products/compare").status_code, 400)
+        self.assertEqual(self.client.get("/api/products/compare?sku=ND-1&markets=DE,XX").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
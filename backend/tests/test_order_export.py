@@ -0,0 +1,103 @@
+import json
+import sys
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.order_export import iter_rows, parse_range, render
+from tests.fakes import FakeCursor, FakeDB
+
+
+def order_rows(n_orders: int, items_per_order: int = 2):
+    for oid in range(1, n_orders + 1):
+        for pos in range(items_per_order):
+            yield {
+                "order_id": oid,
+                "created_at": datetime(2026, 3, 1, 12, 0),
+                "currency": "EUR",
+                "total_price": Decimal("19.98"),
+                "notes": None,
+                "salutation": "Frau",
+                "first_name": "Erika",
+                "last_name": "Muster; GmbH",
+                "email": "erika@example.com",
+                "product_id": f"p{pos}",
+                "title": "Ferramol",
+                "qty": 1,
+                "unit_price": Decimal("9.99"),
+            }
+
+
+class ExportDB(FakeDB):
+    """Der Export-Query liefert n Bestellungen mit je einer Position (als Stream)."""
+
+    def __init__(self, n_orders: int):
+        super().__init__()
+        self.n_orders = n_orders
+
+    def execute(self, cursor, sql, args):
+        cursor.rows = order_rows(self.n_orders, 1)
+
+
+class OrderExportFormatTestCase(unittest.TestCase):
+    def test_csv_header_and_escaping(self):
+        text = "".join(render(order_rows(1, 1), "csv"))
+        lines = text.lstrip("\ufeff").split("\r\n")
+        self.assertTrue(lines[0].startswith("order_id;created_at;currency;total_price"))
+        self.assertIn('"Muster; GmbH"', lines[1])
+        self.assertIn("2026-03-01T12:00:00", lines[1])
+
+    def test_ndjson_groups_items_per_order(self):
+        lines = "".join(render(order_rows(3, 2), "ndjson")).splitlines()
+        self.assertEqual(len(lines), 3)
+        first = json.loads(lines[0])
+        self.assertEqual(first["order_id"], 1)
+        self.assertEqual([i["product_id"] for i in first["items"]], ["p0", "p1"])
+        self.assertEqual(first["address"]["email"], "erika@example.com")
+
+    def test_streams_lazily(self):
+        cursor = FakeCursor()
+        cursor.rows = order_rows(100000, 1)
+        first_chunk = next(render(iter_rows(cursor), "csv"))
+        self.assertTrue(first_chunk)
+        self.assertLess(cursor.fetched, 2000)
+
+    def test_parse_range(self):
+        start, end = parse_range("2026-03-01", "2026-03-31")
+        self.assertEqual((start.day, end.month, end.day), (1, 4, 1))
+        with self.assertRaises(ValueError):
+            parse_range("2026-03-31", "2026-03-01")
+
+
+class OrderExportEndpointTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+    def test_export_streams_and_closes_connection(self):
+        conn = ExportDB(5).connect("reader")
+        with mock.patch.object(routes, "get_conn", return_value=conn), mock.patch.object(
+            routes, "require_admin", return_value=({"id": 1}, None)
+        ), mock.patch.object(routes, "set_statement_timeout"):
+            resp = self.client.get("/api/orders/export?from=2026-03-01&to=2026-03-31&format=ndjson")
+            body = resp.get_data(as_text=True)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.mimetype, "application/x-ndjson")
+        self.assertIn("orders_20260301_20260331.ndjson", resp.headers["Content-Disposition"])
+        self.assertEqual(len(body.splitlines()), 5)
+        self.assertTrue(conn.closed and conn.cursors and all(c.closed for c in conn.cursors))
+
+    def test_bad_format(self):
+        self.assertEqual(self.client.get("/api/orders/export?format=xlsx").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
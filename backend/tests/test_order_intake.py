@@ -0,0 +1,182 @@
+import dataclasses
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.order_intake import STATUS_FAILED, STATUS_PERSISTED, OrderIntakeWriter, OrderSpool, normalize_order
+from app.settings import configure
+from tests.fakes import FakeDB
+
+PAYLOAD = {
+    "items": [{"productId": "gid://shopify/Product/1", "title": "Rasendünger", "sku": "ND-1", "qty": 2, "unitPrice": 12.5}],
+    "address": {"salutation": "Herr", "firstName": "Max", "lastName": "Mustermann", "street": "Weg", "number": "1", "zip": "12345", "city": "Emmerthal", "email": "max@example.org"},
+}
+
+
+class OrderDB(FakeDB):
+    def __init__(self):
+        super().__init__()
+        self.orders = []
+        self.intake = {}
+        self.next_id = 0
+
+    def execute(self, cursor, sql, args):
+        if sql.startswith("INSERT INTO orders "):
+            if args[1] == "boom":
+                raise ValueError("rejected")
+            self.next_id += 1
+            cursor.lastrowid = self.next_id
+            cursor.conn.stage(("orders", self.next_id))
+        elif sql.startswith("INSERT INTO order_intake"):
+            cursor.conn.stage(("intake", args))
+        elif sql.startswith("SELECT ref FROM order_intake"):
+            cursor.rows = [{"ref": ref} for ref in args if ref in self.intake]
+
+    def apply(self, change):
+        kind, value = change
+        if kind == "orders":
+            self.orders.append(value)
+        else:
+            self.intake[value[0]] = value
+
+
+class OrderSpoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spool = OrderSpool(os.path.join(self.tmp.name, "orders.jsonl"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_commit_advances_offset_and_truncates_when_done(self):
+        for i in range(3):
+            self.spool.append({"ref": f"r{i}"})
+        records, offset = self.spool.read_pending(2)
+        self.assertEqual([r["ref"] for r in records], ["r0", "r1"])
+        self.spool.commit(offset)
+        self.assertTrue(self.spool.find("r2"))
+        self.assertFalse(self.spool.find("r0"))
+
+        records, offset = self.spool.read_pending(10)
+        self.assertEqual([r["ref"] for r in records], ["r2"])
+        self.spool.commit(offset)
+        self.assertEqual(os.path.getsize(self.spool.path), 0)
+        self.assertEqual(self.spool.committed_offset(), 0)
+
+    def test_torn_line_is_skipped(self):
+        with open(self.spool.path, "wb") as f:
+            f.write(b'{"ref":"r0"}\n{"ref":"r1')  # Crash mitten im Schreiben
+        self.spool.append({"ref": "r2"})
+        records, _offset = self.spool.read_pending(10)
+        self.assertEqual([r["ref"] for r in records], ["r0", "r2"])
+
+
+class OrderIntakeWriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = OrderDB()
+        self.writer = OrderIntakeWriter(OrderSpool(os.path.join(self.tmp.name, "orders.jsonl")), self.db.connect, batch_size=10)
+        self.writer.ensure_running = lambda: None  # Tests schreiben synchron per drain_once()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_batch_is_persisted_once(self):
+        refs = [self.writer.submit(normalize_order(PAYLOAD)) for _ in range(3)]
+        self.assertEqual(self.writer.drain_once(), 3)
+        self.assertEqual(len(self.db.orders), 3)
+        self.assertEqual({self.db.intake[ref][1] for ref in refs}, {STATUS_PERSISTED})
+
+        # Crash nach dem Commit, vor dem Offset: erneutes Lesen darf nichts doppelt einfügen
+        for ref in refs:
+            self.writer.spool.append({"ref": ref, "received_at": "2026-01-01 00:00:00.000", "order": normalize_order(PAYLOAD)})
+        self.writer.drain_once()
+        self.assertEqual(len(self.db.orders), 3)
+
+    def test_rejected_order_is_marked_failed(self):
+        ok = self.writer.submit(normalize_order(PAYLOAD))
+        bad = self.writer.submit(normalize_order({**PAYLOAD, "notes": "boom"}))
+        self.writer.drain_once()
+        self.assertEqual(self.db.intake[ok][1], STATUS_PERSISTED)
+        self.assertEqual(self.db.intake[bad][1], STATUS_FAILED)
+        self.assertEqual(self.writer.spool.pending_bytes(), 0)
+
+    def test_database_outage_keeps_spool(self):
+        ref = self.writer.submit(normalize_order(PAYLOAD))
+        self.db.down = True
+        with self.assertRaises(OSError):
+            self.writer.drain_once()
+        self.assertTrue(self.writer.spool.find(ref))
+        self.db.down = False
+        self.writer.drain_once()
+        self.assertIn(ref, self.db.intake)
+
+
+class OrderIntakeRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        configure(
+            dataclasses.replace(
+                self.app.extensions["settings"],
+                order_intake_mode="async",
+                order_intake_spool_path=os.path.join(self.tmp.name, "orders.jsonl"),
+            )
+        )
+        self.db = OrderDB()
+        self.writer = OrderIntakeWriter(OrderSpool(os.path.join(self.tmp.name, "orders.jsonl")), self.db.connect)
+        self.writer.ensure_running = mock.Mock()
+        patcher = mock.patch.object(routes, "get_order_intake", return_value=self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        configure(self.app.extensions["settings"])
+        self.tmp.cleanup()
+
+    def test_async_mode_accepts_with_202(self):
+        res = self.client.post("/api/orders", json=PAYLOAD)
+        self.assertEqual(res.status_code, 202)
+        body = res.get_json()
+        self.assertEqual((body["status"], body["totalPrice"]), ("queued", "25.00"))
+        self.assertEqual(res.headers["Location"], f"/api/orders/intake/{body['reference']}")
+        self.assertTrue(self.writer.spool.find(body["reference"]))
+        self.assertEqual(self.db.orders, [])
+
+    def test_invalid_order_is_rejected_synchronously(self):
+        res = self.client.post("/api/orders", json={**PAYLOAD, "items": []})
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(self.writer.spool.pending_bytes(), 0)
+
+    def test_status_falls_back_to_spool_when_database_is_down(self):
+        ref = self.client.post("/api/orders", json=PAYLOAD).get_json()["reference"]
+        self.writer.ensure_running.reset_mock()
+        down = routes.pymysql.err.OperationalError(2003, "Can't connect to MySQL server")
+        with mock.patch.object(routes, "get_conn", side_effect=down):
+            res = self.client.get(f"/api/orders/intake/{ref}")
+            missing = self.client.get("/api/orders/intake/ord_unknown")
+        self.assertEqual((res.status_code, res.get_json()["status"]), (200, "queued"))
+        self.assertEqual(missing.status_code, 404)
+        # eine Statusabfrage startet keinen Writer
+        self.writer.ensure_running.assert_not_called()
+
+    def test_background_workers_start_only_in_async_mode(self):
+        routes.start_background_workers()
+        self.writer.ensure_running.assert_called_once_with()
+        configure(self.app.extensions["settings"])
+        routes.start_background_workers()
+        self.writer.ensure_running.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
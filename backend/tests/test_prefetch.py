@@ -0,0 +1,83 @@
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.prefetch import PagePrefetcher
+
+
+def page(n: int, has_next: bool = True) -> dict:
+    return {
+        "products": {
+            "pageInfo": {"hasNextPage": has_next, "endCursor": f"c{n}"},
+            "edges": [{"node": {"id": f"gid://shopify/Product/{n}", "title": f"Produkt {n}", "variants": {"edges": []}}}],
+        }
+    }
+
+
+def wait_idle(prefetcher: PagePrefetcher):
+    deadline = time.monotonic() + 5
+    while prefetcher.stats()["inflight"] and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+class PagePrefetcherTestCase(unittest.TestCase):
+    def test_hit_is_served_once(self):
+        prefetcher = PagePrefetcher(max_inflight=1)
+        self.assertTrue(prefetcher.schedule(("neem", 20, "c1"), lambda: {"page": 2}))
+        self.assertEqual(prefetcher.take(("neem", 20, "c1")), {"page": 2})
+        self.assertIsNone(prefetcher.take(("neem", 20, "c1")))
+        stats = prefetcher.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hitRate"]), (1, 1, 0.5))
+
+    def test_budget_and_memory_cap(self):
+        release = threading.Event()
+        prefetcher = PagePrefetcher(max_inflight=1, max_bytes=40)
+        self.assertTrue(prefetcher.schedule(("a", 20, "c1"), lambda: release.wait(5) and "x" * 20))
+        self.assertFalse(prefetcher.schedule(("b", 20, "c1"), lambda: "y"))  # Budget erschöpft
+        release.set()
+        wait_idle(prefetcher)
+        self.assertTrue(prefetcher.schedule(("c", 20, "c1"), lambda: "z" * 20))
+        wait_idle(prefetcher)
+        stats = prefetcher.stats()
+        self.assertEqual(stats["skipped"], 1)
+        self.assertEqual(stats["wasted"], 1)  # "a" wurde für "c" verdrängt, ohne abgeholt zu werden
+        self.assertLessEqual(stats["bytes"], 40)
+
+
+class SearchPrefetchRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        prefetcher = PagePrefetcher(max_inflight=1)
+        patcher = mock.patch.object(routes, "get_search_prefetcher", return_value=prefetcher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_next_page_comes_from_memory(self):
+        calls = []
+
+        def fake_graphql(query, variables, market=None):
+            calls.append(variables["after"])
+            return page(2 if variables["after"] else 1, has_next=not variables["after"])
+
+        with mock.patch.object(routes, "shopify_graphql", side_effect=fake_graphql):
+            first = self.client.get("/api/products/search?q=neem&first=20").get_json()
+            second = self.client.get("/api/products/search?q=neem&first=20&after=c1").get_json()
+
+        self.assertEqual(first["pageInfo"]["endCursor"], "c1")
+        self.assertEqual(second["items"][0]["id"], "gid://shopify/Product/2")
+        self.assertEqual(calls, [None, "c1"])  # Seite 2 genau einmal – vom Prefetch
+        self.assertEqual(routes.get_search_prefetcher().stats()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
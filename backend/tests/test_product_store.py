@@ -0,0 +1,117 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pymysql
+
+from app import create_app
+from app import routes
+from app.product_store import ProductStoreError, fetch_columns, resolve_columns, resolve_scope, upsert_values
+from tests.fakes import FakeDB
+
+ROWS = [
+    {"ean": "4006925001234", "channel": "neudorff", "country": "", "attr": "uvp", "value": "12,99"},
+    {"ean": "4006925001234", "channel": "neudorff", "country": "AT", "attr": "uvp", "value": "13,49"},
+    {"ean": "4006925001234", "channel": "neudorff", "country": "", "attr": "title", "value": "Schädlingsfrei Neem"},
+    {"ean": "4006925001234", "channel": "neudorff", "country": "", "attr": "clp", "value": "GHS09"},
+    {"ean": "4006925005678", "channel": "neudorff", "country": "", "attr": "title", "value": "Ferramol"},
+    {"ean": "4006925005678", "channel": "obi", "country": "", "attr": "uvp", "value": "9,99"},
+]
+
+
+class ProductDB(FakeDB):
+    """Filtert ROWS anhand der Parameter (Kanäle, Länder, EANs und Attribut-Keys sind disjunkt)."""
+
+    def execute(self, cursor, sql, args):
+        params = set(args)
+        with_attr = "attr IN" in sql
+        cursor.rows = [
+            r
+            for r in ROWS
+            if r["channel"] in params and r["country"] in params and r["ean"] in params and (not with_attr or r["attr"] in params)
+        ]
+
+
+def product_conn():
+    return ProductDB().connect()
+
+
+class ProductStoreTestCase(unittest.TestCase):
+    def test_projection_and_country_override(self):
+        conn = product_conn()
+        columns = resolve_columns(["EAN", "UVP"])
+        found = fetch_columns(conn, ["4006925001234", "4006925005678", "4006925009999"], columns, "neudorff", "AT")
+
+        self.assertEqual(found["4006925001234"], {"EAN": "4006925001234", "UVP": "13,49"})
+        # Titel existiert, wurde aber nicht angefragt -> EAN fehlt im Ergebnis
+        self.assertNotIn("4006925005678", found)
+        sql, args = conn.statements[0]
+        self.assertIn("attr IN", sql)
+        self.assertNotIn("title", args)
+
+        de = fetch_columns(product_conn(), ["4006925001234"], columns, "neudorff", "DE")
+        self.assertEqual(de["4006925001234"]["UVP"], "12,99")
+
+    def test_channels_are_separate(self):
+        found = fetch_columns(product_conn(), ["4006925005678"], resolve_columns(["UVP"]), "obi", "")
+        self.assertEqual(found["4006925005678"], {"UVP": "9,99"})
+
+    def test_validation(self):
+        with self.assertRaises(ProductStoreError):
+            resolve_columns(["UVP", "Passwort"])
+        with self.assertRaises(ProductStoreError):
+            resolve_scope("amazon", "DE")
+        with self.assertRaises(ProductStoreError):
+            upsert_values(product_conn(), "neudorff", "", [{"ean": "abc", "values": {"UVP": "1"}}])
+        for items in (["4006925001234"], [None], {"ean": "4006925001234"}):
+            with self.assertRaises(ProductStoreError):
+                upsert_values(product_conn(), "neudorff", "", items)
+
+    def test_upsert_and_delete(self):
+        conn = product_conn()
+        changed = upsert_values(conn, "neudorff", "DE", [{"ean": "4006925001234", "values": {"UVP": "12,99", "CLP": None}}])
+        self.assertEqual(changed, 2)
+        (insert_sql, inserts), (delete_sql, deletes) = conn.statements
+        self.assertEqual(inserts, [("4006925001234", "neudorff", "DE", "uvp", "12,99")])
+        self.assertEqual(deletes, [("4006925001234", "neudorff", "DE", "clp")])
+
+
+class MissingTableDB(FakeDB):
+    """Primary ohne product_attributes (noch kein Upsert gelaufen)."""
+
+    def execute(self, cursor, sql, args):
+        raise pymysql.err.ProgrammingError(1146, "Table 'np.product_attributes' doesn't exist")
+
+
+class ProductDataRoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        self.client.set_cookie("np_session", "token")
+        patchers = [
+            mock.patch.object(routes, "get_auth_context", return_value=({"id": 1, "isOwner": True}, 1, [])),
+            mock.patch.object(routes, "get_conn", return_value=MissingTableDB().connect()),
+            mock.patch.object(routes, "audit"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_query_before_first_upsert_is_empty(self):
+        resp = self.client.post("/api/product-data/query", json={"columns": ["EAN", "UVP"], "eans": ["4006925001234"]})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()["missing"], ["4006925001234"])
+
+    def test_malformed_items_are_rejected(self):
+        with mock.patch.object(routes, "_product_store_ready", True):
+            resp = self.client.post("/api/product-data", json={"items": ["4006925001234"]})
+        self.assertEqual(resp.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
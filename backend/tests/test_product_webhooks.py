@@ -0,0 +1,213 @@
+import base64
+import dataclasses
+import hashlib
+import hmac
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.cache import SQLiteCache, TieredCache
+from app.catalog_snapshot import write_snapshot
+from app.product_webhooks import ProductWebhookQueue, parse_event, parse_timestamp
+from app.search_index import ProductSearchIndex
+from app.settings import configure
+
+SECRET = "shpss_test"
+
+# gekürzter products/update-Payload aus der Admin-API
+FIXTURE = {
+    "id": 788032119674292900,
+    "admin_graphql_api_id": "gid://shopify/Product/788032119674292900",
+    "title": "Ferramol Schneckenkorn",
+    "body_html": "<p>Schneckenfrei im <strong>Beet</strong> &amp; Garten</p>",
+    "status": "active",
+    "updated_at": "2026-10-19T10:00:00+02:00",
+    "image": {"src": "https://cdn.shopify.com/s/files/ferramol.jpg"},
+    "variants": [
+        {"position": 2, "sku": "ND-2002-XL", "barcode": "4006925005679", "price": "24.99"},
+        {"position": 1, "sku": "ND-2002", "barcode": "4006925005678", "price": "12.99"},
+    ],
+}
+
+
+def sign(body: bytes, secret: str = SECRET) -> str:
+    return base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+
+
+class ProductWebhookQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.applied = []
+        self.queue = ProductWebhookQueue(self.applied.append, delay=60, max_delay=120)
+        self.queue.ensure_running = lambda: None
+
+    def test_burst_is_coalesced_to_latest(self):
+        self.assertEqual(self.queue.submit("upsert", "p1", {"title": "a"}, "2026-10-19T10:00:00+02:00", "w1"), "queued")
+        self.assertEqual(self.queue.submit("upsert", "p1", {"title": "b"}, "2026-10-19T10:00:05+02:00", "w2"), "coalesced")
+        self.assertEqual(self.queue.flush(), 0)  # delay noch nicht um
+        self.assertEqual(self.queue.flush(force=True), 1)
+        self.assertEqual(self.applied, [[("upsert", "p1", {"title": "b"})]])
+
+    def test_duplicates_and_outdated_are_dropped(self):
+        self.queue.submit("upsert", "p1", {}, "2026-10-19T10:00:05+02:00", "w1")
+        self.assertEqual(self.queue.submit("upsert", "p1", {}, "2026-10-19T10:00:05+02:00", "w1"), "duplicate")
+        self.queue.flush(force=True)
+        self.assertEqual(self.queue.submit("upsert", "p1", {}, "2026-10-19T10:00:01+02:00", "w0"), "outdated")
+        stats = self.queue.stats()
+        self.assertEqual((stats["duplicates"], stats["outdated"], stats["applied"]), (1, 1, 1))
+
+    def test_versions_compare_across_dst_offsets(self):
+        # 03:30 Sommerzeit (01:30Z) ist älter als 02:45 Winterzeit (01:45Z), als String aber "größer"
+        self.queue.submit("upsert", "p1", {}, "2026-10-25T02:45:00+01:00", "w1")
+        self.queue.flush(force=True)
+        self.assertEqual(self.queue.submit("upsert", "p1", {}, "2026-10-25T03:30:00+02:00", "w2"), "outdated")
+        self.assertEqual(self.queue.submit("upsert", "p1", {}, "2026-10-25T01:50:00Z", "w3"), "queued")
+        self.assertEqual(parse_timestamp("kaputt"), None)
+
+    def test_inactive_product_is_removed(self):
+        op, pid, node = parse_event("products/update", {**FIXTURE, "status": "draft"})
+        self.assertEqual((op, pid, node), ("delete", FIXTURE["admin_graphql_api_id"], None))
+
+
+class ProductWebhookRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        configure(dataclasses.replace(self.app.extensions["settings"], shopify_webhook_secret=SECRET))
+        self.client = self.app.test_client()
+        self.index = ProductSearchIndex()
+        self.queue = ProductWebhookQueue(routes.apply_product_changes, delay=60)
+        self.queue.ensure_running = lambda: None
+        patches = [
+            mock.patch.object(routes, "get_search_index", return_value=self.index),
+            mock.patch.object(routes, "get_product_webhooks", return_value=self.queue),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def post(self, topic: str, payload: dict, signature: str | None = None):
+        body = json.dumps(payload).encode()
+        return self.client.post(
+            "/api/webhooks/shopify/products",
+            data=body,
+            content_type="application/json",
+            headers={"X-Shopify-Topic": topic, "X-Shopify-Hmac-Sha256": signature or sign(body)},
+        )
+
+    def test_rejects_bad_signature(self):
+        resp = self.post("products/update", FIXTURE, signature=sign(b"other"))
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(self.queue.stats()["received"], 0)
+
+    def test_update_and_delete_reach_index(self):
+        self.assertEqual(self.post("products/update", FIXTURE).status_code, 200)
+        self.queue.flush(force=True)
+        product = self.index.get(FIXTURE["admin_graphql_api_id"])
+        self.assertEqual(product["sku"], "ND-2002")
+        self.assertEqual(product["price"], 12.99)
+        self.assertEqual(product["description"], "Schneckenfrei im Beet & Garten")
+        self.assertTrue(product["thumbnail"].startswith("/api/images/thumb?"))
+
+        self.post("products/delete", {"id": FIXTURE["id"]})
+        self.queue.flush(force=True)
+        self.assertIsNone(self.index.get(FIXTURE["admin_graphql_api_id"]))
+
+    def test_non_object_payload_is_rejected(self):
+        resp = self.post("products/update", [1, 2])
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(self.queue.stats()["received"], 0)
+
+
+class ProductSyncAcrossWorkersTestCase(unittest.TestCase):
+    """Zwei Worker = zwei Indizes über derselben L2-Datei; "other" ist ein fremder pid."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.app = create_app("testing")
+        self.snapshot_path = os.path.join(self.tmp.name, "catalog.snapshot")
+        configure(dataclasses.replace(self.app.extensions["settings"], catalog_snapshot_path=self.snapshot_path))
+        self.addCleanup(routes.load_catalog_snapshot, "")
+        self.cache = TieredCache(SQLiteCache(os.path.join(self.tmp.name, "cache.sqlite3")))
+        self.index = ProductSearchIndex()
+        patches = [
+            mock.patch.object(routes, "get_cache", return_value=self.cache),
+            mock.patch.object(routes, "get_search_index", return_value=self.index),
+            mock.patch.dict(routes._product_sync, {"pid": None, "seq": 0, "reloaded": 0, "checked": 0.0, "busy": False}),
+            # Warmstart aus dem Snapshot ist hier nicht Thema
+            mock.patch.object(routes, "search_index_ready", return_value=True),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.node = parse_event("products/update", FIXTURE)[2]
+        self.gid = FIXTURE["admin_graphql_api_id"]
+
+    def test_changes_from_other_worker_are_applied(self):
+        self.cache.publish("products", "changes", [["upsert", self.gid, self.node]])
+        routes.sync_product_changes(force=True)
+        self.assertEqual(self.index.get(self.gid)["sku"], "ND-2002")
+
+        self.cache.publish("products", "changes", [["delete", self.gid, None]])
+        routes.sync_product_changes()  # gedrosselt
+        self.assertIsNotNone(self.index.get(self.gid))
+        routes.sync_product_changes(force=True)
+        self.assertIsNone(self.index.get(self.gid))
+
+    def test_own_batches_go_through_the_log(self):
+        routes.apply_product_changes([("upsert", self.gid, self.node)])
+        self.assertEqual(self.index.get(self.gid)["title"], "Ferramol Schneckenkorn")
+        self.assertEqual(len(self.cache.events_since("products", 0)), 1)
+
+    def test_reload_from_other_worker_replays_later_batches(self):
+        crawl_seq = self.cache.publish("products", "changes", [["upsert", "gid://shopify/Product/1", self.node]])
+        routes.sync_product_changes(force=True)
+        self.index.upsert({"id": "gid://shopify/Product/stale", "title": "Gelöscht"})
+
+        # anderer Worker: Crawl ab crawl_seq, währenddessen kommt ein Bündel, dann Snapshot + reload
+        during = self.cache.publish("products", "changes", [["upsert", self.gid, self.node]])
+        write_snapshot(self.snapshot_path, [{"id": "gid://shopify/Product/2", "title": "Neudorff Spruzit", "price": 9.5}])
+        routes.load_catalog_snapshot()
+        reload_seq = self.cache.publish("products", "reload", {"origin": -1, "after": crawl_seq, "createdAt": 0})
+
+        with mock.patch.object(routes.threading, "Thread") as thread:
+            routes.sync_product_changes(force=True)
+        self.assertTrue(routes._product_sync["busy"])
+        routes._reload_search_index(*thread.call_args.kwargs["args"])  # hier synchron
+
+        routes.sync_product_changes(force=True)
+        self.assertIsNone(self.index.get("gid://shopify/Product/stale"))
+        self.assertEqual(self.index.get("gid://shopify/Product/2")["title"], "Neudorff Spruzit")
+        self.assertIsNotNone(self.index.get(self.gid))
+        self.assertEqual((routes._product_sync["seq"], routes._product_sync["reloaded"]), (reload_seq, reload_seq))
+        self.assertGreater(reload_seq, during)
+
+    def test_fresh_worker_skips_batches_before_last_reload(self):
+        crawl_seq = self.cache.publish("products", "changes", [["upsert", "gid://shopify/Product/old", self.node]])
+        write_snapshot(self.snapshot_path, [{"id": "gid://shopify/Product/2", "title": "Neudorff Spruzit", "price": 9.5}])
+        self.cache.publish("products", "reload", {"origin": -1, "after": crawl_seq, "createdAt": float("inf")})
+        self.cache.publish("products", "changes", [["upsert", self.gid, self.node]])
+
+        routes.sync_product_changes()
+        self.assertIsNotNone(routes.get_catalog_snapshot())  # Snapshot neu gemappt
+        self.assertIsNone(self.index.get("gid://shopify/Product/old"))
+        self.assertIsNotNone(self.index.get(self.gid))
+
+    def test_periodic_reconcile_skipped_after_recent_reload(self):
+        self.cache.publish("products", "reload", {"origin": -1, "after": 0, "createdAt": 0})
+        with mock.patch.object(routes, "reconcile_catalog") as reconcile:
+            self.assertEqual(routes.periodic_reconcile(), 0)
+        reconcile.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
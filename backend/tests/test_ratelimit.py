@@ -0,0 +1,67 @@
+import dataclasses
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.ratelimit import MemoryBucketStore, SQLiteBucketStore, parse_rate
+from app.settings import configure
+
+
+class BucketStoreTestCase(unittest.TestCase):
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("10/30", "5/60"), (10, 30.0))
+        self.assertEqual(parse_rate("garbage", "5/60"), (5, 60.0))
+        self.assertEqual(parse_rate(None, "5/60"), (5, 60.0))
+
+    def test_memory_store_throttles_and_evicts(self):
+        store = MemoryBucketStore(max_keys=2)
+        self.assertEqual(store.take("a", 2, 60), (True, 0))
+        self.assertEqual(store.take("a", 2, 60), (True, 0))
+        allowed, retry_after = store.take("a", 2, 60)
+        self.assertFalse(allowed)
+        self.assertGreaterEqual(retry_after, 1)
+
+        store.take("b", 2, 60)
+        store.take("c", 2, 60)
+        self.assertEqual(len(store._buckets), 2)
+        self.assertNotIn("a", store._buckets)
+
+    def test_sqlite_store_is_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "rl.sqlite3")
+            one, two = SQLiteBucketStore(path), SQLiteBucketStore(path)
+            self.assertTrue(one.take("k", 1, 60)[0])
+            self.assertFalse(two.take("k", 1, 60)[0])
+
+
+class LoginThrottleTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        self._store = mock.patch.object(routes, "_rate_store", MemoryBucketStore())
+        self._store.start()
+        self.addCleanup(self._store.stop)
+
+    def test_login_rejected_before_db(self):
+        configure(dataclasses.replace(self.app.extensions["settings"], auth_rate_email=(1, 60.0)))
+        with mock.patch.object(routes, "get_conn", side_effect=RuntimeError("db down")) as get_conn:
+            body = {"email": "a@example.com", "password": "secret1"}
+            first = self.client.post("/api/auth/login", json=body)
+            self.assertEqual(first.status_code, 500)
+
+            second = self.client.post("/api/auth/login", json=body)
+            self.assertEqual(second.status_code, 429)
+            self.assertIn("Retry-After", second.headers)
+            self.assertEqual(get_conn.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
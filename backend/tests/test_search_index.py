@@ -0,0 +1,177 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.search_index import ProductSearchIndex, edit_distance
+
+PRODUCTS = [
+    {"id": "1", "title": "Schädlingsfrei Neem", "sku": "ND-1001", "ean": "4006925001234", "description": "Gegen Blattläuse"},
+    {"id": "2", "title": "Ferramol Schneckenkorn", "sku": "ND-2002", "ean": "4006925005678", "description": "Schneckenfrei im Beet"},
+    {"id": "3", "title": "Finalsan Unkrautfrei Plus", "sku": "ND-3003", "ean": "4006925009999", "description": "Neem-frei, gegen Unkraut"},
+]
+
+
+def ids(result):
+    return [item["id"] for item in result["items"]]
+
+
+class ProductSearchIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = ProductSearchIndex()
+        self.index.upsert_many(PRODUCTS)
+
+    def test_umlaut_spellings(self):
+        for q in ("Schädlingsfrei", "schaedlingsfrei", "schadlingsfrei"):
+            self.assertEqual(ids(self.index.search(q))[0], "1", q)
+
+    def test_prefix_and_typo(self):
+        self.assertEqual(ids(self.index.search("ferra"))[0], "2")
+        self.assertEqual(ids(self.index.search("Schneckenkron"))[0], "2")
+
+    def test_compound_part(self):
+        self.assertIn("3", ids(self.index.search("unkraut")))
+        self.assertIn("2", ids(self.index.search("schnecken")))
+
+    def test_codes_rank_above_description(self):
+        self.assertEqual(ids(self.index.search("4006925005678")), ["2"])
+        self.assertEqual(ids(self.index.search("ND-3003")), ["3"])
+        # "neem" im Titel schlägt "neem" in der Beschreibung
+        self.assertEqual(ids(self.index.search("neem")), ["1", "3"])
+
+    def test_update_and_remove(self):
+        self.index.upsert({**PRODUCTS[0], "title": "Spruzit Neu"})
+        self.assertEqual(ids(self.index.search("schaedlingsfrei")), [])
+        self.assertEqual(ids(self.index.search("spruzit")), ["1"])
+        self.index.remove("1")
+        self.assertEqual(ids(self.index.search("spruzit")), [])
+        self.assertEqual(len(self.index), 2)
+
+
+class LargeCatalogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = ProductSearchIndex()
+        self.index.upsert_many(
+            {"id": str(i), "title": f"Neudorff Produkt {i}", "sku": f"ND-{i:04d}", "ean": f"4006925{i:06d}"} for i in range(2000)
+        )
+
+    def test_prefix_total_is_not_capped(self):
+        self.assertEqual(self.index.search("4006925")["total"], 2000)
+        self.assertEqual(self.index.search("40069250001")["total"], 100)
+        self.assertEqual(self.index.search("neudorff", limit=5)["total"], 2000)
+
+    def test_code_prefix_counts_each_product_once(self):
+        # zwei Codes unter demselben Präfix, dazu "40" exakt im Titel
+        self.index.upsert({"id": "y", "title": "Neem 40 Stück", "sku": "400692599", "ean": "4006925777777"})
+        self.assertEqual(self.index.search("4006925")["total"], 2001)
+        self.assertEqual(self.index.search("40")["total"], 2001)
+        self.assertEqual(ids(self.index.search("4006925777"))[0], "y")
+        self.index.remove("y")
+        self.assertEqual(self.index.search("4006925")["total"], 2000)
+        self.assertEqual(self.index.search("4006925777")["total"], 0)
+
+    def test_code_with_common_prefix_token(self):
+        # "nd" passt auf alle 2000 SKUs, "0042" grenzt ein
+        self.assertEqual(ids(self.index.search("ND-0042")), ["42"])
+        self.assertEqual(ids(self.index.search("nd 1999")), ["1999"])
+
+    def test_ranking_prefers_better_matches(self):
+        self.index.upsert({"id": "x", "title": "Gartenhelfer", "sku": "NEUDORFF", "ean": ""})
+        result = self.index.search("neudorff", limit=3)
+        self.assertEqual(ids(result)[0], "x")  # Code schlägt Titel
+        self.assertEqual(len(result["items"]), 3)
+        self.assertGreater(result["items"][0]["score"], result["items"][1]["score"])
+
+
+class TypoToleranceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = ProductSearchIndex()
+        self.index.upsert_many(
+            [
+                {"id": "1", "title": "Tomaten Dünger", "sku": "ND-1"},
+                {"id": "2", "title": "Rasen Dünger", "sku": "ND-2"},
+            ]
+        )
+
+    def test_single_edit_on_short_words(self):
+        self.assertEqual(ids(self.index.search("tomatn")), ["1"])  # Auslassung
+        self.assertEqual(ids(self.index.search("tomatne")), ["1"])  # Vertauschung
+        self.assertEqual(ids(self.index.search("tomaxen")), ["1"])  # Ersetzung
+        self.assertEqual(ids(self.index.search("rasne")), ["2"])
+        self.assertEqual(sorted(ids(self.index.search("dunegr"))), ["1", "2"])
+        self.assertEqual(sorted(ids(self.index.search("dünegr"))), ["1", "2"])
+
+    def test_unrelated_words_do_not_match(self):
+        self.assertEqual(ids(self.index.search("tulpen")), [])
+        self.assertEqual(ids(self.index.search("tomxyz")), [])
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("dunegr", "dunger", 1), 1)
+        self.assertEqual(edit_distance("tomatn", "tomaten", 1), 1)
+        self.assertEqual(edit_distance("rasen", "rasen", 1), 0)
+        self.assertEqual(edit_distance("abcd", "dcba", 2), 3)  # > limit
+        self.assertEqual(edit_distance("kurz", "kurzwaren", 2), 3)
+
+
+class LocalSearchEndpointTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        routes._search_index = None
+
+    def test_index_fed_from_shopify_search(self):
+        data = {
+            "products": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "edges": [{"node": {"id": "gid://shopify/Product/9", "title": "Schädlingsfrei Neem", "variants": {"edges": []}}}],
+            }
+        }
+        with mock.patch.object(routes, "shopify_graphql", return_value=data):
+            self.client.get("/api/products/search?q=neem")
+
+        resp = self.client.get("/api/products/local-search?q=schadlingsfrei")
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual(body["indexed"], 1)
+        self.assertEqual(body["items"][0]["id"], "gid://shopify/Product/9")
+
+    def test_rebuild_runs_in_background(self):
+        routes._job_board = None
+        entered, release = threading.Event(), threading.Event()
+        data = {
+            "products": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "edges": [{"node": {"id": "gid://shopify/Product/9", "title": "Ferramol", "variants": {"edges": []}}}],
+            }
+        }
+
+        def slow_graphql(*_args):
+            entered.set()
+            release.wait(5)
+            return data
+
+        with mock.patch.object(routes, "shopify_graphql", side_effect=slow_graphql), mock.patch.object(
+            routes, "get_auth_context", return_value=({"id": 1, "isOwner": True}, 1, [])
+        ):
+            resp = self.client.post("/api/products/local-search/rebuild")
+            self.assertEqual(resp.status_code, 202)
+            entered.wait(5)
+            self.assertEqual(self.client.post("/api/products/local-search/rebuild").status_code, 409)
+            self.assertEqual(routes.get_job_board().snapshot()["jobs"][0]["state"], "running")
+            release.set()
+            routes._catalog_rebuild["thread"].join(5)
+
+        job = routes.get_job_board().snapshot()["jobs"][0]
+        self.assertEqual((job["id"], job["state"], job["done"]), ("shopify-sync", "ok", 1))
+        self.assertEqual(len(routes.get_search_index()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
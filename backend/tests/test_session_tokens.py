@@ -0,0 +1,136 @@
+import dataclasses
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.session_tokens import RevocationList, decode_access_token, encode_access_token
+from app.settings import configure
+from tests.fakes import FakeConn, FakeDB
+
+SECRET = "test-secret-0123456789abcdef0123456789"
+
+USER = {
+    "id": 7,
+    "email": "anna@example.com",
+    "firstName": "Anna",
+    "lastName": "Berg",
+    "departmentId": None,
+    "departmentName": None,
+    "isOwner": False,
+    "isActive": True,
+}
+
+
+class AccessTokenTestCase(unittest.TestCase):
+    def test_roundtrip_and_wrong_secret(self):
+        token = encode_access_token(USER, 11, SECRET, 60, session_token="opaque")
+        claims = decode_access_token(token, SECRET)
+        self.assertEqual(claims["sub"], "7")
+        self.assertEqual(claims["sid"], 11)
+        self.assertIsNone(decode_access_token(token, SECRET + "-other"))
+
+    def test_revocation_by_session_and_user(self):
+        revs = RevocationList(window_seconds=60, sync_interval=15)
+        claims = decode_access_token(encode_access_token(USER, 11, SECRET, 60, session_token="opaque"), SECRET)
+        self.assertFalse(revs.is_revoked(claims))
+        revs.revoke_session(11)
+        self.assertTrue(revs.is_revoked(claims))
+
+        revs = RevocationList(window_seconds=60, sync_interval=15)
+        revs.revoke_user(7)
+        self.assertTrue(revs.is_revoked(claims))
+        later = decode_access_token(encode_access_token(USER, 12, SECRET, 60, session_token="opaque"), SECRET)
+        later["iat"] = time.time() + 1
+        self.assertFalse(revs.is_revoked(later))
+
+
+class TablesDB(FakeDB):
+    """Liefert je Query die Zeilen aus `tables` (user_sessions / user_token_revocations)."""
+
+    def __init__(self, tables: dict):
+        super().__init__()
+        self.tables = tables
+
+    def execute(self, cursor, sql, args):
+        cursor.rows = next((rows for table, rows in self.tables.items() if f"FROM {table}" in sql), [])
+
+
+def tables_conn(tables: dict):
+    return TablesDB(tables).connect()
+
+
+class UserRevocationSyncTestCase(unittest.TestCase):
+    def test_user_revocations_from_other_workers(self):
+        claims = decode_access_token(encode_access_token(USER, 11, SECRET, 60, session_token="opaque"), SECRET)
+        revs = RevocationList(window_seconds=60, sync_interval=15)
+        revs.sync(tables_conn({"user_sessions": [], "user_token_revocations": [{"user_id": 7, "revoked_ts": claims["iat"] + 0.5}]}))
+        self.assertTrue(revs.is_revoked(claims))
+        self.assertFalse(revs.is_revoked({**claims, "iat": claims["iat"] + 1}))
+
+    def test_department_change_is_persisted(self):
+        app = create_app("testing")
+        conn = tables_conn({"users": [{"id": 7}], "departments": [{"id": 2}]})
+        with mock.patch.object(routes, "get_conn", return_value=conn), mock.patch.object(
+            routes, "get_auth_context", return_value=({"id": 1, "isOwner": True}, 1, [])
+        ), mock.patch.object(routes, "bump_data_version"):
+            resp = app.test_client().post("/api/admin/users/7/department", json={"departmentId": 2})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(("INSERT INTO user_token_revocations (user_id, revoked_at) VALUES (%s, NOW(3)) ON DUPLICATE KEY UPDATE revoked_at = VALUES(revoked_at)", (7,)), conn.statements)
+
+
+class StatelessAuthMeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        self.settings = configure(
+            dataclasses.replace(self.app.extensions["settings"], session_mode="jwt", session_jwt_secret=SECRET)
+        )
+        revocations = RevocationList(window_seconds=60, sync_interval=3600)
+        revocations._synced_at = time.monotonic()
+        patcher = mock.patch.object(routes, "_revocations", revocations)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_auth_me_without_db(self):
+        self.client.set_cookie(self.settings.session_cookie_name, "opaque")
+        self.client.set_cookie(self.settings.access_cookie_name, encode_access_token(USER, 11, SECRET, 60, session_token="opaque"))
+        with mock.patch.object(routes, "get_conn", side_effect=AssertionError("no db expected")):
+            resp = self.client.get("/api/auth/me")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()["user"]["email"], "anna@example.com")
+
+    def test_token_is_bound_to_its_session_cookie(self):
+        self.client.set_cookie(self.settings.session_cookie_name, "someone-else")
+        self.client.set_cookie(self.settings.access_cookie_name, encode_access_token(USER, 11, SECRET, 60, session_token="opaque"))
+        # Access-Token passt nicht zum Session-Cookie -> DB-Pfad, dort keine Session
+        with mock.patch.object(routes, "get_conn", return_value=FakeConn()) as get_conn:
+            resp = self.client.get("/api/auth/me")
+        self.assertIsNone(resp.get_json()["user"])
+        get_conn.assert_called()
+
+    def test_logout_revokes_token_in_this_worker_at_once(self):
+        access = encode_access_token(USER, 11, SECRET, 60, session_token="opaque")
+        self.client.set_cookie(self.settings.session_cookie_name, "opaque")
+        self.client.set_cookie(self.settings.access_cookie_name, access)
+        conn = FakeConn()
+        with mock.patch.object(routes, "get_conn", return_value=conn), mock.patch.object(routes, "audit"):
+            self.assertEqual(self.client.post("/api/auth/logout").status_code, 200)
+        self.assertIn(("UPDATE user_sessions SET revoked_at = NOW() WHERE id = %s", (11,)), conn.statements)
+
+        # dieselben Cookies erneut vorgelegt: ohne Revocation-Sync abgelehnt
+        self.client.set_cookie(self.settings.session_cookie_name, "opaque")
+        self.client.set_cookie(self.settings.access_cookie_name, access)
+        with mock.patch.object(routes, "get_conn", return_value=FakeConn()):
+            self.assertIsNone(self.client.get("/api/auth/me").get_json()["user"])
+
+
+if __name__ == "__main__":
+    unittest.main()
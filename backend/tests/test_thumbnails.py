@@ -0,0 +1,100 @@
+import dataclasses
+import io
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import requests
+from PIL import Image
+
+from app import create_app
+from app import routes
+from app.settings import configure
+from app.thumbnails import ThumbnailCache, ThumbnailError, is_allowed_source, snap_width, thumbnail_path
+
+SRC = "https://cdn.shopify.com/s/files/1/neem.jpg?v=1"
+SECRET = "thumb-secret"
+
+
+def jpeg_bytes(size=(1600, 1200)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size, (40, 120, 40)).save(out, format="JPEG")
+    return out.getvalue()
+
+
+class ThumbnailProxyTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.app = create_app("testing")
+        configure(dataclasses.replace(self.app.extensions["settings"], thumb_cache_dir=tmp.name, thumb_signing_secret=SECRET))
+        self.client = self.app.test_client()
+        patcher = mock.patch.object(routes, "_thumb_cache", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_resizes_once_and_revalidates(self):
+        with mock.patch.object(ThumbnailCache, "_fetch", return_value=jpeg_bytes()) as fetch:
+            resp = self.client.get(thumbnail_path(SRC, 128, SECRET))
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.mimetype, "image/webp")
+            self.assertIn("immutable", resp.headers["Cache-Control"])
+            with Image.open(io.BytesIO(resp.data)) as img:
+                self.assertEqual(img.size[0], 128)
+
+            again = self.client.get(thumbnail_path(SRC, 128, SECRET).replace("w=128", "w=100"))
+            self.assertEqual(again.data, resp.data)
+            not_modified = self.client.get(thumbnail_path(SRC, 128, SECRET), headers={"If-None-Match": resp.headers["ETag"]})
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(fetch.call_count, 1)
+
+    def test_rejects_foreign_hosts(self):
+        resp = self.client.get(thumbnail_path("https://evil.example.com/x.jpg", secret=SECRET))
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(is_allowed_source("https://cdn.shopify.com/other/x.jpg", ("cdn.shopify.com",), "/s/files/1/"))
+        self.assertFalse(is_allowed_source("https://cdn.shopify.com:8443/s/files/1/x.jpg", ("cdn.shopify.com",), "/s/files/1/"))
+
+    def test_requires_signature_for_src_and_width(self):
+        with mock.patch.object(ThumbnailCache, "_fetch", return_value=jpeg_bytes()) as fetch:
+            self.assertEqual(self.client.get(thumbnail_path(SRC, 128)).status_code, 403)
+            other_query = thumbnail_path(SRC, 128, SECRET).replace("v%3D1", "v%3D2")
+            self.assertEqual(self.client.get(other_query).status_code, 403)
+            wider = thumbnail_path(SRC, 128, SECRET).replace("w=128", "w=512")
+            self.assertEqual(self.client.get(wider).status_code, 403)
+        fetch.assert_not_called()
+
+    def test_map_shopify_product_signs_thumbnails(self):
+        product = routes.map_shopify_product({"id": "p1", "featuredImage": {"url": SRC}})
+        self.assertEqual(product["thumbnail"], thumbnail_path(SRC, secret=SECRET))
+
+    def test_fetch_does_not_follow_redirects_and_checks_length(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = ThumbnailCache(tmp.name, 1 << 20, max_source_bytes=1000)
+        redirect = mock.Mock(is_redirect=True, status_code=302, headers={"Location": "http://169.254.169.254/"})
+        with mock.patch("requests.get", return_value=redirect) as get:
+            with self.assertRaises(requests.HTTPError):
+                cache._fetch(SRC)
+        self.assertFalse(get.call_args.kwargs["allow_redirects"])
+
+        big = mock.Mock(is_redirect=False, headers={"Content-Length": "5000"})
+        with mock.patch("requests.get", return_value=big):
+            with self.assertRaises(ThumbnailError):
+                cache._fetch(SRC)
+        big.iter_content.assert_not_called()
+
+    def test_snap_width(self):
+        self.assertEqual(snap_width("1"), 64)
+        self.assertEqual(snap_width("200"), 256)
+        self.assertEqual(snap_width("5000"), 512)
+        self.assertEqual(snap_width(None), 128)
+
+
+if __name__ == "__main__":
+    unittest.main()
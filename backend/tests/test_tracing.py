@@ -0,0 +1,103 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app
+from app import routes
+from app.tracing import FileExporter, Tracer, span, traced_cursor
+from tests.fakes import FakeCursor
+
+
+class CaptureExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+class TracerTestCase(unittest.TestCase):
+    def test_child_spans_and_otlp_shape(self):
+        exporter = CaptureExporter()
+        tracer = Tracer(exporter, sample_rate=1.0)
+        _trace_id, root = tracer.start_request(name="POST /orders")
+        cur = traced_cursor(FakeCursor)()
+        cur.execute("SELECT  id\n FROM orders WHERE id = %s", (1,))
+        with span("bcrypt.hashpw"):
+            pass
+        tracer.finish_request(root, 201)
+
+        spans = [s.to_otlp() for s in exporter.traces[0].spans]
+        self.assertEqual([s["name"] for s in spans], ["db.execute", "bcrypt.hashpw", "POST /orders"])
+        self.assertTrue(all(s["parentSpanId"] == root.span_id for s in spans[:2]))
+        attrs = {a["key"]: a["value"] for a in spans[0]["attributes"]}
+        self.assertEqual(attrs["db.statement"], {"stringValue": "SELECT id FROM orders WHERE id = %s"})
+        self.assertEqual(attrs["db.rowcount"], {"intValue": "1"})
+        self.assertEqual(len(spans[2]["traceId"]), 32)
+
+    def test_unsampled_requests_record_nothing(self):
+        exporter = CaptureExporter()
+        tracer = Tracer(exporter, sample_rate=0.0)
+        trace_id, root = tracer.start_request()
+        self.assertIsNone(root)
+        self.assertEqual(len(trace_id), 32)
+        traced_cursor(FakeCursor)().execute("SELECT 1")
+        tracer.finish_request(root, 200)
+        self.assertEqual(exporter.traces, [])
+
+    def test_parent_based_sampling(self):
+        tracer = Tracer(CaptureExporter(), sample_rate=0.0, parent_based=True)
+        parent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        trace_id, root = tracer.start_request(parent)
+        self.assertEqual(trace_id, "0af7651916cd43dd8448eb211c80319c")
+        self.assertEqual(root.parent_id, "b7ad6b7169203331")
+        tracer.finish_request(root, 200)
+
+    def test_file_export_rotates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "traces.jsonl")
+            exporter = FileExporter(path, max_bytes=600, backups=2)
+            tracer = Tracer(exporter, sample_rate=1.0)
+            for _ in range(5):
+                _tid, root = tracer.start_request(name="GET /api/health")
+                tracer.finish_request(root, 200)
+            exporter.close()
+            self.assertTrue(os.path.exists(path + ".1"))
+            with open(path, encoding="utf-8") as f:
+                payload = json.loads(f.readline())
+            scope = payload["resourceSpans"][0]["scopeSpans"][0]
+            self.assertEqual(scope["spans"][0]["name"], "GET /api/health")
+
+
+class RequestTracingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+
+    def test_trace_id_header_without_sampling(self):
+        with mock.patch.object(routes, "get_tracer", return_value=Tracer(None, 0.0)):
+            resp = self.client.get("/api/health")
+        self.assertEqual(len(resp.headers["X-Trace-Id"]), 32)
+        self.assertTrue(resp.headers["traceparent"].endswith("-00"))
+
+    def test_sampled_request_is_exported(self):
+        exporter = CaptureExporter()
+        with mock.patch.object(routes, "get_tracer", return_value=Tracer(exporter, 1.0)):
+            resp = self.client.get("/api/products/local-search?q=neem")
+        root = exporter.traces[0].spans[-1]
+        self.assertEqual(root.name, "GET /api/products/local-search")
+        self.assertEqual(root.attributes["http.status_code"], 200)
+        self.assertEqual(resp.headers["X-Trace-Id"], root.trace.trace_id)
+        self.assertTrue(resp.headers["traceparent"].endswith(f"{root.span_id}-01"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import bcrypt
+
+from app import create_app
+from app import routes
+from app.user_import import UserImportError, hash_passwords, parse_payload, validate_rows
+from tests.fakes import FakeConn
+
+DEPARTMENTS = {1: "Vertrieb", 2: "Marketing"}
+
+
+class UserImportTestCase(unittest.TestCase):
+    def test_parse_csv_with_german_headers_and_semicolons(self):
+        raw = "E-Mail;Vorname;Nachname;Abteilung\nanna@example.com;Anna;A;Vertrieb\n\nbernd@example.com;Bernd;B;\n"
+        rows = parse_payload(raw.encode("utf-8"), "text/csv")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0], {"email": "anna@example.com", "firstName": "Anna", "lastName": "A", "department": "Vertrieb"})
+
+    def test_parse_json_and_errors(self):
+        self.assertEqual(parse_payload(b'{"users": [{"email": "a@b.de"}]}', "application/json"), [{"email": "a@b.de"}])
+        with self.assertRaises(UserImportError):
+            parse_payload(b"vorname\nAnna\n", "text/csv")
+        with self.assertRaises(UserImportError):
+            parse_payload(b'{"users": 1}', "application/json")
+
+    def test_validate_rows(self):
+        rows = [
+            {"email": "Anna@Example.com", "department": "vertrieb"},
+            {"email": "anna@example.com"},
+            {"email": "kaputt"},
+            {"email": "carl@example.com", "departmentId": "9"},
+            {"email": "dora@example.com", "password": "123"},
+            {"email": "old@example.com"},
+            {"email": "eva@example.com", "departmentId": "2", "isActive": "nein", "password": "geheim123"},
+        ]
+        results, passwords = validate_rows(rows, DEPARTMENTS, {"old@example.com"})
+        self.assertEqual(
+            [r.get("error") for r in results],
+            [None, "email_duplicate", "email_invalid", "department_unknown", "password_policy", "email_exists", None],
+        )
+        self.assertEqual(results[0]["departmentId"], 1)
+        self.assertEqual((results[6]["departmentId"], results[6]["isActive"]), (2, 0))
+        # Passwörter nur getrennt von den Ergebnissen (die gehen an den Client)
+        self.assertFalse(any("password" in r for r in results))
+        self.assertEqual(passwords, {1: None, 7: "geheim123"})
+
+    def test_hash_passwords_keeps_order_and_generates(self):
+        passwords = ["geheim123", None] * 4
+        started = time.perf_counter()
+        hashed = hash_passwords(passwords, workers=4)
+        self.assertLess(time.perf_counter() - started, 30)
+        self.assertEqual(len(hashed), 8)
+        self.assertIsNone(hashed[0][0])
+        self.assertTrue(bcrypt.checkpw(b"geheim123", hashed[0][1].encode()))
+        generated, pw_hash = hashed[1]
+        self.assertTrue(bcrypt.checkpw(generated.encode(), pw_hash.encode()))
+
+
+class ImportRouteTestCase(unittest.TestCase):
+    USERS = [{"email": "anna@example.com", "password": "geheim123"}, {"email": "kaputt", "password": "auchgeheim"}]
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.client = self.app.test_client()
+        self.client.set_cookie("np_session", "token")
+        patchers = [
+            mock.patch.object(routes, "get_auth_context", return_value=({"id": 1, "isOwner": True}, 1, [])),
+            mock.patch.object(routes, "get_conn", return_value=FakeConn()),
+            mock.patch.object(routes, "audit"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_responses_never_contain_passwords(self):
+        rejected = self.client.post("/api/admin/users/import", json=self.USERS)
+        self.assertEqual(rejected.status_code, 400)
+        created = self.client.post("/api/admin/users/import?partial=1", json=self.USERS)
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(created.get_json()["created"], 1)
+        for resp in (rejected, created):
+            self.assertNotIn(b"geheim", resp.data)
+            self.assertFalse(any("password" in r for r in resp.get_json()["results"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
-import { useMemo } from "react";
+import { useEffect, useMemo, useState } from "react";
 import "../styles/AutomationsPage.css";
 
+const API_BASE = import.meta.env.VITE_API_BASE_URL ?? "";
+
 type AutomationStatus = "ok" | "attention" | "paused";
 
 type AutomationJob = {
@@ -25,18 +27,18 @@ const AUTOMATION_JOBS: AutomationJob[] = [
   {
     id: "shopify-sync",
     name: "Shopify Sync",
-    summary: "Schreibt freigegebene Produkte inklusive Bestand in den Shop.",
+    summary: "Gleicht den Shopify-Katalog mit der lokalen Produktsuche ab.",
     status: "ok",
     lastRun: "Heute · 07:15 Uhr",
-    nextRun: "07:45 Uhr",
-    cadence: "Alle 30 Minuten",
+    nextRun: "13:15 Uhr",
+    cadence: "Alle 6 Stunden + Webhooks",
     owner: "Produktmanagement",
     runsToday: 5,
   },
   {
     id: "obi-export",
     name: "OBI Export",
-    summary: "Erstellt die CSV für den Marktplatz-Upload.",
+    summary: "Prüft den Katalog als Feed für den Marktplatz-Upload.",
     status: "attention",
     lastRun: "Heute · 05:40 Uhr",
     nextRun: "Morgen · 05:40 Uhr",
@@ -57,10 +59,88 @@ const AUTOMATION_JOBS: AutomationJob[] = [
   },
 ];
 
+const POLL_INTERVAL_MS = 5000;
+
+// Live-Zustand aus /api/automations/stream (Server-Sent Events)
+type LiveJob = {
+  id: string;
+  state: "idle" | "running" | "ok" | "failed";
+  done: number;
+  total: number | null;
+  message: string | null;
+  lastRun: string | null;
+  runsToday: number;
+};
+
+function formatLastRun(iso: string) {
+  const date = new Date(iso);
+  const time = date.toLocaleTimeString("de-DE", { hour: "2-digit", minute: "2-digit" });
+  const isToday = date.toDateString() === new Date().toDateString();
+  return `${isToday ? "Heute" : date.toLocaleDateString("de-DE")} · ${time} Uhr`;
+}
+
+function mergeLive(job: AutomationJob, live?: LiveJob): AutomationJob & { progress?: string } {
+  if (!live) return job;
+  return {
+    ...job,
+    status: live.state === "failed" ? "attention" : live.state === "idle" ? job.status : "ok",
+    lastRun: live.lastRun ? formatLastRun(live.lastRun) : job.lastRun,
+    runsToday: live.runsToday,
+    progress: live.state === "running" ? `${live.done}${live.total ? ` / ${live.total}` : ""}` : undefined,
+  };
+}
+
+function useLiveJobs() {
+  const [live, setLive] = useState<Record<string, LiveJob>>({});
+
+  useEffect(() => {
+    const applySnapshot = (jobs: LiveJob[]) => setLive(Object.fromEntries(jobs.map((job) => [job.id, job])));
+    let poll: ReturnType<typeof setInterval> | undefined;
+
+    // ohne Stream (sync-Worker: 409, oder zu viele Clients) den Snapshot pollen
+    const startPolling = () => {
+      if (poll) return;
+      const load = () =>
+        fetch(`${API_BASE}/api/automations`, { credentials: "include" })
+          .then((res) => (res.ok ? res.json() : null))
+          .then((snap: { jobs: LiveJob[] } | null) => snap && applySnapshot(snap.jobs))
+          .catch(() => undefined);
+      load();
+      poll = setInterval(load, POLL_INTERVAL_MS);
+    };
+
+    const source = new EventSource(`${API_BASE}/api/automations/stream`, { withCredentials: true });
+    const onSnapshot = (e: MessageEvent) => {
+      const { jobs } = JSON.parse(e.data) as { jobs: LiveJob[] };
+      applySnapshot(jobs);
+    };
+    const onJob = (e: MessageEvent) => {
+      const job = JSON.parse(e.data) as LiveJob;
+      setLive((prev) => ({ ...prev, [job.id]: job }));
+    };
+    source.addEventListener("snapshot", onSnapshot);
+    source.addEventListener("state", onJob);
+    source.addEventListener("progress", onJob);
+    // Fehlerstatus statt Stream: EventSource gibt auf (CLOSED) statt neu zu verbinden
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) startPolling();
+    };
+    return () => {
+      source.close();
+      if (poll) clearInterval(poll);
+    };
+  }, []);
+
+  return live;
+}
+
 export default function AutomationsPage() {
+  const live = useLiveJobs();
+  const jobs = useMemo(() => AUTOMATION_JOBS.map((job) => mergeLive(job, live[job.id])), [live]);
+
   const stats = useMemo(
     () =>
-      AUTOMATION_JOBS.reduce(
+      jobs.reduce(
         (acc, job) => {
           acc.total += 1;
           acc.runsToday += job.runsToday;
@@ -70,7 +150,7 @@ export default function AutomationsPage() {
         },
         { total: 0, runsToday: 0, needsAttention: 0, paused: 0 }
       ),
-    []
+    [jobs]
   );
 
   return (
@@ -104,7 +184,7 @@ export default function AutomationsPage() {
       </header>
 
       <section className="automation-list" aria-label="Jobliste">
-        {AUTOMATION_JOBS.map((job) => (
+        {jobs.map((job) => (
           <article key={job.id} className="automation-card">
             <div className="automation-card__head">
               <span className={`status-pill ${job.status}`}>{STATUS_LABELS[job.status]}</span>
@@ -130,6 +210,12 @@ export default function AutomationsPage() {
                 <dt>Owner</dt>
                 <dd>{job.owner}</dd>
               </div>
+              {job.progress && (
+                <div>
+                  <dt>Fortschritt</dt>
+                  <dd>{job.progress}</dd>
+                </div>
+              )}
             </dl>
           </article>
         ))}
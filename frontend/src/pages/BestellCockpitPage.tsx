@@ -8,6 +8,7 @@ type Product = {
   sku: string;
   ean: string;
   image: string;
+  thumbnail?: string;
   price: number;
   description: string;
 };
@@ -18,6 +19,7 @@ type ProductOption = {
   sku: string;
   ean: string;
   image: string;
+  thumbnail?: string;
   price: number;
   description: string;
 };
@@ -38,6 +40,10 @@ type Address = {
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL ?? "";
 
+// Backend liefert Thumbnails als Pfad relativ zur API ("/api/images/thumb?...")
+const thumbSrc = (p: { image: string; thumbnail?: string }) =>
+  p.thumbnail ? (p.thumbnail.startsWith("/") ? `${API_BASE}${p.thumbnail}` : p.thumbnail) : p.image;
+
 export default function BestellCockpitPage() {
   const [selectedProduct, setSelectedProduct] = useState<Product | null>(null);
   const [quantity, setQuantity] = useState(1);
@@ -112,6 +118,7 @@ export default function BestellCockpitPage() {
         sku: p.sku,
         ean: p.ean,
         image: p.image,
+        thumbnail: p.thumbnail,
         price: p.price,
         description: p.description,
       }));
@@ -276,7 +283,7 @@ export default function BestellCockpitPage() {
             filterOption={() => true} // Backend macht Suche
             formatOptionLabel={(option) => (
               <div className="cockpit-select-option">
-                <img src={option.image} alt="" aria-hidden="true" />
+                <img src={thumbSrc(option)} alt="" aria-hidden="true" loading="lazy" />
                 <div>
                   <p className="cockpit-select-option__title">{option.label}</p>
                   <p className="cockpit-select-option__meta">